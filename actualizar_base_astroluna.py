@@ -7,6 +7,9 @@ import os
 import sqlite3
 from datetime import datetime
 
+from cuando_virtual import current_mode, ensure_query_indexes
+from normalizar_fechas_en_todas import MIGRACION, migracion_aplicada
+
 # ============== Utilidades de logging ==============
 
 def md5_file(path: str) -> str:
@@ -27,6 +30,11 @@ def write_log_line(fh, line):
 
 def normalize_all_fecha_columns(conn, logfh):
     write_log_line(logfh, "[STEP] Normalizar columnas 'fecha' (DD/MM/YYYY -> YYYY-MM-DD) en todas las tablas.")
+    aplicada = migracion_aplicada(conn)
+    if aplicada:
+        # la carga ya escribe ISO (column_types.coercers_for): no hace falta barrer todas las tablas
+        write_log_line(logfh, f"  - SKIP: migración '{MIGRACION}' aplicada {aplicada}; fechas ya en ISO desde la carga.")
+        return
     cur = conn.cursor()
     cur.execute("""
         SELECT name FROM sqlite_master
@@ -78,6 +86,9 @@ def rebuild_matriz(conn, logfh):
     conn.execute("CREATE INDEX IF NOT EXISTS idx_matriz_fecha ON matriz_astro_luna(fecha)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_matriz_numero ON matriz_astro_luna(numero)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_matriz_umcdu ON matriz_astro_luna(um,c,d,u)")
+    if current_mode(conn) in ("virtual", "mixto"):
+        # cuando_* como vistas (cuando_virtual.py): la matriz nueva necesita sus índices de consulta
+        ensure_query_indexes(conn)
 
 def rebuild_resumenes(conn, logfh):
     write_log_line(logfh, "[STEP] Reconstruir tablas resumen*.")
@@ -107,9 +118,15 @@ def rebuild_todos_cuando_son(conn, logfh):
     conn.execute("CREATE INDEX IF NOT EXISTS idx_tcs_fecha_num ON todos_cuando_son(fecha, numero)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_tcs_digito_pos ON todos_cuando_son(digito, posicion)")
 
+def es_vista(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='view' AND name=?", (name,)).fetchone() is not None
+
 def rebuild_todo_cuando_es(conn, logfh):
     write_log_line(logfh, "[STEP] Reconstruir 'todo_cuando_*_es' (0..9).")
     for dig in range(10):
+        if es_vista(conn, f"todo_cuando_{dig}_es"):
+            write_log_line(logfh, f"  - SKIP: todo_cuando_{dig}_es es vista (modo virtual).")
+            continue
         conn.execute(f"DROP TABLE IF EXISTS todo_cuando_{dig}_es")
         conn.execute(f"""
             CREATE TABLE todo_cuando_{dig}_es AS
@@ -143,6 +160,9 @@ def rebuild_cuando_detalladas(conn, logfh):
     for dig in range(10):
         for sufijo, cond in reglas.items():
             tabla = f"cuando_{dig}_es_{sufijo}"
+            if es_vista(conn, tabla):
+                write_log_line(logfh, f"  - SKIP: {tabla} es vista (modo virtual).")
+                continue
             conn.execute(f"DROP TABLE IF EXISTS {tabla}")
             conn.execute(f"""
                 CREATE TABLE {tabla} AS
@@ -18,6 +18,8 @@ import csv
 import html
 from collections import defaultdict
 
+from run_store import is_packed, packed_top
+
 # -------- Utilidades de introspección --------
 
 def list_tables(conn):
@@ -224,6 +226,9 @@ def load_runs(conn, run_table):
     return rows
 
 def load_candidates_for_run(conn, rc_table, run_id, topk):
+    # runs guardados con --storage packed: top-k directo del BLOB
+    if is_packed(conn, run_id):
+        return packed_top(conn, run_id, topk)
     # detectar columnas
     cur = conn.execute(f"PRAGMA table_info('{rc_table}')")
     cols = [r[1] for r in cur.fetchall()]
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+backtest_scoring.py — Backtest walk-forward de los pesos de score_candidates.py
+- Para cada fecha histórica de astro_luna puntúa el universo (10000 números) usando SOLO los sorteos anteriores
+  y registra el rank del número ganador.
+- Las features (hot/cold 30d, efecto calendario, recencia dígito/posición, recencia exacta) se mantienen incrementalmente mientras
+  avanza la fecha: cada sorteo se procesa una vez, no se re-consulta la historia por día.
+- Varios juegos de pesos (--weights repetido) se reparten en un pool de procesos (--workers).
+Uso:
+  python backtest_scoring.py --db "C:\\RadarPremios\\radar_premios.db" --desde 2024-01-01 ^
+         --weights 0.25,0.2,0.2,0.35 --weights 0.4,0.1,0.2,0.3 --workers 2 --out "C:\\RadarPremios\\backtest.csv"
+"""
+import argparse, csv, datetime, sqlite3, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from score_candidates import UNIVERSE, cal_matrix, score_components, rank_of
+
+HOTCOLD_WINDOW = 30
+CAL_HORIZON = 30  # semanas (igual que --cal-horizon de score_candidates.py)
+BUCKETS = (1, 5, 15, 100, 1000)
+
+def load_draws(conn):
+    """Sorteos de astro_luna agrupados por fecha: [(ordinal, [numero, ...]), ...] en orden cronológico."""
+    by_date = {}
+    for fecha, n in conn.execute("""
+        SELECT fecha, CAST(numero AS INTEGER) FROM astro_luna
+        WHERE fecha IS NOT NULL AND numero IS NOT NULL
+        ORDER BY fecha, rowid
+    """):
+        try:
+            o = datetime.date.fromisoformat(str(fecha)[:10]).toordinal()
+        except ValueError:
+            continue  # fechas no normalizadas: correr normalizar_fechas_en_todas.py antes
+        if 0 <= n < UNIVERSE:
+            by_date.setdefault(o, []).append(int(n))
+    return sorted(by_date.items())
+
+def parse_date(s):
+    return datetime.date.fromisoformat(s).toordinal() if s else None
+
+class WalkState:
+    """Estado incremental equivalente a v_digit_hotcold / last_seen_* con los sorteos vistos hasta ahora."""
+
+    def __init__(self, window=HOTCOLD_WINDOW, cal_horizon=CAL_HORIZON):
+        self.window = window
+        self.cal_days = 7 * cal_horizon
+        self.max_fecha = None
+        self.last_dp = np.full((4, 10), -np.inf)      # ordinal de la última vez (posición, dígito)
+        self.last_exact = np.full(UNIVERSE, -np.inf)  # ordinal de la última vez por número
+        self.win = deque()                            # (ordinal, dígitos) dentro de la ventana hot/cold
+        self.counts = np.zeros(10, dtype=np.int64)
+        self.cal_win = deque()                        # (ordinal, dígitos) dentro del horizonte calendario
+        self.cal_counts = np.zeros((7, 4, 10), dtype=np.int64)  # día semana x posición x dígito
+
+    def add(self, ordinal, numeros):
+        for n in numeros:
+            digs = (n // 1000, (n // 100) % 10, (n // 10) % 10, n % 10)
+            for p, d in enumerate(digs):
+                self.last_dp[p, d] = ordinal
+                self.counts[d] += 1
+            self.last_exact[n] = ordinal
+            self.win.append((ordinal, digs))
+            self.cal_win.append((ordinal, digs))
+            self.cal_counts[(ordinal + 6) % 7, (0, 1, 2, 3), digs] += 1
+        self.max_fecha = ordinal if self.max_fecha is None else max(self.max_fecha, ordinal)
+        lim = self.max_fecha - self.window
+        while self.win and self.win[0][0] < lim:
+            _, digs = self.win.popleft()
+            for d in digs:
+                self.counts[d] -= 1
+        lim = self.max_fecha - self.cal_days
+        while self.cal_win and self.cal_win[0][0] <= lim:
+            o, digs = self.cal_win.popleft()
+            self.cal_counts[(o + 6) % 7, (0, 1, 2, 3), digs] -= 1
+
+    def hotcold(self):
+        # min-max sobre los dígitos presentes en la ventana; ausentes -> 0.5 (como load_hotcold)
+        hc = np.full(10, 0.5)
+        seen = self.counts > 0
+        if seen.any():
+            mn, mx = self.counts[seen].min(), self.counts[seen].max()
+            hc[seen] = 0.5 if mx == mn else (self.counts[seen] - mn) / (mx - mn)
+        return hc
+
+    def cal(self):
+        # como score_candidates.cal_table: día de la semana del próximo sorteo (max_fecha + 1)
+        return cal_matrix(self.cal_counts[(self.max_fecha + 1 + 6) % 7])
+
+    def ages(self):
+        # días desde la última aparición (inf si nunca); independientes de los caps
+        return self.max_fecha - self.last_dp, self.max_fecha - self.last_exact
+
+    def features(self, cap_digitpos=60, cap_exact=180):
+        dp_age, exact_age = self.ages()
+        return features_from_ages(self.max_fecha, self.hotcold(), self.cal(), dp_age, exact_age,
+                                  cap_digitpos, cap_exact)
+
+def features_from_ages(max_fecha, hotcold, cal, dp_age, exact_age, cap_digitpos=60, cap_exact=180):
+    return {
+        "max_fecha": datetime.date.fromordinal(int(max_fecha)).isoformat(),
+        "hotcold": np.asarray(hotcold, dtype=float),
+        "cal": np.asarray(cal, dtype=float),
+        "dp": np.minimum(1.0, np.asarray(dp_age, dtype=float) / cap_digitpos),
+        "exact": np.minimum(1.0, np.asarray(exact_age, dtype=float) / cap_exact),
+    }
+
+def walk_forward(draws, weight_sets, cap_digitpos=60, cap_exact=180, desde=None, hasta=None,
+                 cal_horizon=CAL_HORIZON):
+    """Avanza fecha a fecha; devuelve {idx_pesos: [(fecha, ganador, rank), ...]}."""
+    state = WalkState(cal_horizon=cal_horizon)
+    out = {i: [] for i in range(len(weight_sets))}
+    for ordinal, numeros in draws:
+        if hasta is not None and ordinal > hasta:
+            break
+        if state.max_fecha is not None and (desde is None or ordinal >= desde):
+            feats = state.features(cap_digitpos, cap_exact)
+            fecha = datetime.date.fromordinal(ordinal).isoformat()
+            for i, w in enumerate(weight_sets):
+                score, _ = score_components(feats, *w)
+                for n in numeros:
+                    out[i].append((fecha, n, rank_of(score, n)))
+        state.add(ordinal, numeros)
+    return out
+
+def summarize(ranks):
+    r = np.asarray(ranks, dtype=float)
+    if r.size == 0:
+        return {"n": 0}
+    res = {
+        "n": int(r.size),
+        "mean_rank": float(r.mean()),
+        "median_rank": float(np.median(r)),
+        "mrr": float((1.0 / r).mean()),
+    }
+    for b in BUCKETS:
+        res[f"top{b}"] = int(np.count_nonzero(r <= b))
+    return res
+
+def _run_chunk(args):
+    draws, chunk, cap_digitpos, cap_exact, desde, hasta, cal_horizon = args
+    res = walk_forward(draws, [w for _, w in chunk], cap_digitpos, cap_exact, desde, hasta, cal_horizon)
+    return [(idx, res[i]) for i, (idx, _) in enumerate(chunk)]
+
+def backtest(draws, weight_sets, cap_digitpos=60, cap_exact=180, desde=None, hasta=None, workers=1,
+             cal_horizon=CAL_HORIZON):
+    """Corre el walk-forward para todos los pesos; con workers>1 reparte los juegos de pesos en procesos."""
+    indexed = list(enumerate(weight_sets))
+    if workers <= 1 or len(indexed) <= 1:
+        chunks = [indexed]
+    else:
+        chunks = [indexed[i::workers] for i in range(min(workers, len(indexed)))]
+    jobs = [(draws, ch, cap_digitpos, cap_exact, desde, hasta, cal_horizon) for ch in chunks]
+    results = {}
+    if len(jobs) == 1:
+        parts = [_run_chunk(jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(jobs)) as ex:
+            parts = list(ex.map(_run_chunk, jobs))
+    for part in parts:
+        for idx, rows in part:
+            results[idx] = rows
+    return [results[i] for i in range(len(weight_sets))]
+
+def parse_weights(s):
+    w = tuple(float(x) for x in s.split(","))
+    if len(w) != 4:
+        raise argparse.ArgumentTypeError("--weights espera 4 valores: w_hotcold,w_cal,w_dp,w_exact")
+    return w
+
+def write_csv(path, weight_sets, results):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["w_hotcold", "w_cal", "w_dp", "w_exact", "fecha", "ganador", "rank"])
+        for ws, rows in zip(weight_sets, results):
+            for fecha, n, rank in rows:
+                w.writerow([*ws, fecha, f"{n:04d}", rank])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--weights", type=parse_weights, action="append",
+                    help="w_hotcold,w_cal,w_dp,w_exact (repetible). Default: pesos de score_candidates.py")
+    ap.add_argument("--cap-digitpos", type=int, default=60)
+    ap.add_argument("--cap-exact", type=int, default=180)
+    ap.add_argument("--cal-horizon", type=int, default=CAL_HORIZON, help="Semanas del efecto calendario")
+    ap.add_argument("--desde", help="Primera fecha a evaluar (YYYY-MM-DD); la historia previa sí alimenta las features")
+    ap.add_argument("--hasta", help="Última fecha a evaluar (YYYY-MM-DD)")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--out", help="CSV con el rank del ganador por fecha y juego de pesos")
+    args = ap.parse_args()
+
+    weight_sets = args.weights or [(0.25, 0.20, 0.20, 0.35)]
+    conn = sqlite3.connect(args.db)
+    try:
+        draws = load_draws(conn)
+    finally:
+        conn.close()
+    if not draws:
+        raise SystemExit("[ERROR] astro_luna sin sorteos con fecha ISO.")
+
+    t0 = time.perf_counter()
+    results = backtest(draws, weight_sets, args.cap_digitpos, args.cap_exact,
+                       parse_date(args.desde), parse_date(args.hasta), args.workers, args.cal_horizon)
+    elapsed = time.perf_counter() - t0
+
+    print("==================== BACKTEST WALK-FORWARD ====================")
+    print(f"sorteos: {sum(len(n) for _, n in draws)}  fechas: {len(draws)}  "
+          f"cap_digitpos: {args.cap_digitpos}  cap_exact: {args.cap_exact}  cal_horizon: {args.cal_horizon}  tiempo: {elapsed:.2f}s")
+    for ws, rows in zip(weight_sets, results):
+        s = summarize([r for _, _, r in rows])
+        if not s["n"]:
+            print(f"pesos={ws}  sin fechas evaluadas")
+            continue
+        tops = "  ".join(f"top{b}={s[f'top{b}']}" for b in BUCKETS)
+        print(f"pesos={ws}  n={s['n']}  rank_medio={s['mean_rank']:.1f}  mediana={s['median_rank']:.0f}  "
+              f"mrr={s['mrr']:.5f}  {tops}")
+    print("===============================================================")
+
+    if args.out:
+        write_csv(args.out, weight_sets, results)
+        print(f"[OK] CSV → {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+bench_cuando_virtual.py — Compara cuando_* / todo_cuando_* materializadas (modo físico) contra vistas sobre la
+matriz con índices (modo virtual, cuando_virtual.py), sobre dos copias de --db (la original no se toca):
+- espacio: tamaño del archivo tras VACUUM (y, si SQLite trae dbstat, lo que ocupan tablas/índices afectados);
+- reconstrucción: físico = router de una pasada sobre las 160 tablas; virtual = crear los índices de consulta
+  (cota superior: en la operación diaria las vistas no se reconstruyen);
+- consultas: SELECT de cada objeto completo y de los últimos --dias días, mediana y p95 en ms.
+Verifica además que ambos modos devuelvan las mismas filas. Con --scale repite las filas de la matriz.
+Uso:
+  python bench_cuando_virtual.py --db "C:\\RadarPremios\\radar_premios.db"
+  python bench_cuando_virtual.py --db "C:\\RadarPremios\\radar_premios.db" --scale 20 --repeat 5
+"""
+import argparse, os, shutil, sqlite3, statistics, tempfile, time
+from pathlib import Path
+
+import cuando_virtual as cv
+import orquestador_astroluna_v6 as orq
+from bench_derivadas import contenido, escalar
+
+def tamanos(db: Path):
+    conn = sqlite3.connect(db)
+    try:
+        conn.execute("VACUUM")
+        detalle = None
+        try:
+            rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+            nombres = {n for n, _ in cv.cuando_objects(conn)}
+            idx = {n for n, _ in cv.QUERY_INDEXES}
+            tbl_idx = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name "
+                                                  "IN (SELECT name FROM sqlite_master WHERE type='table')")
+                       if r[0].startswith("idx_cuando_") or r[0].startswith("idx_todo_cuando_")}
+            detalle = sum(sz for n, sz in rows if n in nombres or n in idx or n in tbl_idx)
+        except sqlite3.OperationalError:
+            pass  # SQLite sin dbstat
+    finally:
+        conn.close()
+    return os.path.getsize(db), detalle
+
+def latencias(db: Path, nombres, desde: str, repeat: int):
+    conn = sqlite3.connect(db)
+    full, recent = [], []
+    try:
+        for _ in range(repeat):
+            for n in nombres:
+                t0 = time.perf_counter()
+                conn.execute(f'SELECT * FROM "{n}"').fetchall()
+                t1 = time.perf_counter()
+                conn.execute(f'SELECT * FROM "{n}" WHERE fecha >= ?', (desde,)).fetchall()
+                t2 = time.perf_counter()
+                full.append((t1 - t0) * 1000)
+                recent.append((t2 - t1) * 1000)
+    finally:
+        conn.close()
+    return full, recent
+
+def p95(xs):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * 0.95))]
+
+def mb(n):
+    return "-" if n is None else f"{n / 1e6:.2f}"
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True, help="BD con matriz_astro_luna y cuando_* / todo_cuando_*")
+    ap.add_argument("--scale", type=int, default=1, help="Veces que se repiten las filas de la matriz")
+    ap.add_argument("--repeat", type=int, default=3, help="Pasadas de consultas por modo")
+    ap.add_argument("--dias", type=int, default=90, help="Ventana de la consulta 'reciente'")
+    ap.add_argument("--tmp", help="Carpeta de trabajo (por defecto una temporal que se borra al final)")
+    args = ap.parse_args()
+
+    work = Path(args.tmp) if args.tmp else Path(tempfile.mkdtemp(prefix="bench_cuando_virtual_"))
+    work.mkdir(parents=True, exist_ok=True)
+    fis_db, vir_db = work / "fisico.db", work / "virtual.db"
+    try:
+        shutil.copyfile(args.db, fis_db)
+        conn = sqlite3.connect(fis_db)
+        try:
+            if not orq.table_exists(conn, orq.MATRIX_TABLE):
+                raise SystemExit(f"[ERROR] {args.db}: no existe {orq.MATRIX_TABLE}.")
+            cv.to_physical(conn)
+            if args.scale > 1:
+                escalar(conn, args.scale)
+            nombres = [n for n, _ in cv.cuando_objects(conn)]
+            if not nombres:
+                raise SystemExit("[ERROR] No hay tablas cuando_* / todo_cuando_*.")
+            filas = orq.count_rows(conn, orq.MATRIX_TABLE)
+            desde = conn.execute(f"SELECT date(MAX(fecha), '-{args.dias} days') FROM \"{orq.MATRIX_TABLE}\"").fetchone()[0]
+            t0 = time.perf_counter()
+            orq.rebuild_derived_single_pass(conn, nombres)
+            t_fis = time.perf_counter() - t0
+        finally:
+            conn.close()
+        shutil.copyfile(fis_db, vir_db)
+        conn = sqlite3.connect(vir_db)
+        try:
+            cv.to_virtual(conn)
+            with orq.tx(conn):
+                cv.drop_query_indexes(conn)
+            t0 = time.perf_counter()
+            with orq.tx(conn):
+                cv.ensure_query_indexes(conn)
+            t_vir = time.perf_counter() - t0
+        finally:
+            conn.close()
+        print(f"[INFO] matriz: {filas} filas | objetos cuando: {len(nombres)} | reciente: fecha >= {desde}")
+
+        a, b = sqlite3.connect(fis_db), sqlite3.connect(vir_db)
+        try:
+            distintas = [n for n in nombres if contenido(a, n) != contenido(b, n)]
+        finally:
+            a.close()
+            b.close()
+
+        res = {}
+        for modo, db, t_reb in (("físico", fis_db, t_fis), ("virtual", vir_db, t_vir)):
+            size, det = tamanos(db)
+            full, recent = latencias(db, nombres, desde, args.repeat)
+            res[modo] = (size, det, t_reb, full, recent)
+        print(f"{'modo':<9}{'archivo MB':>11}{'cuando MB':>11}{'reconstr. s':>13}"
+              f"{'todo p50':>10}{'todo p95':>10}{'rec. p50':>10}{'rec. p95':>10}   (consultas en ms)")
+        for modo, (size, det, t_reb, full, recent) in res.items():
+            print(f"{modo:<9}{mb(size):>11}{mb(det):>11}{t_reb:>13.2f}{statistics.median(full):>10.2f}"
+                  f"{p95(full):>10.2f}{statistics.median(recent):>10.2f}{p95(recent):>10.2f}")
+        if distintas:
+            print(f"[ERROR] {len(distintas)} objetos con filas distintas: {', '.join(distintas[:10])}")
+        else:
+            print(f"[OK] Mismas filas en los {len(nombres)} objetos en ambos modos.")
+    finally:
+        if not args.tmp:
+            shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+bench_derivadas.py — Compara la reconstrucción completa de las tablas derivadas de matriz_astro_luna
+(cuando_*, todo_cuando_*, *_resumen_matriz_aslu, todos_cuando_son) tabla por tabla (un DELETE + INSERT ... SELECT
+por tabla, lo que hace orquestador_astroluna_v6.py por defecto) contra el router de una pasada
+(rebuild_derived_single_pass, con --una-pasada).
+Trabaja sobre dos copias de --db (la original no se toca); con --scale repite las filas de la matriz para
+simular una matriz más grande. Verifica que ambas versiones dejen las mismas filas en cada tabla y muestra tiempos.
+Uso:
+  python bench_derivadas.py --db "C:\\RadarPremios\\radar_premios.db"
+  python bench_derivadas.py --db "C:\\RadarPremios\\radar_premios.db" --scale 20 --repeat 3
+"""
+import argparse, shutil, sqlite3, tempfile, time
+from pathlib import Path
+
+import orquestador_astroluna_v6 as orq
+
+def derived_tables(conn):
+    return [name for name, otype in orq.get_objects(conn) if otype == "table" and orq.is_derived(name)]
+
+def escalar(conn, scale: int):
+    # repite las filas originales de la matriz 'scale' veces en total
+    cols = ", ".join(f'"{c[1]}"' for c in orq.get_cols(conn, orq.MATRIX_TABLE))
+    n0 = conn.execute(f'SELECT MAX(rowid) FROM "{orq.MATRIX_TABLE}"').fetchone()[0] or 0
+    with orq.tx(conn):
+        for _ in range(scale - 1):
+            conn.execute(f'INSERT INTO "{orq.MATRIX_TABLE}" ({cols}) SELECT {cols} FROM "{orq.MATRIX_TABLE}" '
+                         f'WHERE rowid <= ?', (n0,))
+
+def por_tabla(conn, tables):
+    # recorrido anterior: una lectura de la matriz por tabla destino
+    for t in tables:
+        if t == "todos_cuando_son":
+            orq.rebuild_todos_cuando_son(conn, t, False)
+        elif orq.is_todo_cuando(t):
+            orq.rebuild_todo_cuando_table(conn, t, False)
+        elif orq.RE_CUANDO.match(t):
+            orq.rebuild_cuando_table(conn, t, False)
+        else:
+            orq.rebuild_resumen_table(conn, t, False)
+
+def contenido(conn, table):
+    # multiconjunto de filas (el orden físico de todos_cuando_son difiere entre versiones)
+    return sorted(conn.execute(f'SELECT * FROM "{table}"').fetchall(), key=repr)
+
+def medir(db: Path, fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        conn = sqlite3.connect(db)
+        conn.row_factory = sqlite3.Row
+        try:
+            tables = derived_tables(conn)
+            t0 = time.perf_counter()
+            fn(conn, tables)
+            dt = time.perf_counter() - t0
+        finally:
+            conn.close()
+        best = dt if best is None else min(best, dt)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True, help="BD con matriz_astro_luna y sus tablas derivadas")
+    ap.add_argument("--scale", type=int, default=1, help="Veces que se repiten las filas de la matriz")
+    ap.add_argument("--repeat", type=int, default=1, help="Corridas por versión (se toma la mejor)")
+    ap.add_argument("--tmp", help="Carpeta de trabajo (por defecto una temporal que se borra al final)")
+    args = ap.parse_args()
+
+    work = Path(args.tmp) if args.tmp else Path(tempfile.mkdtemp(prefix="bench_derivadas_"))
+    work.mkdir(parents=True, exist_ok=True)
+    old_db, new_db = work / "por_tabla.db", work / "una_pasada.db"
+    try:
+        shutil.copyfile(args.db, old_db)
+        conn = sqlite3.connect(old_db)
+        try:
+            if not orq.table_exists(conn, orq.MATRIX_TABLE):
+                raise SystemExit(f"[ERROR] {args.db}: no existe {orq.MATRIX_TABLE}.")
+            if args.scale > 1:
+                escalar(conn, args.scale)
+            filas = orq.count_rows(conn, orq.MATRIX_TABLE)
+            tables = derived_tables(conn)
+        finally:
+            conn.close()
+        shutil.copyfile(old_db, new_db)
+        print(f"[INFO] matriz: {filas} filas | tablas derivadas: {len(tables)}")
+
+        t_old = medir(old_db, por_tabla, args.repeat)
+        t_new = medir(new_db, orq.rebuild_derived_single_pass, args.repeat)
+
+        a, b = sqlite3.connect(old_db), sqlite3.connect(new_db)
+        try:
+            distintas = [t for t in tables if contenido(a, t) != contenido(b, t)]
+        finally:
+            a.close()
+            b.close()
+        print(f"{'versión':<16}{'s':>10}")
+        print(f"{'tabla por tabla':<16}{t_old:>10.2f}")
+        print(f"{'una pasada':<16}{t_new:>10.2f}")
+        print(f"[INFO] speedup x{t_old / t_new:.1f}")
+        if distintas:
+            print(f"[ERROR] {len(distintas)} tablas con contenido distinto: {', '.join(distintas[:10])}")
+        else:
+            print(f"[OK] Contenido idéntico en las {len(tables)} tablas.")
+    finally:
+        if not args.tmp:
+            shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
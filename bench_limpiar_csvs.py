@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+bench_limpiar_csvs.py — Compara la limpieza anterior de limpiar_csvs.py (sep=None + parser Python +
+applymap por celda) contra la actual (sniff + parser C por bloques + .str.strip por columna).
+Escala los CSV de --src (por defecto los que vienen junto al script) repitiendo sus filas --scale veces,
+limpia cada archivo con ambas versiones, verifica que la salida sea idéntica byte a byte y muestra tiempos.
+Uso:
+  python bench_limpiar_csvs.py --scale 1000
+  python bench_limpiar_csvs.py --scale 100 --files astro_luna.csv,boyaca.csv --engine pyarrow
+"""
+import argparse, csv, shutil, tempfile, time
+from pathlib import Path
+
+import pandas as pd
+
+import limpiar_csvs
+
+def limpiar_anterior(origen: Path, destino: Path):
+    # implementación previa, tal cual (DataFrame.map es el nombre nuevo de applymap en pandas >= 2.1)
+    df = pd.read_csv(origen, sep=None, engine="python", encoding="utf-8", dtype=str)
+    per_cell = getattr(df, "map", None) or df.applymap
+    df = per_cell(lambda x: x.strip() if isinstance(x, str) else x)
+    df = df.dropna(how="all")
+    df.to_csv(destino, index=False, encoding="utf-8-sig", quoting=csv.QUOTE_NONNUMERIC)
+
+def escalar(origen: Path, destino: Path, scale: int):
+    # encabezado una vez + cuerpo repetido 'scale' veces
+    with open(origen, "r", encoding="utf-8-sig", newline="") as f:
+        header = f.readline()
+        body = f.read()
+    if body and not body.endswith("\n"):
+        body += "\n"
+    with open(destino, "w", encoding="utf-8", newline="") as f:
+        f.write(header)
+        for _ in range(scale):
+            f.write(body)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default=str(Path(__file__).resolve().parent), help="Carpeta con los CSV base")
+    ap.add_argument("--files", help="Lista de CSV a usar (coma); por defecto todos los de --src")
+    ap.add_argument("--scale", type=int, default=1000, help="Veces que se repiten las filas de cada CSV")
+    ap.add_argument("--engine", choices=("c", "pyarrow"), default="c")
+    ap.add_argument("--skip-old", action="store_true", help="Solo mide la versión actual")
+    ap.add_argument("--tmp", help="Carpeta de trabajo (por defecto una temporal que se borra al final)")
+    args = ap.parse_args()
+
+    src = Path(args.src)
+    names = [n.strip() for n in args.files.split(",")] if args.files else sorted(p.name for p in src.glob("*.csv"))
+    work = Path(args.tmp) if args.tmp else Path(tempfile.mkdtemp(prefix="bench_limpiar_"))
+    work.mkdir(parents=True, exist_ok=True)
+    tot_old = tot_new = 0.0
+    try:
+        print(f"{'archivo':<28}{'MB':>9}{'anterior s':>12}{'actual s':>10}{'x':>8}  salida")
+        for name in names:
+            base = src / name
+            if not base.exists():
+                print(f"[SKIP] {name}: no existe")
+                continue
+            big = work / name
+            escalar(base, big, args.scale)
+            mb = big.stat().st_size / 1e6
+
+            t0 = time.perf_counter()
+            ok = limpiar_csvs.procesar_archivo(big, work / f"new_{name}", args.engine)
+            t_new = time.perf_counter() - t0
+            if not ok:
+                continue
+            tot_new += t_new
+            if args.skip_old:
+                print(f"{name:<28}{mb:>9.1f}{'-':>12}{t_new:>10.2f}")
+                continue
+            t0 = time.perf_counter()
+            limpiar_anterior(big, work / f"old_{name}")
+            t_old = time.perf_counter() - t0
+            tot_old += t_old
+            same = (work / f"old_{name}").read_bytes() == (work / f"new_{name}").read_bytes()
+            print(f"{name:<28}{mb:>9.1f}{t_old:>12.2f}{t_new:>10.2f}{t_old / t_new:>8.1f}  "
+                  f"{'idéntica' if same else 'DIFERENTE'}")
+        if tot_new and tot_old:
+            print(f"{'total':<28}{'':>9}{tot_old:>12.2f}{tot_new:>10.2f}{tot_old / tot_new:>8.1f}")
+    finally:
+        if not args.tmp:
+            shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,11 @@ cargar_combos_en_figuras.py (versión robusta)
 - Guarda:
    • todo_fig_numeros.xlsx
    • todo_map.xlsx / todo_map.csv
+- Opcional: --scorer-url consulta scoring_service.py y agrega score/rank de cada combinación al mapa.
 """
 
-import sys, csv, argparse, random
+import sys, csv, argparse, random, json
+from urllib.request import Request, urlopen
 from pathlib import Path
 
 try:
@@ -244,9 +246,19 @@ def save_figs_xlsx(figs_dict, headers, cols_idx, path_out: Path):
 
     wb.save(path_out)
 
-def write_map(map_rows, xlsx_out: Path, csv_out: Path):
+def fetch_scores(url: str, combos_4d):
+    """POST /score al servicio de scoring; devuelve {numero: (score, rank)}."""
+    body = json.dumps({"numeros": sorted(set(combos_4d))}).encode("utf-8")
+    req = Request(url.rstrip("/") + "/score", data=body, headers={"Content-Type": "application/json"})
+    with urlopen(req, timeout=30) as resp:
+        data = json.loads(resp.read().decode("utf-8"))
+    return {r["numero"]: (r["score"], r["rank"]) for r in data["rows"]}
+
+def write_map(map_rows, xlsx_out: Path, csv_out: Path, with_score=False):
     wb=Workbook(); ws=wb.active; ws.title="map"
     headers=["fig","combinacion","signo1","signo2","signo3"]
+    if with_score:
+        headers += ["score","rank"]
     for j,h in enumerate(headers, start=1): ws.cell(1,j).value=h
     for i,row in enumerate(map_rows, start=2):
         for j,val in enumerate(row, start=1):
@@ -267,6 +279,8 @@ def main():
     ap.add_argument("--map-xlsx", default=MAP_XLSX_OUT, help="Mapa Excel figura↔combinación.")
     ap.add_argument("--map-csv", default=MAP_CSV_OUT, help="Mapa CSV figura↔combinación.")
     ap.add_argument("--aleatorio", action="store_true", help="Asignación aleatoria de combinaciones a figuras.")
+    ap.add_argument("--scorer-url", default=None, help="URL de scoring_service.py (ej. http://127.0.0.1:8765) para agregar score/rank.")
+    ap.add_argument("--ordenar-por-score", action="store_true", help="Con --scorer-url: asigna primero las combinaciones de mejor score.")
     args = ap.parse_args()
 
     fig_path = Path(args.fig)
@@ -295,6 +309,16 @@ def main():
         digs = [ch for ch in c if ch.isdigit()]
         return (digs + ["0","0","0","0"])[:4]
 
+    scores = {}
+    if args.scorer_url:
+        try:
+            scores = fetch_scores(args.scorer_url, ["".join(split_digits(c[0])) for c in combos])
+            print(f"📈 Scores recibidos: {len(scores)} ({args.scorer_url})")
+        except Exception as e:
+            print(f"❌ No se pudo consultar el servicio de scoring: {e}"); sys.exit(1)
+        if args.ordenar_por_score:
+            combos.sort(key=lambda t: scores["".join(split_digits(t[0]))][1])
+
     # Asignación
     pairs = list(zip(figs_ids, combos))
     if args.aleatorio:
@@ -308,11 +332,15 @@ def main():
         digs = split_digits(comb)
         new_blk = place_digits_in_block(figs[fig], digs)
         fig_num_blocks[fig] = new_blk
-        map_rows.append([fig, comb, s1, s2, s3])
+        row = [fig, comb, s1, s2, s3]
+        if scores:
+            sc, rk = scores["".join(digs)]
+            row += [round(sc, 6), rk]
+        map_rows.append(row)
 
     # Guardar
     save_figs_xlsx(fig_num_blocks, headers, cols_idx, Path(args.out))
-    write_map(map_rows, Path(args.map_xlsx), Path(args.map_csv))
+    write_map(map_rows, Path(args.map_xlsx), Path(args.map_csv), with_score=bool(scores))
 
     print("✅ Proceso completo.")
     print(f"   Figuras con números: {args.out}")
@@ -1,5 +1,17 @@
 # -*- coding: utf-8 -*-
-import argparse, csv, hashlib, os, sqlite3, sys
+import argparse, csv, datetime, io, json, os, queue, re, shutil, sqlite3, sys, tempfile, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from itertools import chain, islice
+
+from column_types import (SAMPLE_ROWS, apply_overrides, coerce_row, coercers_for, declared_types,
+                          infer_types, load_overrides)
+from create_unique_indexes import create_supporting_indexes
+from ingest_manifest import ensure_manifest, plan_file, save_entry, scan_file
+from last_seen import ensure_last_seen
+from row_dedup import (MODES, choose_mode, ensure_dedup_index, ensure_dedup_table, fingerprint_fn, get_mode,
+                       rowhash_type, set_mode, sha1_fp)
 
 def log(msg):
     print(msg, flush=True)
@@ -18,37 +30,60 @@ def sniff_delimiter(sample_bytes):
         return ';'
     return ','
 
-def read_rows(csv_path):
-    # Abre en binario para sniff, luego reabre en texto con el delimitador correcto
+CHUNK_ROWS = 5000  # filas por executemany; la memoria queda acotada a un bloque, no al CSV completo
+
+def open_csv(csv_path, start=0):
+    # Abre en binario para sniff, luego reabre en texto con el delimitador correcto.
+    # Devuelve (archivo, headers, reader); headers vacío si el CSV no tiene filas.
+    # start > 0: el reader arranca en ese byte (inicio de línea) en vez de tras el encabezado.
     with open(csv_path, 'rb') as fb:
         sample = fb.read(4096) or b''
     delim = sniff_delimiter(sample)
-    # Relee en texto
-    with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+    f = open(csv_path, 'r', encoding='utf-8-sig', newline='')
+    reader = csv.reader(f, delimiter=delim)
+    first = next(reader, None)
+    # Normaliza encabezados: strip espacios
+    headers = [h.strip() for h in first] if first else []
+    if start and headers:
+        f.close()
+        fb = open(csv_path, 'rb')
+        fb.seek(start)
+        f = io.TextIOWrapper(fb, encoding='utf-8', newline='')
         reader = csv.reader(f, delimiter=delim)
-        rows = list(reader)
+    return f, headers, reader
 
-    if not rows:
-        return [], []
-
-    # Normaliza encabezados: strip espacios
-    headers = [h.strip() for h in rows[0]]
-    data = []
-    for r in rows[1:]:
+def iter_rows(reader, n_cols, strip=True):
+    # Fila a fila (sin materializar el archivo). strip=False deja los valores crudos (los limpia 'clean')
+    for r in reader:
         # Asegura longitud = headers (rellena con vacío o recorta)
-        if len(r) < len(headers):
-            r = r + [''] * (len(headers) - len(r))
-        elif len(r) > len(headers):
-            r = r[:len(headers)]
-        data.append([ (v.strip() if isinstance(v, str) else v) for v in r ])
-    return headers, data
-
-def ensure_table(conn, table, headers):
-    # Crea tabla si no existe, añade columnas faltantes, añade _rowhash y su índice único.
+        if len(r) < n_cols:
+            r = r + [''] * (n_cols - len(r))
+        elif len(r) > n_cols:
+            r = r[:n_cols]
+        yield [ (v.strip() if isinstance(v, str) else v) for v in r ] if strip else r
+
+def read_rows(csv_path):
+    # Compat: versión materializada (headers, data) para usos puntuales/pequeños
+    f, headers, reader = open_csv(csv_path)
+    with f:
+        if not headers:
+            return [], []
+        return headers, list(iter_rows(reader, len(headers)))
+
+def table_exists(conn, table):
     cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?;", (table,))
-    exists = cur.fetchone() is not None
+    return cur.fetchone() is not None
+
+def ensure_table(conn, table, headers, types=None, dedup=("sha1", None), index=True):
+    # Crea tabla si no existe, añade columnas faltantes y el índice único de deduplicación.
+    # types: {columna: INTEGER|REAL|DATE|TEXT} para columnas nuevas (default TEXT)
+    # dedup: (modo, key_cols) de row_dedup; sha1/hash64 usan _rowhash, key usa la clave natural
+    # index=False: sin índice (--bootstrap lo crea después de cargar)
+    types = types or {}
+    mode, key_cols = dedup
+    exists = table_exists(conn, table)
     if not exists:
-        cols_sql = ", ".join('"{}" TEXT'.format(h) for h in headers)
+        cols_sql = ", ".join('"{}" {}'.format(h, types.get(h, "TEXT")) for h in headers)
         sql = f'CREATE TABLE "{table}" ({cols_sql});'
         conn.execute(sql)
 
@@ -59,81 +94,531 @@ def ensure_table(conn, table, headers):
     # Añade columnas faltantes
     for h in headers:
         if h not in present:
-            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{h}" TEXT;')
-    # Asegura _rowhash
+            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{h}" {types.get(h, "TEXT")};')
+    # Asegura _rowhash (salvo dedup por clave natural)
     cur = conn.execute(f'PRAGMA table_info("{table}");')
     present = {row[1] for row in cur.fetchall()}
-    if "_rowhash" not in present:
-        conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "_rowhash" TEXT;')
-    # Índice único para deduplicar por hash
-    conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{table}__rowhash" ON "{table}"(_rowhash);')
-
-def row_hash(values):
-    # Junta con separador que no aparece en números por lo general
-    joined = "\u241F".join([str(v) if v is not None else "" for v in values])
-    return hashlib.sha1(joined.encode('utf-8', errors='ignore')).hexdigest()
-
-def upsert_rows(conn, table, headers, data):
-    if not data:
-        return 0, 0
+    if mode != "key" and "_rowhash" not in present:
+        conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "_rowhash" {rowhash_type(mode)};')
+    # Índice único para deduplicar (hash o clave natural)
+    if index:
+        ensure_dedup_index(conn, table, mode, key_cols)
+
+def table_dedup(conn, table, headers=None, wanted=None):
+    # estrategia fija de la tabla (ingest_dedup / tipo de _rowhash); tablas nuevas toman la pedida (default sha1).
+    # headers=None: solo consulta la de una tabla existente (None si no hay)
+    current = get_mode(conn, table) if table_exists(conn, table) else None
+    if current is None:
+        return choose_mode(table, headers, wanted or "sha1") if headers is not None else None
+    if wanted and current[0] != wanted:
+        log(f'[INFO] {table}: dedup={current[0]} (fijado en la tabla; para cambiarlo: row_dedup.py --to {wanted})')
+    return current
+
+def upsert_rows(conn, table, headers, data, chunk_size=CHUNK_ROWS, coercers=None, fp=sha1_fp, keep=None):
+    # data: cualquier iterable de filas (lista o generador); se inserta por bloques de chunk_size.
+    # coercers: conversión por columna (column_types).
+    # fp(raw, coerced): valor de _rowhash (row_dedup.fingerprint_fn); None = dedup por clave natural, sin columna.
+    # En sha1 el hash va sobre el texto crudo: una recarga del mismo CSV deduplica contra filas cargadas antes de tipar.
+    # Devuelve (insertadas, ignoradas, rechazadas). Las insertadas salen del rowcount de cada executemany
+    # (cambios directos del INSERT, sin contar los del trigger de last_seen): no hace falta COUNT(*) de la tabla.
+    # Rechazadas: filas completamente vacías (líneas en blanco), no se insertan.
+    # keep(tupla) -> bool: filtro previo (bootstrap: duplicados descartados en memoria, cuentan como ignoradas).
     # Inserta con OR IGNORE para respetar cualquier UNIQUE existente y nuestro _rowhash
-    cols = ', '.join('"{}"'.format(h) for h in headers)
-    placeholders = ', '.join(['?'] * (len(headers) + 1))  # +1 por _rowhash
-    sql = f'INSERT OR IGNORE INTO "{table}" ({cols}, "_rowhash") VALUES ({placeholders});'
-
-    to_insert = []
-    for r in data:
-        h = row_hash(r)
-        to_insert.append(tuple(r + [h]))
-    cur_before = conn.execute(f'SELECT COUNT(1) FROM "{table}";').fetchone()[0]
-    conn.executemany(sql, to_insert)
-    cur_after = conn.execute(f'SELECT COUNT(1) FROM "{table}";').fetchone()[0]
-    inserted = cur_after - cur_before
-    ignored = len(to_insert) - inserted
-    return inserted, ignored
-
-def process_dir(db_path, src_dir):
-    total_ins = total_ign = 0
-    with sqlite3.connect(db_path) as conn:
-        conn.execute('PRAGMA journal_mode = WAL;')
-        conn.execute('PRAGMA synchronous = NORMAL;')
-        conn.execute('PRAGMA temp_store = MEMORY;')
-        for root, _, files in os.walk(src_dir):
-            for fn in sorted(files):
-                if not fn.lower().endswith('.csv'):
+    sql = insert_sql(table, headers, with_hash=fp is not None)
+
+    it = iter(data)
+    inserted = ignored = rejected = 0
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            break
+        good = [r for r in chunk if any(v != '' for v in r)]
+        rejected += len(chunk) - len(good)
+        if not good:
+            continue
+        params = build_params(good, coercers, fp)
+        if keep is not None:
+            params = [p for p in params if keep(p)]
+        cur = conn.executemany(sql, params)
+        inserted += cur.rowcount
+        ignored += len(good) - cur.rowcount
+    return inserted, ignored, rejected
+
+def iter_csv_files(src_dir, tables=None):
+    # tables: solo los CSV cuya tabla destino está en la lista (None = todos)
+    for root, _, files in os.walk(src_dir):
+        for fn in sorted(files):
+            if fn.lower().endswith('.csv'):
+                path = os.path.join(root, fn)
+                if tables is None or safe_table_name(path) in tables:
+                    yield path
+
+def new_stat(table, csv_path):
+    return {"table": table, "file": csv_path, "mode": None, "inserted": 0, "ignored": 0,
+            "rejected": 0, "elapsed_s": 0.0, "error": None}
+
+def connect_db(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = WAL;')
+    conn.execute('PRAGMA synchronous = NORMAL;')
+    conn.execute('PRAGMA temp_store = MEMORY;')
+    ensure_manifest(conn)
+    ensure_dedup_table(conn)
+    conn.commit()
+    return conn
+
+def plan_or_skip(conn, csv_path, table, full, st_row):
+    # manifiesto: devuelve el plan si hay que leer el archivo, None si se omite (skip/touch)
+    plan = plan_file(conn, csv_path, table, full)
+    mode, _, st, sha1, offset = plan
+    st_row["mode"] = mode
+    if mode == 'skip':
+        log(f'[SKIP] {table}: sin cambios')
+        return None
+    if mode == 'touch':
+        save_entry(conn, csv_path, table, st, sha1, offset)
+        conn.commit()
+        log(f'[SKIP] {table}: sin cambios de contenido (solo mtime)')
+        return None
+    return plan
+
+def log_loaded(st_row, start):
+    desde = f' desde byte {start}' if st_row["mode"] == 'append' else ''
+    rej = st_row["rejected"]
+    rechazo = f', rechazadas: {rej}' if rej else ''
+    log(f'[OK ] {st_row["table"]}: +{st_row["inserted"]} filas (omitidas: {st_row["ignored"]}{rechazo}){desde}')
+
+def read_table_rows(csv_path, reader, headers, start, clean=None):
+    # filas normalizadas del archivo; clean(csv_path, headers, filas_crudas, start) -> filas limpias
+    # (ingest.py: reglas de limpiar_csvs.py aplicadas al vuelo sobre los CSV crudos)
+    rows = iter_rows(reader, len(headers), strip=clean is None)
+    return clean(csv_path, headers, rows, start) if clean is not None else rows
+
+def process_dir(db_path, src_dir, chunk_size=CHUNK_ROWS, full=False, overrides=None, workers=1, dedup=None,
+                clean=None, tables=None):
+    """Carga todos los CSV de src_dir. Devuelve la lista de stats por archivo (ver load report).
+    workers > 1: modo pipeline (parseo en procesos, un solo escritor), ver process_dir_parallel.
+    dedup: estrategia para tablas nuevas (row_dedup.MODES; None = sha1); las existentes conservan la suya.
+    clean: transformación de filas crudas (ver read_table_rows); en modo pipeline debe ser picklable.
+    tables: limitar la carga a esas tablas (ver iter_csv_files)."""
+    if workers > 1:
+        return process_dir_parallel(db_path, src_dir, chunk_size, full, overrides, workers, dedup, clean, tables)
+    stats = []
+    with connect_db(db_path) as conn:
+        for csv_path in iter_csv_files(src_dir, tables):
+            table = safe_table_name(csv_path)
+            st_row = new_stat(table, csv_path)
+            stats.append(st_row)
+            t0 = time.perf_counter()
+            try:
+                plan = plan_or_skip(conn, csv_path, table, full, st_row)
+                if plan is None:
                     continue
-                csv_path = os.path.join(root, fn)
-                table = safe_table_name(csv_path)
+                mode, start, st, sha1, offset = plan
+                f, headers, reader = open_csv(csv_path, start)
+                with f:
+                    if not headers:
+                        st_row["mode"] = 'empty'
+                        log(f'[WARN] {table}: CSV vacío, omitido.')
+                        continue
+                    rows = read_table_rows(csv_path, reader, headers, start, clean)
+                    types = None
+                    if not table_exists(conn, table):
+                        # tabla nueva: tipos inferidos de una muestra (+ overrides)
+                        sample = list(islice(rows, SAMPLE_ROWS))
+                        types = apply_overrides(table, infer_types(headers, sample), overrides)
+                        rows = chain(sample, rows)
+                    dd = table_dedup(conn, table, headers, dedup)
+                    prepare_table(conn, table, headers, types, dd)
+                    declared = declared_types(conn, table)
+                    ins, ign, rej = upsert_rows(conn, table, headers, rows, chunk_size,
+                                                coercers_for(declared, headers),
+                                                fingerprint_fn(dd[0], headers, declared))
+                save_entry(conn, csv_path, table, st, sha1, offset)
+                conn.commit()
+                st_row.update(inserted=ins, ignored=ign, rejected=rej)
+                log_loaded(st_row, start)
+            except Exception as ex:
+                conn.rollback()
+                st_row["error"] = str(ex)
+                log(f'[ERR] {table}: {ex}')
+                # No re-levantar: permite continuar con otros archivos
+            finally:
+                st_row["elapsed_s"] = round(time.perf_counter() - t0, 4)
+    return stats
+
+def prepare_table(conn, table, headers, types=None, dedup=("sha1", None)):
+    ensure_table(conn, table, headers, types, dedup)
+    set_mode(conn, table, *dedup)
+    if table == 'astro_luna':
+        # trigger de recencia: se mantiene solo con las filas que de verdad se insertan
+        ensure_last_seen(conn)
+
+def insert_sql(table, headers, with_hash=True):
+    cols = [f'"{h}"' for h in headers] + (['"_rowhash"'] if with_hash else [])
+    placeholders = ', '.join(['?'] * len(cols))
+    return f'INSERT OR IGNORE INTO "{table}" ({", ".join(cols)}) VALUES ({placeholders});'
+
+def build_params(rows, coercers, fp):
+    # tuplas listas para executemany: valores tipados (+ _rowhash si la estrategia lo usa)
+    typed = coercers is not None and any(coercers)
+    out = []
+    for r in rows:
+        c = coerce_row(r, coercers) if typed else r
+        out.append(tuple(c) if fp is None else tuple(c + [fp(r, c)]))
+    return out
+
+# -------------- modo pipeline (--workers N) --------------
+QUEUE_CHUNKS_PER_WORKER = 4   # bloques en vuelo por worker (cola acotada: memoria acotada)
+BATCH_CHUNKS = 20             # bloques por transacción del escritor
+
+_queue = None
+
+def _init_parser(q):
+    global _queue
+    _queue = q
+
+def _parse_job(job):
+    """Worker: lee, normaliza, tipa y hashea un CSV; manda a la cola mensajes
+    ('start', path, headers, types, dedup) / ('rows', path, [tuplas], rechazadas) / ('done', path) / ('error', path, msg)."""
+    csv_path, table, start, chunk_size, known_types, overrides, known_dedup, wanted, clean = job
+    try:
+        f, headers, reader = open_csv(csv_path, start)
+        with f:
+            if not headers:
+                _queue.put(('start', csv_path, [], None, None))
+                _queue.put(('done', csv_path))
+                return
+            rows = read_table_rows(csv_path, reader, headers, start, clean)
+            types = known_types
+            if types is None:
+                sample = list(islice(rows, SAMPLE_ROWS))
+                types = apply_overrides(table, infer_types(headers, sample), overrides)
+                rows = chain(sample, rows)
+            dd = known_dedup or choose_mode(table, headers, wanted or "sha1")
+            _queue.put(('start', csv_path, headers, types, dd))
+            coercers = coercers_for(types, headers)
+            fp = fingerprint_fn(dd[0], headers, types)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                good = [r for r in chunk if any(v != '' for v in r)]
+                _queue.put(('rows', csv_path, build_params(good, coercers, fp), len(chunk) - len(good)))
+        _queue.put(('done', csv_path))
+    except Exception as ex:
+        _queue.put(('error', csv_path, f'{type(ex).__name__}: {ex}'))
+
+def process_dir_parallel(db_path, src_dir, chunk_size=CHUNK_ROWS, full=False, overrides=None, workers=2,
+                         dedup=None, clean=None, tables=None):
+    """Parseo/limpieza/hash de cada CSV en un pool de procesos; este hilo es el único escritor y vacía una
+    cola acotada en SQLite con transacciones de BATCH_CHUNKS bloques (varios archivos por transacción).
+    La entrada del manifiesto de un archivo se graba en la transacción que contiene su último bloque;
+    si un archivo falla a mitad, sus filas ya escritas quedan (la próxima carga lo relee y _rowhash deduplica)."""
+    stats = []
+    with connect_db(db_path) as conn:
+        jobs, pending = [], {}
+        for csv_path in iter_csv_files(src_dir, tables):
+            table = safe_table_name(csv_path)
+            st_row = new_stat(table, csv_path)
+            stats.append(st_row)
+            try:
+                plan = plan_or_skip(conn, csv_path, table, full, st_row)
+            except Exception as ex:
+                st_row["error"] = str(ex)
+                log(f'[ERR] {table}: {ex}')
+                continue
+            if plan is None:
+                continue
+            # tipos: los declarados si la tabla existe; si no, los infiere el worker
+            known = declared_types(conn, table) if table_exists(conn, table) else None
+            pending[csv_path] = {"stat": st_row, "plan": plan, "t0": time.perf_counter(), "sql": None}
+            jobs.append((csv_path, table, plan[1], chunk_size, known, overrides, table_dedup(conn, table, None, dedup),
+                         dedup, clean))
+        if not jobs:
+            return stats
+
+        q = mp.Queue(maxsize=max(2, workers * QUEUE_CHUNKS_PER_WORKER))
+        open_files = len(jobs)
+        batch = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_parser, initargs=(q,)) as ex:
+            futures = [ex.submit(_parse_job, j) for j in jobs]
+            while open_files:
+                try:
+                    msg = q.get(timeout=1.0)
+                except queue.Empty:
+                    if all(fu.done() for fu in futures) and q.empty():
+                        # un worker murió sin avisar: lo que quede pendiente es error
+                        for path, p in pending.items():
+                            if p["stat"]["error"] is None and "done" not in p:
+                                p["stat"]["error"] = "worker terminó sin completar el archivo"
+                                log(f'[ERR] {p["stat"]["table"]}: worker terminó sin completar el archivo')
+                        break
+                    continue
+                kind, path = msg[0], msg[1]
+                p = pending[path]
+                st_row = p["stat"]
+                table = st_row["table"]
                 try:
-                    headers, data = read_rows(csv_path)
+                    if kind == 'start':
+                        headers, types, dd = msg[2], msg[3], msg[4]
+                        if not headers:
+                            st_row["mode"] = 'empty'
+                            log(f'[WARN] {table}: CSV vacío, omitido.')
+                            continue
+                        prepare_table(conn, table, headers, types, dd)
+                        p["sql"] = insert_sql(table, headers, with_hash=dd[0] != 'key')
+                    elif kind == 'rows':
+                        rows, rej = msg[2], msg[3]
+                        st_row["rejected"] += rej
+                        if rows and p["sql"] is not None:
+                            cur = conn.executemany(p["sql"], rows)
+                            st_row["inserted"] += cur.rowcount
+                            st_row["ignored"] += len(rows) - cur.rowcount
+                        batch += 1
+                        if batch >= BATCH_CHUNKS:
+                            conn.commit()
+                            batch = 0
+                    elif kind == 'done':
+                        p["done"] = True
+                        open_files -= 1
+                        # con error de escritura el archivo quedó incompleto: sin entrada en el manifiesto,
+                        # la próxima carga lo relee (lo ya insertado lo descarta la deduplicación)
+                        if st_row["mode"] != 'empty' and not st_row.get("error"):
+                            _, start, st, sha1, offset = p["plan"]
+                            save_entry(conn, path, table, st, sha1, offset)
+                            log_loaded(st_row, start)
+                        st_row["elapsed_s"] = round(time.perf_counter() - p["t0"], 4)
+                    elif kind == 'error':
+                        p["done"] = True
+                        open_files -= 1
+                        st_row["error"] = msg[2]
+                        st_row["elapsed_s"] = round(time.perf_counter() - p["t0"], 4)
+                        log(f'[ERR] {table}: {msg[2]}')
+                except Exception as exc:
+                    # error de escritura: se marca el archivo; sus bloques restantes se descartan
+                    st_row["error"] = str(exc)
+                    p["sql"] = None
+                    log(f'[ERR] {table}: {exc}')
+            conn.commit()
+    return stats
+
+# -------------- modo bootstrap (--bootstrap) --------------
+BOOTSTRAP_CACHE_KB = 262144   # cache_size de la conexión de carga inicial (256 MB)
+ANALYTIC_INDEXES_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Índices recomendados para que vuele.sql')
+
+def connect_bootstrap(db_path):
+    # base nueva: sin journal ni fsync (si se corta, se borra el archivo y se vuelve a correr)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = OFF;')
+    conn.execute('PRAGMA synchronous = OFF;')
+    conn.execute('PRAGMA locking_mode = EXCLUSIVE;')
+    conn.execute(f'PRAGMA cache_size = -{BOOTSTRAP_CACHE_KB};')
+    conn.execute('PRAGMA temp_store = MEMORY;')
+    ensure_manifest(conn)
+    ensure_dedup_table(conn)
+    conn.commit()
+    return conn
+
+def first_seen(mode, key_cols, headers):
+    # filtro para upsert_rows sin índice único: True solo la primera vez que aparece el _rowhash / la clave.
+    # Sin journal no hay rollback de sentencia, así que el CREATE UNIQUE INDEX final no puede fallar.
+    if mode == 'key':
+        pos = [headers.index(c) for c in key_cols]
+        keyf = lambda p: tuple(p[i] for i in pos)
+    else:
+        keyf = lambda p: p[-1]
+    seen = set()
+    def keep(p):
+        k = keyf(p)
+        if k in seen:
+            return False
+        if not (mode == 'key' and None in k):  # claves con NULL: el índice único las admite repetidas
+            seen.add(k)
+        return True
+    return keep
+
+def existing_tables(db_path, src_dir, tables=None):
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(db_path)
+    try:
+        return [t for t in (safe_table_name(p) for p in iter_csv_files(src_dir, tables)) if table_exists(conn, t)]
+    finally:
+        conn.close()
+
+def analytic_index_statements(path=ANALYTIC_INDEXES_SQL):
+    # [(tabla, sql)] de los CREATE INDEX del archivo de índices recomendados
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        text = f.read()
+    out = []
+    for stmt in (x.strip() for x in text.split(';')):
+        m = re.search(r'\bON\s+"?(\w+)"?\s*\(', stmt, re.IGNORECASE)
+        if stmt.upper().startswith('CREATE') and m:
+            out.append((m.group(1), stmt))
+    return out
+
+def build_indexes(conn, tables):
+    # índices de apoyo (create_unique_indexes.py) + los recomendados de las tablas que existan, y ANALYZE
+    for table in tables:
+        have = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+        create_supporting_indexes(conn, table, have)
+    for table, sql in analytic_index_statements():
+        if table_exists(conn, table):
+            conn.execute(sql)
+    if 'astro_luna' in tables:
+        conn.commit()
+        ensure_last_seen(conn)  # tablas vacías: se pueblan con un GROUP BY (no fila a fila con el trigger)
+    conn.execute('ANALYZE;')
+    conn.commit()
+
+def bootstrap_dir(db_path, src_dir, chunk_size=CHUNK_ROWS, overrides=None, dedup=None, clean=None, tables=None):
+    """Construcción inicial: cada tabla se crea sin índices y se carga en una sola transacción; los duplicados
+    se descartan en memoria (first_seen: gana la primera fila, igual que INSERT OR IGNORE) y al final se crean
+    el índice de deduplicación, los de apoyo y los recomendados, y se corre ANALYZE. Deja el manifiesto listo para las
+    cargas incrementales."""
+    stats, loaded = [], []
+    with closing(connect_bootstrap(db_path)) as conn:  # locking_mode=EXCLUSIVE: se suelta al cerrar
+        for csv_path in iter_csv_files(src_dir, tables):
+            table = safe_table_name(csv_path)
+            st_row = new_stat(table, csv_path)
+            st_row["mode"] = 'bootstrap'
+            stats.append(st_row)
+            t0 = time.perf_counter()
+            try:
+                st = os.stat(csv_path)
+                _, sha1, offset = scan_file(csv_path)
+                f, headers, reader = open_csv(csv_path)
+                with f:
                     if not headers:
+                        st_row["mode"] = 'empty'
                         log(f'[WARN] {table}: CSV vacío, omitido.')
                         continue
-                    ensure_table(conn, table, headers)
-                    ins, ign = upsert_rows(conn, table, headers, data)
-                    conn.commit()
-                    total_ins += ins; total_ign += ign
-                    log(f'[OK ] {table}: +{ins} filas (omitidas: {ign})')
-                except Exception as ex:
-                    conn.rollback()
-                    log(f'[ERR] {table}: {ex}')
-                    # No re-levantar: permite continuar con otros archivos
-    return total_ins, total_ign
+                    rows = read_table_rows(csv_path, reader, headers, 0, clean)
+                    sample = list(islice(rows, SAMPLE_ROWS))
+                    types = apply_overrides(table, infer_types(headers, sample), overrides)
+                    mode, key = choose_mode(table, headers, dedup or "sha1")
+                    ensure_table(conn, table, headers, types, (mode, key), index=False)
+                    set_mode(conn, table, mode, key)
+                    declared = declared_types(conn, table)
+                    ins, dups, rej = upsert_rows(conn, table, headers, chain(sample, rows), chunk_size,
+                                                 coercers_for(declared, headers),
+                                                 fingerprint_fn(mode, headers, declared),
+                                                 keep=first_seen(mode, key, headers))
+                ensure_dedup_index(conn, table, mode, key)
+                save_entry(conn, csv_path, table, st, sha1, offset)
+                conn.commit()
+                loaded.append(table)
+                st_row.update(inserted=ins, ignored=dups, rejected=rej)
+                log_loaded(st_row, 0)
+            except Exception as ex:
+                # sin journal el rollback no deshace nada: la tabla a medio cargar (y sin índice de
+                # deduplicación) se borra; sin manifiesto, la próxima carga incremental la crea desde el CSV
+                conn.rollback()
+                conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+                conn.execute('DELETE FROM ingest_dedup WHERE tabla=?', (table,))
+                conn.commit()
+                st_row["error"] = str(ex)
+                log(f'[ERR] {table}: {ex} (tabla descartada)')
+            finally:
+                st_row["elapsed_s"] = round(time.perf_counter() - t0, 4)
+        t0 = time.perf_counter()
+        build_indexes(conn, loaded)
+        log(f'[OK ] Índices + ANALYZE: {time.perf_counter() - t0:.2f}s')
+    return stats
 
-def main():
-    ap = argparse.ArgumentParser()
+def time_incremental(db_path, src_dir, chunk_size, overrides, dedup, clean, tables=None):
+    # misma carga por el camino incremental en una base temporal (para medir el speedup de --bootstrap)
+    tmp = tempfile.mkdtemp(prefix='rp_incremental_', dir=os.path.dirname(os.path.abspath(db_path)))
+    try:
+        t0 = time.perf_counter()
+        process_dir(os.path.join(tmp, 'incremental.db'), src_dir, chunk_size, False, overrides, 1, dedup, clean,
+                    tables)
+        return time.perf_counter() - t0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def totals(stats):
+    return {k: sum(s[k] for s in stats) for k in ("inserted", "ignored", "rejected")}
+
+def write_report(path, db_path, src_dir, stats, started_at, elapsed, extra=None):
+    # reporte estructurado de la carga (para archivar en logs/ en vez del texto libre)
+    report = {
+        "db": db_path,
+        "src": src_dir,
+        "started_at": started_at,
+        "elapsed_s": round(elapsed, 4),
+        "totals": {**totals(stats), "errors": sum(1 for s in stats if s["error"])},
+        **(extra or {}),
+        "tables": stats,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def add_load_args(ap, src_help='Directorio con CSVs limpios'):
+    # flags comunes de carga (cargar_db.py e ingest.py)
     ap.add_argument('--db', required=True, help='Ruta a radar_premios.db')
-    ap.add_argument('--src', required=True, help='Directorio con CSVs limpios')
-    args = ap.parse_args()
+    ap.add_argument('--src', required=True, help=src_help)
+    ap.add_argument('--chunk-size', type=int, default=CHUNK_ROWS, help='Filas por bloque de inserción')
+    ap.add_argument('--full', action='store_true', help='Ignora ingest_manifest y relee todos los CSV completos')
+    ap.add_argument('--workers', type=int, default=1,
+                    help='>1: parseo/hash de los CSV en N procesos y un único escritor SQLite (cola acotada)')
+    ap.add_argument('--dedup', choices=MODES,
+                    help='Deduplicación para tablas nuevas: sha1 (default, _rowhash hex), hash64 (_rowhash INTEGER de '
+                         '8 bytes) o key (índice único sobre la clave natural, sin _rowhash). '
+                         'Las tablas existentes se migran con row_dedup.py')
+    ap.add_argument('--types', help='JSON con tipos por tabla/columna que pisan la inferencia: {"tabla": {"col": "TEXT"}}')
+    ap.add_argument('--tables', help='Cargar solo estas tablas (coma; nombre del CSV sin .csv). Default: todos los CSV de --src')
+    ap.add_argument('--report', help='Ruta del reporte JSON de la carga (insertadas/ignoradas/rechazadas/tiempo por tabla)')
+    ap.add_argument('--bootstrap', action='store_true',
+                    help='Construcción inicial de la base (tablas nuevas): sin journal, una transacción por tabla, '
+                         'índices y ANALYZE al final')
+    ap.add_argument('--compare', action='store_true',
+                    help='Con --bootstrap: repite la carga por el camino incremental en una base temporal e informa el speedup')
 
+def run_load(args, clean=None, name='cargar_db'):
     if not os.path.isdir(args.src):
         log(f'[FATAL] No existe directorio --src: {args.src}')
         sys.exit(2)
 
     os.makedirs(os.path.dirname(args.db) or '.', exist_ok=True)
-    ins, ign = process_dir(args.db, args.src)
-    log(f'[OK ] cargar_db: insertadas={ins}, ignoradas={ign}')
+    chunk_size, overrides = max(1, args.chunk_size), load_overrides(args.types)
+    tables = [t.strip() for t in args.tables.split(',') if t.strip()] if args.tables else None
+    extra = None
+    started_at = datetime.datetime.now().isoformat(timespec='seconds')
+    t0 = time.perf_counter()
+    if args.bootstrap:
+        ya = existing_tables(args.db, args.src, tables)
+        if ya:
+            log(f'[FATAL] --bootstrap es para construir la base desde cero; ya existen: {", ".join(ya)}. '
+                f'Usa la carga incremental.')
+            sys.exit(2)
+        if args.workers > 1:
+            log('[INFO] --bootstrap carga en serie (un escritor sin journal); se ignora --workers.')
+        stats = bootstrap_dir(args.db, args.src, chunk_size, overrides, args.dedup, clean, tables)
+        elapsed = time.perf_counter() - t0
+        extra = {"bootstrap": {"elapsed_s": round(elapsed, 4)}}
+        if args.compare:
+            inc = time_incremental(args.db, args.src, chunk_size, overrides, args.dedup, clean, tables)
+            extra["bootstrap"].update(incremental_s=round(inc, 4), speedup=round(inc / elapsed, 2))
+            log(f'[OK ] bootstrap {elapsed:.2f}s vs incremental {inc:.2f}s → {inc / elapsed:.1f}x')
+    else:
+        stats = process_dir(args.db, args.src, chunk_size, args.full, overrides, args.workers, args.dedup, clean,
+                            tables)
+    tot = totals(stats)
+    log(f'[OK ] {name}: insertadas={tot["inserted"]}, ignoradas={tot["ignored"]}, rechazadas={tot["rejected"]}')
+    if args.report:
+        write_report(args.report, args.db, args.src, stats, started_at, time.perf_counter() - t0, extra)
+        log(f'[OK ] Reporte → {args.report}')
     sys.exit(0)
 
+def main():
+    ap = argparse.ArgumentParser()
+    add_load_args(ap)
+    run_load(ap.parse_args())
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+column_types.py — Inferencia y coerción de tipos por columna para las tablas que carga cargar_db.py.
+Tipos: INTEGER (incluye montos "$2.400.000.000" -> 2400000000), REAL, DATE (ISO YYYY-MM-DD; acepta DD/MM/YYYY,
+DD/MM/YY y fechas largas en español como 'lunes 28 julio 2025' o '2 de agosto de 2025') y TEXT.
+Las columnas 'fecha' se llevan siempre a ISO al cargar, aunque la tabla las tenga declaradas TEXT. Se infiere con una muestra de filas; lo que no encaja con todos los valores no vacíos queda TEXT.
+XX/XX/YYYY se lee siempre día/mes (formato de los CSV): un valor que solo es válido como mes/día ('12/31/2025') no
+es fecha, se guarda tal cual y la columna queda TEXT.
+- Las tablas nuevas se crean con los tipos inferidos (+ overrides) y se guardan los valores convertidos.
+- En tablas existentes la coerción sigue el tipo declarado de cada columna (una tabla TEXT sigue igual).
+- retype_table() migra una tabla existente a columnas tipadas (reconstrucción con índices y triggers).
+Overrides por tabla: TYPE_OVERRIDES aquí o un JSON {"tabla": {"columna": "TEXT"}} con --types en cargar_db.py.
+Uso (migración de tablas ya cargadas como TEXT):
+  python column_types.py --db "C:\\RadarPremios\\radar_premios.db" --tables astro_luna,boyaca --dry-run
+  python column_types.py --db "C:\\RadarPremios\\radar_premios.db" --tables astro_luna,boyaca
+"""
+import argparse, datetime, json, re, sqlite3
+
+SAMPLE_ROWS = 2000
+TYPES = ("INTEGER", "REAL", "DATE", "TEXT")
+
+# overrides fijos (tabla -> columna -> tipo); los de --types se aplican encima
+TYPE_OVERRIDES = {
+    "baloto_premios": {"aciertos": "TEXT"},
+    "revancha_premios": {"aciertos": "TEXT"},
+}
+
+_INT = re.compile(r"^[+-]?\d+$")
+_REAL = re.compile(r"^[+-]?\d+\.\d+$")
+_MILES = re.compile(r"^\d{1,3}(\.\d{3})+$")  # '2.157': ¿2157 o 2,157? ambiguo -> no se tipa
+_MONEY = re.compile(r"^\$\s?\d{1,3}(\.\d{3})*(,\d+)?$|^\$\s?\d+(,\d+)?$")
+_DMY = re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})$")  # año de 2 dígitos: 20YY (como calcular_posiciones.py)
+_ISO = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# formatos largos de los scrapers: 'lunes 28 julio 2025', '2 de agosto de 2025', 'Sábado, 02 de Agosto de 2025'
+_LARGA = re.compile(r"^(?:(?:lunes|martes|mi[ée]rcoles|jueves|viernes|s[áa]bado|domingo),?\s+)?"
+                    r"(\d{1,2})\s+(?:de\s+)?([a-záéíóú]+)\s+(?:de\s+|del\s+)?(\d{4})$", re.IGNORECASE)
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7, "agosto": 8,
+    "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+def _money(v):
+    # formato colombiano: '.' miles, ',' decimales
+    num = v.lstrip("$").strip().replace(".", "").replace(",", ".")
+    f = float(num)
+    return int(f) if f.is_integer() else f
+
+def to_integer(v):
+    if v == "":
+        return None
+    if _INT.match(v):
+        return int(v)
+    if _MONEY.match(v):
+        return _money(v)
+    return v  # no convertible: se guarda tal cual (SQLite lo deja como TEXT)
+
+def to_real(v):
+    if v == "":
+        return None
+    if _INT.match(v) or _REAL.match(v):
+        return float(v)
+    if _MONEY.match(v):
+        return float(_money(v))
+    return v
+
+def _ymd(y, m, d):
+    # ISO solo si es una fecha real: '12/31/2025' (MM/DD) no pasa a '2025-31-12'
+    try:
+        return datetime.date(int(y), int(m), int(d)).isoformat()
+    except ValueError:
+        return None
+
+def to_date(v):
+    if v == "":
+        return None
+    if _ISO.match(v):
+        return v
+    m = _DMY.match(v)
+    if m:
+        y = m.group(3)
+        return _ymd(y if len(y) == 4 else 2000 + int(y), m.group(2), m.group(1)) or v
+    m = _LARGA.match(v)
+    if m and m.group(2).lower() in MESES:
+        return _ymd(m.group(3), MESES[m.group(2).lower()], m.group(1)) or v
+    return v
+
+def iso_fecha(v):
+    # para SQL (create_function): valor guardado -> ISO si es una fecha reconocible, si no igual
+    return to_date(v) if isinstance(v, str) and v else v
+
+def register_iso_fecha(conn):
+    conn.create_function("iso_fecha", 1, iso_fecha, deterministic=True)
+
+COERCE = {"INTEGER": to_integer, "REAL": to_real, "DATE": to_date}
+
+def value_kind(v):
+    if _INT.match(v):
+        return "INTEGER"
+    if _MONEY.match(v):
+        return "INTEGER" if "," not in v else "REAL"
+    if _MILES.match(v):
+        return "TEXT"
+    if _REAL.match(v):
+        return "REAL"
+    if _ISO.match(v) or to_date(v) != v:
+        return "DATE"
+    return "TEXT"
+
+def infer_types(headers, rows):
+    """Tipo por columna a partir de filas de muestra (listas de str). Columnas sin valores -> TEXT."""
+    kinds = [set() for _ in headers]
+    for r in rows:
+        for i, v in enumerate(r[:len(headers)]):
+            if v is not None and v != "":
+                kinds[i].add(value_kind(str(v)))
+    out = {}
+    for h, ks in zip(headers, kinds):
+        if ks == {"INTEGER"}:
+            out[h] = "INTEGER"
+        elif ks and ks <= {"INTEGER", "REAL"}:
+            out[h] = "REAL"
+        elif ks == {"DATE"}:
+            out[h] = "DATE"
+        else:
+            out[h] = "TEXT"
+    return out
+
+def load_overrides(path=None):
+    ov = {t: dict(cols) for t, cols in TYPE_OVERRIDES.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for t, cols in json.load(f).items():
+                for c, ty in cols.items():
+                    ty = str(ty).upper()
+                    if ty not in TYPES:
+                        raise ValueError(f"tipo inválido para {t}.{c}: {ty} (válidos: {', '.join(TYPES)})")
+                    ov.setdefault(t, {})[c] = ty
+    return ov
+
+def apply_overrides(table, types, overrides):
+    for c, ty in (overrides or {}).get(table, {}).items():
+        if c in types:
+            types[c] = ty
+    return types
+
+def declared_types(conn, table):
+    # {columna: tipo declarado} normalizado a TYPES (vacío/otro -> TEXT)
+    out = {}
+    for _, name, ctype, *_ in conn.execute(f'PRAGMA table_info("{table}")'):
+        ctype = (ctype or "").upper()
+        out[name] = ctype if ctype in TYPES else "TEXT"
+    return out
+
+def coercers_for(types, headers):
+    # lista paralela a headers: función de conversión o None (TEXT). 'fecha' siempre a ISO (tablas TEXT previas
+    # incluidas): así no hace falta barrer las tablas con UPDATE después de cargar
+    return [to_date if h.lower() == "fecha" else COERCE.get(types.get(h, "TEXT")) for h in headers]
+
+def coerce_row(row, coercers):
+    return [f(v) if f is not None else v for v, f in zip(row, coercers)]
+
+# -------------- migración de tablas existentes --------------
+def infer_table_types(conn, table, overrides=None):
+    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")') if r[1] != "_rowhash"]
+    sel = ", ".join(f'"{c}"' for c in cols)
+    rows = ([("" if v is None else str(v)) for v in r]
+            for r in conn.execute(f'SELECT {sel} FROM "{table}"'))
+    return apply_overrides(table, infer_types(cols, rows), overrides)
+
+def _coerce_stored(v, f):
+    # valor ya guardado en SQLite (str, int, float o None)
+    if f is None or v is None:
+        return v
+    return f(str(v))
+
+def retype_table(conn, table, types, chunk_size=5000):
+    """Reconstruye 'table' con los tipos dados, convirtiendo los valores. Conserva rowid, _rowhash,
+    índices y triggers. Debe llamarse fuera de una transacción abierta."""
+    info = list(conn.execute(f'PRAGMA table_info("{table}")'))
+    cols = [r[1] for r in info]
+    extra = [sql for (sql,) in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name=? AND type IN ('index','trigger') AND sql IS NOT NULL",
+        (table,))]
+    tmp = f"{table}__retype"
+    col_sql = ", ".join(f'"{c}" {"TEXT" if c == "_rowhash" else types.get(c, "TEXT")}' for c in cols)
+    coercers = coercers_for(types, cols)
+    quoted = ", ".join(f'"{c}"' for c in cols)
+    conn.execute("PRAGMA legacy_alter_table=ON")  # las vistas que referencian la tabla no se validan al renombrar
+    try:
+        conn.execute("BEGIN")
+        conn.execute(f'DROP TABLE IF EXISTS "{tmp}"')
+        conn.execute(f'CREATE TABLE "{tmp}" ({col_sql})')
+        ins = f'INSERT INTO "{tmp}"(rowid, {quoted}) VALUES (?, {", ".join("?" * len(cols))})'
+        cur = conn.execute(f'SELECT rowid, {quoted} FROM "{table}" ORDER BY rowid')
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            conn.executemany(ins, ((r[0], *(_coerce_stored(v, f) for v, f in zip(r[1:], coercers)))
+                                   for r in chunk))
+        conn.execute(f'DROP TABLE "{table}"')
+        conn.execute(f'ALTER TABLE "{tmp}" RENAME TO "{table}"')
+        for sql in extra:
+            conn.execute(sql)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("PRAGMA legacy_alter_table=OFF")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--tables", required=True, help="Tablas a migrar (coma)")
+    ap.add_argument("--types", help="JSON de overrides {tabla: {columna: tipo}}")
+    ap.add_argument("--dry-run", action="store_true", help="Solo muestra los tipos inferidos")
+    args = ap.parse_args()
+
+    overrides = load_overrides(args.types)
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        for table in [t.strip() for t in args.tables.split(",") if t.strip()]:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone():
+                print(f"[SKIP] {table}: no existe.")
+                continue
+            types = infer_table_types(conn, table, overrides)
+            desc = ", ".join(f"{c}:{t}" for c, t in types.items())
+            if args.dry_run:
+                print(f"[INFO] {table}: {desc}")
+                continue
+            retype_table(conn, table, types)
+            print(f"[OK] {table}: {desc}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+cuando_virtual.py — Modo "virtual" de cuando_* y todo_cuando_*: en lugar de 160 tablas que copian subconjuntos de
+matriz_astro_luna, vistas con el mismo nombre y las mismas columnas (SELECT ... FROM matriz_astro_luna WHERE ...),
+respaldadas por índices de la matriz:
+- idx_matriz_aslu_digitos (um, c, d, u, fecha, numero) y uno por posición: (um, fecha, numero), (c, fecha, numero),
+  ... (cubren las columnas de las vistas: la consulta no toca la tabla).
+- Los predicados son los mismos del orquestador (cuando_rule de orquestador_astroluna_v6.py).
+- Las vistas no se reconstruyen nunca: leen siempre la matriz al día (los orquestadores omiten las vistas).
+API para consultar sin pasar por las vistas:
+  cuando(conn, 3, ["c", "u"])  -> (fecha, numero) de los sorteos con 3 en centena y en unidad
+  todo_cuando(conn, 3)         -> 3 en cualquier posición
+  ambas con desde/hasta opcionales (fecha ISO) y ordenadas por fecha.
+Migración (reversible; --modo fisico vuelve a crear las tablas con su índice (fecha, numero)):
+  python cuando_virtual.py --db "C:\\RadarPremios\\radar_premios.db" --modo virtual --dry-run
+  python cuando_virtual.py --db "C:\\RadarPremios\\radar_premios.db" --modo virtual
+  python cuando_virtual.py --db "C:\\RadarPremios\\radar_premios.db" --modo fisico
+Espacio, tiempo de reconstrucción y latencia de consultas en ambos modos: bench_cuando_virtual.py.
+"""
+import argparse, sqlite3
+from typing import List, Optional, Sequence, Tuple
+
+from orquestador_astroluna_v6 import (DERIVED_SYNC_TABLE, MATRIX_POS, MATRIX_TABLE, RE_CUANDO, TOKEN_TO_POS,
+                                      cuando_rule, ensure_derived_sync, get_cols, get_objects, is_todo_cuando,
+                                      matrix_mark, save_derived_sync, table_exists, tx)
+
+QUERY_INDEXES = [("idx_matriz_aslu_digitos", "um, c, d, u, fecha, numero")] + [
+    (f"idx_matriz_aslu_{p}", f"{p}, fecha, numero") for p in MATRIX_POS]
+
+def ensure_query_indexes(conn: sqlite3.Connection):
+    for name, cols in QUERY_INDEXES:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "{MATRIX_TABLE}"({cols})')
+
+def drop_query_indexes(conn: sqlite3.Connection):
+    for name, _ in QUERY_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+def is_cuando(name: str) -> bool:
+    return bool(RE_CUANDO.match(name) or is_todo_cuando(name))
+
+def cuando_objects(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    # (nombre, 'table'|'view') de cuando_* / todo_cuando_* con predicado reconocible
+    return [(n, t) for n, t in get_objects(conn) if is_cuando(n) and cuando_rule(n) is not None]
+
+def current_mode(conn: sqlite3.Connection) -> str:
+    tipos = {t for _, t in cuando_objects(conn)}
+    if not tipos:
+        return "sin tablas"
+    if tipos == {"view"}:
+        return "virtual"
+    return "fisico" if tipos == {"table"} else "mixto"
+
+def _common_cols(conn: sqlite3.Connection, name: str) -> List[str]:
+    src = {c[1] for c in get_cols(conn, MATRIX_TABLE)}
+    return [c[1] for c in get_cols(conn, name) if c[1] in src]
+
+def _view_select(conn: sqlite3.Connection, name: str, cols: List[str]) -> str:
+    # mismas columnas y tipos que la tabla: si la tabla declaraba otro tipo (p.ej. numero TEXT, que guarda '76'
+    # donde la matriz tiene 76) la vista hace el CAST para devolver exactamente lo mismo
+    src = {c[1]: (c[2] or "").upper() for c in get_cols(conn, MATRIX_TABLE)}
+    dst = {c[1]: (c[2] or "").upper() for c in get_cols(conn, name)}
+    out = []
+    for c in cols:
+        if dst.get(c) and dst[c] != src.get(c):
+            out.append(f'CAST("{c}" AS {dst[c]}) AS "{c}"')
+        else:
+            out.append(f'"{c}"')
+    return ", ".join(out)
+
+# -------------- migración --------------
+def to_virtual(conn: sqlite3.Connection, dry: bool = False) -> List[str]:
+    """Tablas cuando_*/todo_cuando_* -> vistas homónimas sobre la matriz (+ índices). Devuelve las migradas."""
+    objs = [(n, _common_cols(conn, n)) for n, t in cuando_objects(conn) if t == "table"]
+    objs = [(n, cols) for n, cols in objs if cols]
+    if dry or not objs:
+        return [n for n, _ in objs]
+    with tx(conn):
+        ensure_query_indexes(conn)
+        for name, cols in objs:
+            colsql = _view_select(conn, name, cols)
+            conn.execute(f'DROP TABLE "{name}"')
+            conn.execute(f'CREATE VIEW "{name}" AS SELECT {colsql} FROM "{MATRIX_TABLE}" WHERE {cuando_rule(name)[0]}')
+        if table_exists(conn, DERIVED_SYNC_TABLE):
+            conn.executemany(f"DELETE FROM {DERIVED_SYNC_TABLE} WHERE tabla=?", [(n,) for n, _ in objs])
+    return [n for n, _ in objs]
+
+def to_physical(conn: sqlite3.Connection, dry: bool = False) -> List[str]:
+    """Vistas cuando_*/todo_cuando_* -> tablas materializadas con índice (fecha, numero), ya marcadas como al día
+    en derivadas_sync para que el orquestador siga de forma incremental. Quita los índices de consulta."""
+    objs = [(n, _common_cols(conn, n)) for n, t in cuando_objects(conn) if t == "view"]
+    objs = [(n, cols) for n, cols in objs if cols]
+    if dry:
+        return [n for n, _ in objs]
+    ensure_derived_sync(conn)
+    with tx(conn):
+        mark = matrix_mark(conn)
+        for name, cols in objs:
+            # desde la propia vista: conserva los CAST y con ellos el tipo declarado de cada columna
+            conn.execute(f'CREATE TABLE "{name}__fisico" AS SELECT * FROM "{name}"')
+            conn.execute(f'DROP VIEW "{name}"')
+            conn.execute(f'ALTER TABLE "{name}__fisico" RENAME TO "{name}"')
+            if "fecha" in cols and "numero" in cols:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{name}_fecha_num" ON "{name}"(fecha, numero)')
+            save_derived_sync(conn, name, mark)
+        drop_query_indexes(conn)
+    return [n for n, _ in objs]
+
+# -------------- consultas --------------
+def _positions(posiciones: Sequence[str]) -> List[str]:
+    out = []
+    for p in posiciones:
+        key = TOKEN_TO_POS.get(str(p).strip().lower())
+        if key is None:
+            raise ValueError(f"posición inválida: {p} (válidas: {', '.join(sorted(TOKEN_TO_POS))})")
+        if key not in out:
+            out.append(key)
+    return out
+
+def _range(where: List[str], params: list, desde: Optional[str], hasta: Optional[str]):
+    if desde:
+        where.append("fecha >= ?")
+        params.append(desde)
+    if hasta:
+        where.append("fecha <= ?")
+        params.append(hasta)
+
+def cuando(conn: sqlite3.Connection, digito: int, posiciones: Sequence[str], desde: Optional[str] = None,
+           hasta: Optional[str] = None, cols: Sequence[str] = ("fecha", "numero")) -> List[tuple]:
+    """Sorteos en que 'digito' está en TODAS las 'posiciones' (um/c/d/u o umil/centena/decena/unidad)."""
+    pos = _positions(posiciones)
+    if not pos:
+        return []
+    where = [f"{p} = ?" for p in pos]
+    params: list = [int(digito)] * len(pos)
+    _range(where, params, desde, hasta)
+    colsql = ", ".join(f'"{c}"' for c in cols)
+    return conn.execute(f'SELECT {colsql} FROM "{MATRIX_TABLE}" WHERE {" AND ".join(where)} ORDER BY fecha',
+                        params).fetchall()
+
+def todo_cuando(conn: sqlite3.Connection, digito: int, desde: Optional[str] = None, hasta: Optional[str] = None,
+                cols: Sequence[str] = ("fecha", "numero")) -> List[tuple]:
+    """Sorteos en que 'digito' aparece en alguna posición (los índices por posición resuelven el OR)."""
+    where = ["(" + " OR ".join(f"{p} = ?" for p in MATRIX_POS) + ")"]
+    params: list = [int(digito)] * len(MATRIX_POS)
+    _range(where, params, desde, hasta)
+    colsql = ", ".join(f'"{c}"' for c in cols)
+    return conn.execute(f'SELECT {colsql} FROM "{MATRIX_TABLE}" WHERE {" AND ".join(where)} ORDER BY fecha',
+                        params).fetchall()
+
+def main():
+    ap = argparse.ArgumentParser(description="Modo virtual (vistas) o físico (tablas) para cuando_* / todo_cuando_*")
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--modo", choices=("virtual", "fisico"), help="Modo destino; sin --modo solo informa el actual")
+    ap.add_argument("--dry-run", action="store_true", help="Solo lista lo que se migraría")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if not table_exists(conn, MATRIX_TABLE):
+            raise SystemExit(f"[ERROR] No existe {MATRIX_TABLE} en {args.db}.")
+        print(f"[INFO] Modo actual: {current_mode(conn)}")
+        if not args.modo:
+            return
+        fn = to_virtual if args.modo == "virtual" else to_physical
+        hechas = fn(conn, args.dry_run)
+        if args.dry_run:
+            print(f"[INFO] DRY-RUN: {len(hechas)} objetos pasarían a modo {args.modo}.")
+        else:
+            print(f"[OK] {len(hechas)} objetos en modo {args.modo}. Modo actual: {current_mode(conn)}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
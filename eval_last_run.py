@@ -7,6 +7,8 @@ Uso:
 """
 import argparse, sqlite3, datetime
 
+from run_store import run_rank
+
 def eval_run(conn):
     # Último run
     r = conn.execute("""
@@ -33,13 +35,10 @@ def eval_run(conn):
         return
 
     maxf, win_num = win
+    win_num = f"{int(win_num):04d}"  # numero puede estar tipado INTEGER (column_types)
 
-    # Rank del número en TOP y en ALL
-    top_rank = conn.execute("""
-        SELECT MIN(rank)
-        FROM run_candidates
-        WHERE run_id = ? AND numero = ?
-    """, (run_id, win_num)).fetchone()[0]
+    # Rank del número en TOP y en ALL (run_candidates o run_blobs, según cómo se guardó el run)
+    top_rank = run_rank(conn, run_id, win_num)
 
     # Si no está en run_candidates, es MISS
     veredicto = "MISS ❌"
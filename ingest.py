@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+ingest.py — Limpieza + carga en un solo paso: lee los CSV crudos de los scrapers, aplica al vuelo las reglas de
+limpiar_csvs.py (NA de pandas -> vacío, strip, filas vacías fuera) y los carga con cargar_db.py, sin escribir ni
+re-parsear los CSV de data/limpio. Mismas opciones que cargar_db.py (manifiesto, --workers, --dedup, --types,
+--report); --audit-dir escribe además la copia limpia de cada CSV (mismo formato que limpiar_csvs.py) para auditoría.
+Uso:
+  python ingest.py --db "C:\\RadarPremios\\radar_premios.db" --src "C:\\RadarPremios\\data\\crudo"
+  python ingest.py --db ... --src ... --audit-dir "C:\\RadarPremios\\data\\limpio" --report logs\\load.json
+"""
+import argparse, csv, os
+from functools import partial
+
+from cargar_db import add_load_args, log, run_load
+from limpiar_csvs import WRITE_BUFFER, limpiar_fila
+
+def clean_stream(audit_dir, csv_path, headers, rows, start=0):
+    """Filas crudas -> filas limpias para cargar_db (NA como ''). Las filas toda-NA salen vacías para que
+    cargar_db las cuente como rechazadas. Con audit_dir escribe la copia limpia; si el manifiesto pidió solo
+    lo nuevo (start > 0) y la copia ya existe, le agrega las filas al final."""
+    fh = w = None
+    if audit_dir:
+        dst = os.path.join(audit_dir, os.path.basename(csv_path))
+        append = bool(start) and os.path.exists(dst)
+        fh = open(dst, "a" if append else "w", encoding="utf-8" if append else "utf-8-sig", newline="",
+                  buffering=WRITE_BUFFER)
+        w = csv.writer(fh, quoting=csv.QUOTE_NONNUMERIC, lineterminator=os.linesep)
+        if not append:
+            w.writerow(headers)
+    try:
+        for r in rows:
+            vals = limpiar_fila(r)
+            if vals is None:
+                yield [''] * len(r)
+                continue
+            if w is not None:
+                w.writerow(vals)
+            yield ['' if v is None else v for v in vals]
+    finally:
+        if fh is not None:
+            fh.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Limpia y carga los CSV crudos en SQLite en una sola pasada.")
+    add_load_args(ap, src_help='Directorio con CSVs crudos (data/crudo)')
+    ap.add_argument('--audit-dir', help='Opcional: escribe aquí las copias limpias de los CSV (solo auditoría)')
+    args = ap.parse_args()
+
+    if args.audit_dir:
+        os.makedirs(args.audit_dir, exist_ok=True)
+        log(f'[INFO] Copias limpias de auditoría → {args.audit_dir}')
+    run_load(args, clean=partial(clean_stream, args.audit_dir), name='ingest')
+
+if __name__ == '__main__':
+    main()
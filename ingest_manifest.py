@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+ingest_manifest.py — Manifiesto de ingesta de cargar_db.py (change data capture por archivo CSV).
+Tabla ingest_manifest: por archivo guarda tamaño, mtime, sha1 del contenido ya cargado y el offset en bytes
+hasta donde se cargó (siempre al final de una línea completa).
+- Mismo tamaño y mtime            -> "skip": no se abre el archivo.
+- El contenido hasta el offset no cambió (sha1 igual) y el archivo creció -> "append": solo se parsea desde
+  el offset (caso guardar_nuevos de los scrapers, que escriben en modo append).
+- Cualquier otro cambio (reescritura, archivo nuevo, tabla ausente) -> "full": recarga completa; los
+  duplicados los sigue descartando INSERT OR IGNORE sobre _rowhash (o la clave natural, ver row_dedup.py).
+"""
+import hashlib, os, sqlite3
+
+READ_BLOCK = 1 << 20
+
+DDL = """
+CREATE TABLE IF NOT EXISTS ingest_manifest(
+  path      TEXT PRIMARY KEY,
+  tabla     TEXT NOT NULL,
+  size      INTEGER NOT NULL,
+  mtime_ns  INTEGER NOT NULL,
+  sha1      TEXT NOT NULL,
+  offset    INTEGER NOT NULL,
+  loaded_at TEXT DEFAULT (datetime('now'))
+)
+"""
+
+def ensure_manifest(conn):
+    conn.execute(DDL)
+
+def manifest_key(csv_path):
+    return os.path.normcase(os.path.abspath(csv_path))
+
+def get_entry(conn, csv_path):
+    row = conn.execute("SELECT tabla, size, mtime_ns, sha1, offset FROM ingest_manifest WHERE path=?",
+                       (manifest_key(csv_path),)).fetchone()
+    if row is None:
+        return None
+    return {"tabla": row[0], "size": row[1], "mtime_ns": row[2], "sha1": row[3], "offset": row[4]}
+
+def save_entry(conn, csv_path, table, st, sha1, offset):
+    # se llama dentro de la misma transacción que los INSERT del archivo (commit atómico)
+    conn.execute("""
+        INSERT INTO ingest_manifest(path, tabla, size, mtime_ns, sha1, offset, loaded_at)
+        VALUES(?,?,?,?,?,?,datetime('now'))
+        ON CONFLICT(path) DO UPDATE SET tabla=excluded.tabla, size=excluded.size, mtime_ns=excluded.mtime_ns,
+          sha1=excluded.sha1, offset=excluded.offset, loaded_at=excluded.loaded_at
+    """, (manifest_key(csv_path), table, st.st_size, st.st_mtime_ns, sha1, offset))
+
+def scan_file(csv_path, prev_offset=0, prev_sha1=None):
+    """Una pasada binaria. Devuelve (prefijo_igual, sha1, offset):
+    prefijo_igual: los primeros prev_offset bytes tienen el sha1 prev_sha1 (el archivo solo creció);
+    sha1/offset: hash y longitud del contenido hasta la última línea completa."""
+    h = hashlib.sha1()
+    same_prefix = False
+    pos = 0
+    with open(csv_path, "rb") as f:
+        if prev_sha1 is not None and prev_offset > 0:
+            left = prev_offset
+            while left:
+                b = f.read(min(READ_BLOCK, left))
+                if not b:
+                    break
+                h.update(b)
+                left -= len(b)
+            pos = prev_offset - left
+            same_prefix = left == 0 and h.hexdigest() == prev_sha1
+        pending = b""
+        while True:
+            b = f.read(READ_BLOCK)
+            if not b:
+                break
+            cut = b.rfind(b"\n")
+            if cut < 0:
+                pending += b
+                continue
+            h.update(pending + b[:cut + 1])
+            pos += len(pending) + cut + 1
+            pending = b[cut + 1:]
+    return same_prefix, h.hexdigest(), pos
+
+def table_ready(conn, table):
+    # la tabla existe y conserva su deduplicación (p.ej. no fue recreada con to_sql(if_exists="replace")):
+    # _rowhash, o dedup por clave natural registrado en ingest_dedup (row_dedup.py)
+    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+    if "_rowhash" in cols:
+        return True
+    if not cols:
+        return False
+    try:
+        row = conn.execute("SELECT modo FROM ingest_dedup WHERE tabla=?", (table,)).fetchone()
+    except sqlite3.OperationalError:
+        return False
+    return row is not None and row[0] == "key"
+
+def plan_file(conn, csv_path, table, full=False):
+    """Decide qué hacer con el archivo. Devuelve (modo, start_offset, st, sha1, offset)
+    con modo en 'skip' | 'touch' (solo cambió mtime) | 'append' | 'full'."""
+    st = os.stat(csv_path)
+    prev = None if full else get_entry(conn, csv_path)
+    if prev is not None and (prev["tabla"] != table or not table_ready(conn, table)):
+        prev = None
+    if prev is not None and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+        return "skip", None, st, prev["sha1"], prev["offset"]
+    if prev is None:
+        _, sha1, offset = scan_file(csv_path)
+        return "full", 0, st, sha1, offset
+    same_prefix, sha1, offset = scan_file(csv_path, prev["offset"], prev["sha1"])
+    if same_prefix and offset == prev["offset"]:
+        return "touch", None, st, sha1, offset
+    if same_prefix:
+        return "append", prev["offset"], st, sha1, offset
+    _, sha1, offset = scan_file(csv_path)  # reescrito: hash/offset desde cero
+    return "full", 0, st, sha1, offset
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+last_seen.py — Recencia mantenida de astro_luna (última fecha por número y por dígito/posición).
+- last_seen_numero(numero -> fecha) y last_seen_digitpos((posicion, digito) -> fecha), fechas en ISO.
+- Un trigger AFTER INSERT sobre astro_luna las actualiza fila a fila: solo las filas realmente insertadas
+  (INSERT OR IGNORE no dispara para duplicados), así que el costo de una carga es O(filas nuevas).
+- DELETE o UPDATE de fecha/numero pueden bajar una última fecha, que no se recalcula fila a fila: sus triggers
+  solo marcan last_seen_sucio. Con la marca (o sin los triggers, p.ej. astro_luna recreada con to_sql) las
+  lecturas vuelven al GROUP BY y ensure_last_seen (cargar_db.py, last_seen.py) reconstruye las tablas.
+- Las lecturas (score_candidates.py, v_last_seen_exact) pasan a ser lecturas por clave primaria.
+Uso (reconstrucción completa, p.ej. tras recrear astro_luna con fix_astro_luna_once.py):
+  python last_seen.py --db "C:\\RadarPremios\\radar_premios.db" --rebuild
+"""
+import argparse, sqlite3
+
+POSITIONS = ("um", "c", "d", "u")
+
+def _iso(col):
+    # DD/MM/YYYY -> YYYY-MM-DD (formato de los CSV crudos); lo demás se asume ya ISO
+    return (f"(CASE WHEN {col} GLOB '??/??/????' "
+            f"THEN substr({col},7,4) || '-' || substr({col},4,2) || '-' || substr({col},1,2) "
+            f"ELSE substr({col},1,10) END)")
+
+def _digit_exprs(num):
+    return {"um": f"({num} / 1000)", "c": f"(({num} / 100) % 10)", "d": f"(({num} / 10) % 10)", "u": f"({num} % 10)"}
+
+DDL = """
+CREATE TABLE IF NOT EXISTS last_seen_numero(
+  numero INTEGER PRIMARY KEY,
+  fecha  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS last_seen_digitpos(
+  posicion TEXT    NOT NULL,
+  digito   INTEGER NOT NULL,
+  fecha    TEXT    NOT NULL,
+  PRIMARY KEY (posicion, digito)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS last_seen_sucio(
+  motivo TEXT PRIMARY KEY
+);
+"""
+
+TRIGGERS = ("trg_astro_luna_last_seen", "trg_astro_luna_last_seen_del", "trg_astro_luna_last_seen_upd")
+
+def _trigger_sqls():
+    f = _iso("NEW.fecha")
+    num = "CAST(NEW.numero AS INTEGER)"
+    dig = _digit_exprs(num)
+    values = ", ".join(f"('{p}', {dig[p]}, {f})" for p in POSITIONS)
+    return (f"""
+CREATE TRIGGER IF NOT EXISTS trg_astro_luna_last_seen
+AFTER INSERT ON astro_luna
+WHEN NEW.fecha IS NOT NULL AND NEW.numero IS NOT NULL AND TRIM(NEW.numero) <> ''
+BEGIN
+  INSERT INTO last_seen_numero(numero, fecha) VALUES ({num}, {f})
+  ON CONFLICT(numero) DO UPDATE SET fecha = excluded.fecha WHERE excluded.fecha > last_seen_numero.fecha;
+  INSERT INTO last_seen_digitpos(posicion, digito, fecha) VALUES {values}
+  ON CONFLICT(posicion, digito) DO UPDATE SET fecha = excluded.fecha WHERE excluded.fecha > last_seen_digitpos.fecha;
+END;
+""", """
+CREATE TRIGGER IF NOT EXISTS trg_astro_luna_last_seen_del
+AFTER DELETE ON astro_luna
+BEGIN
+  INSERT OR IGNORE INTO last_seen_sucio(motivo) VALUES ('delete');
+END;
+""", """
+CREATE TRIGGER IF NOT EXISTS trg_astro_luna_last_seen_upd
+AFTER UPDATE OF fecha, numero ON astro_luna
+WHEN OLD.fecha IS NOT NEW.fecha OR OLD.numero IS NOT NEW.numero
+BEGIN
+  INSERT OR IGNORE INTO last_seen_sucio(motivo) VALUES ('update');
+END;
+""")
+
+VIEW_SQL = """
+DROP VIEW IF EXISTS v_last_seen_exact;
+CREATE VIEW v_last_seen_exact AS
+SELECT
+    printf('%04d', numero) AS numero,
+    CAST(julianday((SELECT MAX(fecha) FROM last_seen_numero)) - julianday(fecha) AS INTEGER) AS dias_desde
+FROM last_seen_numero;
+"""
+
+def table_exists(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+def rebuild_last_seen(conn):
+    """Reconstrucción completa (una pasada GROUP BY sobre astro_luna)."""
+    f = _iso("fecha")
+    num = "CAST(numero AS INTEGER)"
+    conn.execute("DELETE FROM last_seen_numero")
+    conn.execute("DELETE FROM last_seen_digitpos")
+    conn.execute(f"""
+        INSERT INTO last_seen_numero(numero, fecha)
+        SELECT {num}, MAX({f}) FROM astro_luna
+        WHERE fecha IS NOT NULL AND numero IS NOT NULL AND TRIM(numero) <> ''
+        GROUP BY {num}
+    """)
+    # la última fecha de (posición, dígito) es el máximo de las últimas fechas de los números que lo contienen
+    dig = _digit_exprs("numero")
+    union = "\nUNION ALL\n".join(
+        f"SELECT '{p}', {dig[p]}, MAX(fecha) FROM last_seen_numero GROUP BY {dig[p]}" for p in POSITIONS
+    )
+    conn.execute(f"INSERT INTO last_seen_digitpos(posicion, digito, fecha) {union}")
+    conn.execute("DELETE FROM last_seen_sucio")
+
+def triggers_ok(conn):
+    marks = ",".join("?" * len(TRIGGERS))
+    n = conn.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type='trigger' AND name IN ({marks})",
+                     TRIGGERS).fetchone()[0]
+    return n == len(TRIGGERS)
+
+def is_dirty(conn):
+    return conn.execute("SELECT 1 FROM last_seen_sucio LIMIT 1").fetchone() is not None
+
+def last_seen_ready(conn, maxf):
+    # usable solo si existe y está al día con astro_luna: sin DELETE/UPDATE pendientes de reconstruir y con los
+    # triggers en pie (un to_sql(if_exists="replace") los borra junto con la tabla)
+    if not table_exists(conn, "last_seen_sucio") or not triggers_ok(conn) or is_dirty(conn):
+        return False
+    row = conn.execute("SELECT MAX(fecha) FROM last_seen_numero").fetchone()
+    return row is not None and row[0] is not None and row[0] == maxf
+
+def ensure_last_seen(conn):
+    """Crea tablas + triggers + vista; si están vacías, sucias o sin triggers, las reconstruye. Devuelve True si existe astro_luna."""
+    if not table_exists(conn, "astro_luna"):
+        return False
+    conn.executescript(DDL)
+    # sin los triggers astro_luna pudo cambiar sin que nadie lo registrara: se reconstruye igual que si estuviera sucia
+    vigilada = triggers_ok(conn)
+    for sql in _trigger_sqls():
+        conn.execute(sql)
+    if (not vigilada or is_dirty(conn)
+            or conn.execute("SELECT 1 FROM last_seen_numero LIMIT 1").fetchone() is None):
+        rebuild_last_seen(conn)
+    conn.executescript(VIEW_SQL)
+    return True
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--rebuild", action="store_true", help="Recalcula ambas tablas desde astro_luna")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if not ensure_last_seen(conn):
+            raise SystemExit("[ERROR] No existe astro_luna.")
+        if args.rebuild:
+            rebuild_last_seen(conn)
+        conn.commit()
+        n_num, mx = conn.execute("SELECT COUNT(*), MAX(fecha) FROM last_seen_numero").fetchone()
+        n_dp = conn.execute("SELECT COUNT(*) FROM last_seen_digitpos").fetchone()[0]
+        print(f"[OK] last_seen_numero={n_num} | last_seen_digitpos={n_dp} | MAX(fecha)={mx}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ limpiar_csvs.py — robusto/flexible/actualizado
 - Si --src no existe o no hay CSVs, sale RC=0 (no rompe el pipeline).
 - Quita filas vacías, recorta espacios, conserva todo como texto.
 - Acepta punto y coma o coma automáticamente.
+- Rápido: delimitador detectado una vez sobre una muestra, parser C de pandas (o pyarrow con --engine) por
+  bloques, strip vectorizado por columna (.str.strip) y escritura con buffer grande.
+- limpiar_fila() aplica las mismas reglas fila a fila (ingest.py: limpieza + carga sin CSV intermedio).
 """
 
 import sys
@@ -14,25 +17,69 @@ import csv
 from pathlib import Path
 import pandas as pd
 
-VERSION = "2025-08-13-r1"
+try:
+    import pyarrow  # noqa: F401  (opcional: solo para --engine pyarrow)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 
-def leer_csv_cauto(path: Path) -> pd.DataFrame:
-    # sep=None + engine="python" infiere delimitador; dtype=str para no perder ceros a la izquierda
-    return pd.read_csv(path, sep=None, engine="python", encoding="utf-8", dtype=str)
+VERSION = "2025-10-18-r2"
+
+SNIFF_BYTES = 64 * 1024
+CHUNK_ROWS = 200_000          # filas por bloque con el parser C (memoria acotada en CSV grandes)
+WRITE_BUFFER = 1 << 20        # buffer del archivo destino
+
+def sniff_sep(path: Path) -> str:
+    # una sola vez por archivo, sobre una muestra (sep=None re-detecta con el parser Python, fila a fila)
+    with open(path, "r", encoding="utf-8", errors="ignore", newline="") as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ";" if sample.count(";") > sample.count(",") else ","
+
+def leer_csv_cauto(path: Path, engine: str = "c", chunksize=None):
+    # dtype=str para no perder ceros a la izquierda. Con chunksize devuelve un iterador de DataFrames.
+    sep = sniff_sep(path)
+    if engine == "pyarrow":
+        return pd.read_csv(path, sep=sep, engine="pyarrow", encoding="utf-8", dtype=str)
+    return pd.read_csv(path, sep=sep, engine="c", encoding="utf-8", dtype=str, chunksize=chunksize)
 
 def limpiar_df(df: pd.DataFrame) -> pd.DataFrame:
-    # Recorta strings y elimina filas totalmente vacías
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-    df = df.dropna(how="all")
-    return df
+    # Recorta strings (vectorizado por columna) y elimina filas totalmente vacías
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].str.strip()
+    return df.dropna(how="all")
 
-def procesar_archivo(origen: Path, destino: Path) -> bool:
+# valores que pandas.read_csv toma como NaN por defecto (se comparan sin recortar, igual que el parser)
+NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+])
+
+def limpiar_fila(row):
+    """Mismas reglas que leer_csv_cauto + limpiar_df, para una fila cruda (lista de str) del módulo csv:
+    NA -> None, resto recortado. Devuelve None si la fila queda toda NA (limpiar_df la descarta)."""
+    vals = [None if v in NA_VALUES else v.strip() for v in row]
+    return None if all(v is None for v in vals) else vals
+
+def iter_bloques(origen: Path, engine: str):
+    if engine == "pyarrow":
+        yield leer_csv_cauto(origen, engine)
+    else:
+        yield from leer_csv_cauto(origen, engine, chunksize=CHUNK_ROWS)
+
+def procesar_archivo(origen: Path, destino: Path, engine: str = "c") -> bool:
     try:
-        df = leer_csv_cauto(origen)
-        df = limpiar_df(df)
         destino.parent.mkdir(parents=True, exist_ok=True)
-        df.to_csv(destino, index=False, encoding="utf-8-sig", quoting=csv.QUOTE_NONNUMERIC)
-        print(f"[OK] {origen.name} → {destino.name} ({len(df)} filas)")
+        filas = 0
+        with open(destino, "w", encoding="utf-8-sig", newline="", buffering=WRITE_BUFFER) as fh:
+            for i, df in enumerate(iter_bloques(origen, engine)):
+                df = limpiar_df(df)
+                df.to_csv(fh, index=False, header=(i == 0), quoting=csv.QUOTE_NONNUMERIC)
+                filas += len(df)
+        print(f"[OK] {origen.name} → {destino.name} ({filas} filas)")
         return True
     except Exception as e:
         print(f"[ERROR] {origen.name}: {e}")
@@ -43,6 +90,8 @@ def main():
     base = Path(__file__).resolve().parents[1]  # C:\RadarPremios
     parser.add_argument("--src", default=str(base / "data" / "crudos"), help="Carpeta origen (CSVs crudos)")
     parser.add_argument("--dst", default=str(base / "data" / "limpio"), help="Carpeta destino (CSVs limpios)")
+    parser.add_argument("--engine", choices=("c", "pyarrow"), default="c",
+                        help="Parser de pandas: c (por bloques, default) o pyarrow (archivo completo, requiere pyarrow)")
     parser.add_argument("--version", action="store_true", help="Imprime versión y sale")
     args = parser.parse_args()
 
@@ -50,6 +99,10 @@ def main():
         print(VERSION)
         sys.exit(0)
 
+    if args.engine == "pyarrow" and not HAS_PYARROW:
+        print("[WARN] pyarrow no está instalado; se usa el parser C.")
+        args.engine = "c"
+
     src = Path(args.src).resolve()
     dst = Path(args.dst).resolve()
 
@@ -65,7 +118,7 @@ def main():
 
     ok = 0
     for a in archivos:
-        if procesar_archivo(a, dst / a.name):
+        if procesar_archivo(a, dst / a.name, args.engine):
             ok += 1
 
     print(f"[RESUMEN] {ok}/{len(archivos)} limpiados.")
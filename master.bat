@@ -52,7 +52,7 @@ call :run_py "%RP_SCRIPTS%\validate_csvs.py" --src "%RP_DATA_LIMPIO%" || goto :f
 
 rem ===================== CARGA DB ==============================
 call :log "[RUN] Cargar DB"
-call :run_py "%RP_SCRIPTS%\load_to_db.py" --db "%RP_DB%" --src "%RP_DATA_LIMPIO%" || goto :fail
+call :run_py "%RP_SCRIPTS%\cargar_db.py" --db "%RP_DB%" --src "%RP_DATA_LIMPIO%" --report "%RP_LOGS%\load_report_%_d%_%_t%.json" || goto :fail
 
 rem ===================== APPLY SQL ============================
 for %%F in ("%RP_SQL_APPLY%\*.sql") do (
@@ -108,7 +108,7 @@ exit /b 0
 
 :run_py
 rem Ejecuta Python sin entrada (stdin->NUL), con log y retorno de rc.
-set "CMD=%PY% %~1 %~2 %~3 %~4 %~5"
+set "CMD=%PY% %~1 %~2 %~3 %~4 %~5 %~6 %~7"
 call :log "[CMD] %CMD%"
 rem Redirigimos stdout/stderr al log; consola verá solo OK/FAIL
 cmd /c "%CMD% <NUL >> "%RP_LOGFILE%" 2>&1"
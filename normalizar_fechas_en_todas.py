@@ -1,8 +1,18 @@
 # normalizar_fechas_en_todas.py
+# Migración única: lleva a ISO (YYYY-MM-DD) toda columna 'fecha' (o declarada DATE) de todas las tablas.
+# Acepta DD/MM/YYYY, DD/MM/YY (20YY) y las fechas largas en español de los scrapers (column_types.to_date); lo que no
+# es una fecha reconocible (o ya está en ISO) no se toca.
+# Desde que cargar_db.py / ingest.py escriben las fechas ya en ISO, basta con correrla una vez: queda registrada
+# en db_migraciones y las siguientes corridas (y el barrido de actualizar_base_astroluna.py) no hacen nada.
 # Uso:
 #   python normalizar_fechas_en_todas.py --db "C:\RadarPremios\radar_premios.db"
+#   python normalizar_fechas_en_todas.py --db "C:\RadarPremios\radar_premios.db" --force   (vuelve a barrer)
 import argparse, sqlite3, sys, os
 
+from column_types import declared_types, register_iso_fecha
+
+MIGRACION = "fechas_iso"
+
 SQL_LIST_TABLES = """
 SELECT name
 FROM sqlite_master
@@ -12,21 +22,43 @@ WHERE type='table'
 
 SQL_PRAGMA_TABLE_INFO = "PRAGMA table_info({});"
 
-SQL_COUNT_BARRAS = "SELECT COUNT(*) FROM {} WHERE {} LIKE '%/%';"
+SQL_COUNT_NO_ISO = "SELECT COUNT(*) FROM {tabla} WHERE {col} IS NOT iso_fecha({col});"
 
 SQL_UPDATE_NORMALIZA = """
 UPDATE {tabla}
-SET {col} = CASE
-  WHEN {col} GLOB '??/??/????'
-    THEN substr({col},7,4) || '-' || substr({col},4,2) || '-' || substr({col},1,2)
-  ELSE {col}
-END
-WHERE {col} LIKE '%/%';
+SET {col} = iso_fecha({col})
+WHERE {col} IS NOT iso_fecha({col});
+"""
+
+SQL_RESTO = """
+SELECT DISTINCT {col} FROM {tabla}
+WHERE {col} <> '' AND {col} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+LIMIT 3;
+"""
+
+SQL_MIGRACIONES = """
+CREATE TABLE IF NOT EXISTS db_migraciones(
+  nombre   TEXT PRIMARY KEY,
+  aplicada TEXT NOT NULL
+);
 """
 
+def migracion_aplicada(conn, nombre=MIGRACION):
+    """Fecha en que se aplicó la migración (None si nunca)."""
+    try:
+        row = conn.execute("SELECT aplicada FROM db_migraciones WHERE nombre=?", (nombre,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def marcar_migracion(conn, nombre=MIGRACION):
+    conn.execute(SQL_MIGRACIONES)
+    conn.execute("INSERT OR REPLACE INTO db_migraciones(nombre, aplicada) VALUES(?, datetime('now'))", (nombre,))
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--db", required=True, help="Ruta a la base SQLite")
+    p.add_argument("--force", action="store_true", help="Barre de nuevo aunque la migración ya esté registrada")
     args = p.parse_args()
 
     db = args.db
@@ -37,36 +69,54 @@ def main():
     con = sqlite3.connect(db)
     con.isolation_level = None  # usaremos BEGIN/COMMIT manual
     cur = con.cursor()
+    register_iso_fecha(con)
+
+    aplicada = migracion_aplicada(con)
+    if aplicada and not args.force:
+        print(f"[OK] Fechas ya en ISO (migración '{MIGRACION}' aplicada {aplicada}); la carga escribe ISO. "
+              f"Nada que hacer (usa --force para barrer igual).")
+        return
 
-    # Recolectar tablas con columna 'fecha' (tipo TEXT o sin tipo)
+    # Recolectar tablas con columna 'fecha' o declarada DATE (tipo TEXT o sin tipo)
     cur.execute(SQL_LIST_TABLES)
     tablas = [r[0] for r in cur.fetchall()]
     objetivos = []  # [(tabla, col_fecha)]
     for t in tablas:
         cur.execute(SQL_PRAGMA_TABLE_INFO.format(f'"{t}"'))
         cols = cur.fetchall()  # cid, name, type, notnull, dflt, pk
+        tipos = declared_types(con, t)
         for _, name, ctype, *_ in cols:
-            if name.lower() == "fecha":
+            if name.lower() == "fecha" or tipos.get(name) == "DATE":
                 objetivos.append((t, name))
-                break
 
-    print(f"[INFO] Tablas con columna 'fecha': {len(objetivos)}")
+    print(f"[INFO] Columnas de fecha: {len(objetivos)}")
+    fallidas = 0
     for t, c in sorted(objetivos):
-        # ¿Cuántas con barra?
-        cur.execute(SQL_COUNT_BARRAS.format(f'"{t}"', f'"{c}"'))
-        con_barra = cur.fetchone()[0]
-        if con_barra == 0:
-            print(f"  - {t}: OK (sin barras)")
-            continue
-
-        print(f"  - {t}: normalizando {con_barra} filas ...")
-        try:
-            cur.execute("BEGIN;")
-            cur.execute(SQL_UPDATE_NORMALIZA.format(tabla=f'"{t}"', col=f'"{c}"'))
-            cur.execute("COMMIT;")
-        except Exception as e:
-            cur.execute("ROLLBACK;")
-            print(f"    [WARN] {t}: no se pudo normalizar -> {e}")
+        q = dict(tabla=f'"{t}"', col=f'"{c}"')
+        # ¿Cuántas no están en ISO (y son convertibles)?
+        cur.execute(SQL_COUNT_NO_ISO.format(**q))
+        pendientes = cur.fetchone()[0]
+        if pendientes == 0:
+            print(f"  - {t}.{c}: OK (ya en ISO)")
+        else:
+            print(f"  - {t}.{c}: normalizando {pendientes} filas ...")
+            try:
+                cur.execute("BEGIN;")
+                cur.execute(SQL_UPDATE_NORMALIZA.format(**q))
+                cur.execute("COMMIT;")
+            except Exception as e:
+                cur.execute("ROLLBACK;")
+                fallidas += 1
+                print(f"    [WARN] {t}: no se pudo normalizar -> {e}")
+        resto = [r[0] for r in cur.execute(SQL_RESTO.format(**q))]
+        if resto:
+            print(f"    [WARN] {t}.{c}: quedan valores que no son fecha reconocible, p.ej. {resto}")
+
+    if fallidas == 0:
+        marcar_migracion(con)
+        print(f"[OK] Migración '{MIGRACION}' registrada: cargar_db/ingest ya escriben ISO, no hace falta volver a barrer.")
+    else:
+        print(f"[WARN] {fallidas} columnas no se pudieron normalizar; la migración no se registra.")
 
     # Índices por rendimiento (si existen las tablas)
     for idx_stmt in [
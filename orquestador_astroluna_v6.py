@@ -7,6 +7,19 @@ Cambios clave v6:
 - Habilitado rebuild para 'todos_resumen_matriz_aslu' (copia segura desde matriz).
 - Verificación explícita (COUNT y MAX(fecha)) de 'astro_luna', 'matriz_astro_luna' y de la vista 'todo'.
 - Opción --recrear-vista-todo para (re)crear: CREATE VIEW todo AS SELECT * FROM matriz_astro_luna.
+- --reconstruir-matriz es incremental: solo agrega a la matriz las filas de astro_luna posteriores a la última
+  sincronización (rowid > marca en matriz_astro_luna_sync, o fecha > MAX(fecha) de la matriz) que falten por
+  (fecha, numero). Reconstrucción completa (DROP + swap) solo si cambió el esquema de la matriz, si no hay marca
+  de sincronización o con --full (p.ej. tras borrar/corregir filas de astro_luna).
+- cuando_* y todo_cuando_* también son incrementales: cada tabla guarda en derivadas_sync hasta qué rowid de la
+  matriz tiene volcado; las filas nuevas de la matriz se leen una sola vez y se reparten a cada tabla cuyo
+  predicado (parse_cuando / build_where_for_cuando) cumplen. DELETE + INSERT completo solo si la tabla no tiene
+  marca, si la matriz se reconstruyó (la marca ya no cuadra) o con --full.
+- Las reconstrucciones completas (cuando_*, todo_cuando_*, *_resumen_matriz_aslu, todos_cuando_son) se hacen
+  tabla por tabla con INSERT ... SELECT dentro de SQLite. Con --una-pasada van por un router de una pasada: la
+  matriz se lee una vez por bloques y cada fila se reparte desde Python con una tabla de despacho compilada
+  (dígito x máscara de posiciones) a todas las tablas destino, en una sola transacción. La ganancia contra el
+  recorrido por tabla es marginal o nula según la BD (bench_derivadas.py: 1.0x-1.2x), por eso queda como opción.
 
 Uso:
   DRY-RUN:
@@ -15,6 +28,9 @@ Uso:
   Real + reporte + VACUUM:
     python orquestador_astroluna_v6.py --db "C:\\RadarPremios\\radar_premios.db" --reconstruir-matriz --reporte "C:\\RadarPremios\\reporte_v6.csv" --vacuum
 
+  Forzar reconstrucción completa de la matriz:
+    python orquestador_astroluna_v6.py --db "C:\\RadarPremios\\radar_premios.db" --reconstruir-matriz --full
+
   Recrear la vista 'todo':
     python orquestador_astroluna_v6.py --db "C:\\RadarPremios\\radar_premios.db" --recrear-vista-todo
 """
@@ -24,9 +40,13 @@ import os
 import re
 import sqlite3
 from contextlib import contextmanager
-from typing import List, Optional, Sequence, Tuple
+from operator import itemgetter
+from typing import Callable, List, Optional, Sequence, Tuple
 
 MATRIX_TABLE = "matriz_astro_luna"
+MATRIX_SYNC_TABLE = "matriz_astro_luna_sync"  # marca de sincronización: último rowid de la fuente ya volcado
+MATRIX_POS = ["um", "c", "d", "u"]
+DERIVED_SYNC_TABLE = "derivadas_sync"  # por tabla cuando_*/todo_cuando_*: rowid de la matriz ya volcado
 SOURCE_CANDIDATES = ["astro_luna", "astroluna"]
 
 # Tablas que NO se tocan (fuentes y otros sorteos)
@@ -88,42 +108,22 @@ def detect_source(conn: sqlite3.Connection) -> Optional[str]:
     return None
 
 # ---------------- Reconstrucción extendida de la matriz ----------------
-def create_full_matrix_sql(source: str, matrix_exists: bool) -> str:
-    pos = ["um", "c", "d", "u"]
-    digits = list(range(10))
-    flag_cols = []
-    for p in pos:
-        for k in digits:
-            flag_cols.append(f'{p}_{k} INTEGER NOT NULL')
+def matrix_columns() -> List[str]:
+    flags = [f"{p}_{k}" for p in MATRIX_POS for k in range(10)]
+    return ["fecha", "numero", "signo"] + MATRIX_POS + ["origen", "origen_tabla", "combinacion"] + flags
 
-    create_sql = f"""
-DROP TABLE IF EXISTS matriz_astro_luna_new;
-
-CREATE TABLE matriz_astro_luna_new (
-  fecha TEXT NOT NULL,
-  numero INTEGER NOT NULL,
-  signo TEXT,
-  um INTEGER NOT NULL,
-  c  INTEGER NOT NULL,
-  d  INTEGER NOT NULL,
-  u  INTEGER NOT NULL,
-  origen TEXT NOT NULL,
-  origen_tabla TEXT NOT NULL,
-  combinacion TEXT NOT NULL,
-  {", ".join(flag_cols)}
-);
-
-INSERT INTO matriz_astro_luna_new (
-  fecha, numero, signo, um, c, d, u, origen, origen_tabla, combinacion,
-  {", ".join([f"{p}_{k}" for p in pos for k in digits])}
-)
+def matrix_rows_sql(source: str, where: str = "") -> str:
+    # WITH ... SELECT de las filas de la matriz (mismas expresiones para la reconstrucción y el incremental)
+    digits = list(range(10))
+    return f"""
 WITH base AS (
   SELECT
     fecha,
     numero,
     signo,
     printf('%04d', CAST(numero AS INTEGER)) AS n4
-  FROM "{source}"
+  FROM "{source}" s
+  {where}
 ),
 dig AS (
   SELECT
@@ -148,16 +148,73 @@ SELECT
   {", ".join([f"CASE WHEN c={k} THEN 1 ELSE 0 END AS c_{k}" for k in digits])},
   {", ".join([f"CASE WHEN d={k} THEN 1 ELSE 0 END AS d_{k}" for k in digits])},
   {", ".join([f"CASE WHEN u={k} THEN 1 ELSE 0 END AS u_{k}" for k in digits])}
-FROM dig;
+FROM dig""".strip()
+
+def sync_sql(source: str) -> str:
+    return f"""
+CREATE TABLE IF NOT EXISTS {MATRIX_SYNC_TABLE} (
+  fuente TEXT PRIMARY KEY,
+  src_rowid INTEGER NOT NULL,
+  actualizado TEXT NOT NULL
+);
+INSERT INTO {MATRIX_SYNC_TABLE} (fuente, src_rowid, actualizado)
+VALUES ('{source}', (SELECT COALESCE(MAX(rowid), 0) FROM "{source}"), datetime('now'))
+ON CONFLICT(fuente) DO UPDATE SET src_rowid = excluded.src_rowid, actualizado = excluded.actualizado;
+""".strip()
+
+def matrix_index_sql(conn: sqlite3.Connection) -> List[str]:
+    """CREATE INDEX de la matriz actual (p.ej. los de cuando_virtual.py) que siguen siendo válidos con el esquema
+    nuevo, para recrearlos tras el swap de la reconstrucción completa."""
+    if not table_exists(conn, MATRIX_TABLE):
+        return []
+    cols = set(matrix_columns())
+    out = []
+    for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? "
+                                  "AND sql IS NOT NULL", (MATRIX_TABLE,)).fetchall():
+        if all(r[2] in cols for r in conn.execute(f'PRAGMA index_info("{name}")')):
+            out.append(sql.rstrip().rstrip(";") + ";")
+    return out
+
+def create_full_matrix_sql(source: str, matrix_exists: bool, keep_indexes: Sequence[str] = ()) -> str:
+    pos = MATRIX_POS
+    digits = list(range(10))
+    flag_cols = []
+    for p in pos:
+        for k in digits:
+            flag_cols.append(f'{p}_{k} INTEGER NOT NULL')
+
+    create_sql = f"""
+DROP TABLE IF EXISTS matriz_astro_luna_new;
+
+CREATE TABLE matriz_astro_luna_new (
+  fecha TEXT NOT NULL,
+  numero INTEGER NOT NULL,
+  signo TEXT,
+  um INTEGER NOT NULL,
+  c  INTEGER NOT NULL,
+  d  INTEGER NOT NULL,
+  u  INTEGER NOT NULL,
+  origen TEXT NOT NULL,
+  origen_tabla TEXT NOT NULL,
+  combinacion TEXT NOT NULL,
+  {", ".join(flag_cols)}
+);
+
+INSERT INTO matriz_astro_luna_new (
+  {", ".join(matrix_columns())}
+)
+{matrix_rows_sql(source)};
 """.strip()
 
     if matrix_exists:
         swap_sql = f"""
 PRAGMA foreign_keys = OFF;
+PRAGMA legacy_alter_table = ON;
 DROP TABLE IF EXISTS matriz_astro_luna_backup;
 ALTER TABLE "{MATRIX_TABLE}" RENAME TO matriz_astro_luna_backup;
 ALTER TABLE matriz_astro_luna_new RENAME TO "{MATRIX_TABLE}";
 DROP TABLE IF EXISTS matriz_astro_luna_backup;
+PRAGMA legacy_alter_table = OFF;
 PRAGMA foreign_keys = ON;
 """.strip()
     else:
@@ -167,7 +224,59 @@ ALTER TABLE matriz_astro_luna_new RENAME TO "{MATRIX_TABLE}";
 PRAGMA foreign_keys = ON;
 """.strip()
 
-    return create_sql + "\n\n" + swap_sql
+    # legacy_alter_table: sin él, el RENAME reescribe las vistas sobre la matriz (todo, cuando_* virtuales)
+    # para que apunten a matriz_astro_luna_backup, que se borra a continuación.
+    # Índices: los que tenía la matriz + el del anti-join (fecha, numero) del incremental; luego la marca.
+    # Los rowid de la matriz cambian: las marcas de las tablas derivadas dejan de valer
+    index_sql = "\n".join(list(keep_indexes) + [
+        f'CREATE INDEX IF NOT EXISTS idx_matriz_aslu_fecha ON "{MATRIX_TABLE}"(fecha);'])
+    reset_sql = f"DROP TABLE IF EXISTS {DERIVED_SYNC_TABLE};"
+    return create_sql + "\n\n" + swap_sql + "\n\n" + index_sql + "\n" + reset_sql + "\n" + sync_sql(source)
+
+def get_sync_rowid(conn: sqlite3.Connection, source: str) -> Optional[int]:
+    if not table_exists(conn, MATRIX_SYNC_TABLE):
+        return None
+    row = conn.execute(f"SELECT src_rowid FROM {MATRIX_SYNC_TABLE} WHERE fuente=?", (source,)).fetchone()
+    return row[0] if row else None
+
+def matrix_needs_full(conn: sqlite3.Connection, source: str) -> Optional[str]:
+    """Motivo para reconstruir completa la matriz, o None si basta el incremental."""
+    if not table_exists(conn, MATRIX_TABLE):
+        return "matriz inexistente"
+    if [c[1] for c in get_cols(conn, MATRIX_TABLE)] != matrix_columns():
+        return "cambió el esquema de la matriz"
+    row = conn.execute(f'SELECT origen_tabla FROM "{MATRIX_TABLE}" LIMIT 1').fetchone()
+    if row is not None and row[0] != source:
+        return f"la matriz viene de '{row[0]}'"
+    if get_sync_rowid(conn, source) is None:
+        return "sin marca de sincronización"
+    return None
+
+def incremental_where() -> str:
+    # filas nuevas de la fuente (por rowid o por fecha) que aún no están en la matriz por (fecha, numero)
+    return f"""WHERE (s.rowid > :wm OR s.fecha > :maxf)
+    AND NOT EXISTS (
+      SELECT 1 FROM "{MATRIX_TABLE}" m
+      WHERE m.fecha = s.fecha AND m.numero = CAST(s.numero AS INTEGER)
+    )"""
+
+def pending_matrix_rows(conn: sqlite3.Connection, source: str) -> int:
+    params = {"wm": get_sync_rowid(conn, source), "maxf": max_fecha(conn, MATRIX_TABLE) or ""}
+    return conn.execute(f'SELECT COUNT(*) FROM "{source}" s {incremental_where()}', params).fetchone()[0]
+
+def append_matrix_rows(conn: sqlite3.Connection, source: str) -> int:
+    """Incremental: agrega solo las filas nuevas (O(sorteos nuevos) vía rowid y el índice por fecha)."""
+    params = {"wm": get_sync_rowid(conn, source), "maxf": max_fecha(conn, MATRIX_TABLE) or ""}
+    with tx(conn):
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_matriz_aslu_fecha ON "{MATRIX_TABLE}"(fecha)')
+        cur = conn.execute(
+            f'INSERT INTO "{MATRIX_TABLE}" ({", ".join(matrix_columns())})\n'
+            f'{matrix_rows_sql(source, incremental_where())}', params)
+        added = cur.rowcount
+        for stmt in sync_sql(source).split(";"):
+            if stmt.strip():
+                conn.execute(stmt)
+    return added
 
 # ---------------- Reglas por nombre ----------------
 DIGIT_MAP = {
@@ -226,6 +335,101 @@ def is_todo_cuando(name: str):
 def build_where_for_todo_cuando(digit: int) -> str:
     return f"(um = {digit} OR c = {digit} OR d = {digit} OR u = {digit})"
 
+def cuando_rule(table: str) -> Optional[Tuple[str, Callable[[sqlite3.Row], bool], str]]:
+    """(WHERE, predicado Python equivalente, etiqueta) de una tabla cuando_* / todo_cuando_*; None si no aplica."""
+    if is_todo_cuando(table):
+        d_raw = RE_TODO_CUANDO.match(table).group("d").lower()
+        if d_raw not in DIGIT_MAP:
+            return None
+        digit = DIGIT_MAP[d_raw]
+        return (build_where_for_todo_cuando(digit),
+                lambda r: r["um"] == digit or r["c"] == digit or r["d"] == digit or r["u"] == digit,
+                "todo_cuando")
+    parsed = parse_cuando(table)
+    if not parsed:
+        return None
+    digit, groups = parsed
+    pos = sorted({p for g in groups for p in g})
+    if not pos:
+        return (build_where_for_cuando(digit, groups), lambda r: False, "cuándo")
+    return (build_where_for_cuando(digit, groups), lambda r: all(r[p] == digit for p in pos), "cuándo")
+
+# ---------------- Marcas de sincronización de cuando_* / todo_cuando_* ----------------
+def ensure_derived_sync(conn: sqlite3.Connection):
+    conn.execute(f"""
+CREATE TABLE IF NOT EXISTS {DERIVED_SYNC_TABLE} (
+  tabla TEXT PRIMARY KEY,
+  matriz_rowid INTEGER NOT NULL,
+  matriz_filas INTEGER NOT NULL,
+  actualizado TEXT NOT NULL
+)""")
+
+def matrix_mark(conn: sqlite3.Connection) -> Tuple[int, int]:
+    # (MAX(rowid), COUNT(*)) de la matriz en este momento
+    row = conn.execute(f'SELECT COALESCE(MAX(rowid), 0), COUNT(*) FROM "{MATRIX_TABLE}"').fetchone()
+    return row[0], row[1]
+
+def save_derived_sync(conn: sqlite3.Connection, table: str, mark: Tuple[int, int]):
+    conn.execute(f"""
+INSERT INTO {DERIVED_SYNC_TABLE} (tabla, matriz_rowid, matriz_filas, actualizado)
+VALUES (?, ?, ?, datetime('now'))
+ON CONFLICT(tabla) DO UPDATE SET matriz_rowid = excluded.matriz_rowid, matriz_filas = excluded.matriz_filas,
+  actualizado = excluded.actualizado""", (table, mark[0], mark[1]))
+
+def derived_sync_rowid(conn: sqlite3.Connection, table: str, checked: dict) -> Optional[int]:
+    """rowid de la matriz hasta el que 'table' está al día, o None si toca reconstruirla completa.
+    La marca vale si la matriz conserva exactamente las filas que tenía hasta ese rowid (mismo COUNT)."""
+    if not table_exists(conn, DERIVED_SYNC_TABLE):
+        return None
+    row = conn.execute(f"SELECT matriz_rowid, matriz_filas FROM {DERIVED_SYNC_TABLE} WHERE tabla=?",
+                       (table,)).fetchone()
+    if row is None:
+        return None
+    wm, n = row[0], row[1]
+    if (wm, n) not in checked:
+        # una consulta por marca distinta (normalmente todas las tablas comparten la misma)
+        actual = conn.execute(f'SELECT COUNT(*) FROM "{MATRIX_TABLE}" WHERE rowid <= ?', (wm,)).fetchone()[0]
+        checked[(wm, n)] = actual == n
+    return wm if checked[(wm, n)] else None
+
+def route_new_rows(conn: sqlite3.Connection, plans: List[dict]) -> dict:
+    """Una sola pasada por las filas de la matriz posteriores a la marca más antigua: cada fila se agrega a
+    toda tabla cuyo predicado cumple (y que aún no la tenga). Todo en una transacción, marcas incluidas."""
+    if not plans:
+        return {}
+    desde = min(p["rowid"] for p in plans)
+    pend = {p["tabla"]: [] for p in plans}
+    cur = conn.execute(f'SELECT rowid AS _rid, * FROM "{MATRIX_TABLE}" WHERE rowid > ? ORDER BY rowid', (desde,))
+    for r in cur:
+        for p in plans:
+            if r["_rid"] > p["rowid"] and p["pred"](r):
+                pend[p["tabla"]].append(tuple(r[c] for c in p["cols"]))
+    mark = matrix_mark(conn)
+    with tx(conn):
+        for p in plans:
+            rows = pend[p["tabla"]]
+            if rows:
+                colsql = ", ".join(f'"{c}"' for c in p["cols"])
+                marks = ", ".join("?" * len(p["cols"]))
+                conn.executemany(f'INSERT INTO "{p["tabla"]}" ({colsql}) VALUES ({marks})', rows)
+            save_derived_sync(conn, p["tabla"], mark)
+    return {t: len(rows) for t, rows in pend.items()}
+
+def plan_cuando_table(conn: sqlite3.Connection, table: str, full: bool, checked: dict) -> Optional[dict]:
+    """Plan incremental para una tabla cuando_*/todo_cuando_* o None si debe reconstruirse completa."""
+    rule = cuando_rule(table)
+    if rule is None or full:
+        return None
+    wm = derived_sync_rowid(conn, table, checked)
+    if wm is None:
+        return None
+    cols = [c[1] for c in get_cols(conn, MATRIX_TABLE)]
+    comunes = [c[1] for c in get_cols(conn, table) if c[1] in cols]
+    if not comunes:
+        return None
+    where, pred, label = rule
+    return {"tabla": table, "rowid": wm, "pred": pred, "cols": comunes, "where": where, "label": label}
+
 def rebuild_cuando_table(conn: sqlite3.Connection, table: str, dry: bool) -> Tuple[str, str]:
     parsed = parse_cuando(table)
     if not parsed:
@@ -240,9 +444,11 @@ def rebuild_cuando_table(conn: sqlite3.Connection, table: str, dry: bool) -> Tup
     colsql = ", ".join(f'"{c}"' for c in comunes)
     if dry:
         return (f"simulada (cuándo: {where})", where)
+    ensure_derived_sync(conn)
     with tx(conn):
         conn.execute(f'DELETE FROM "{table}"')
         conn.execute(f'INSERT INTO "{table}" ({colsql}) SELECT {colsql} FROM "{MATRIX_TABLE}" WHERE {where}')
+        save_derived_sync(conn, table, matrix_mark(conn))
     return (f"reconstruida (cuándo: {where})", where)
 
 def rebuild_todo_cuando_table(conn: sqlite3.Connection, table: str, dry: bool) -> Tuple[str, str]:
@@ -262,15 +468,21 @@ def rebuild_todo_cuando_table(conn: sqlite3.Connection, table: str, dry: bool) -
     colsql = ", ".join(f'"{c}"' for c in comunes)
     if dry:
         return (f"simulada (todo_cuando: {where})", where)
+    ensure_derived_sync(conn)
     with tx(conn):
         conn.execute(f'DELETE FROM "{table}"')
         conn.execute(f'INSERT INTO "{table}" ({colsql}) SELECT {colsql} FROM "{MATRIX_TABLE}" WHERE {where}')
+        save_derived_sync(conn, table, matrix_mark(conn))
     return (f"reconstruida (todo_cuando: {where})", where)
 
+# columnas de todos_cuando_son que reciben el dígito de la posición: valor_pos (v4/v5) o digito (esquema de
+# actualizar_base_astroluna.py, el que leen v_digit_hotcold y score_candidates.py)
+UNPIVOT_VALUE_COLS = ("valor_pos", "digito")
+
 def rebuild_todos_cuando_son(conn: sqlite3.Connection, table: str, dry: bool) -> str:
     dst_cols = [c[1] for c in get_cols(conn, table)]
     src_cols = [c[1] for c in get_cols(conn, MATRIX_TABLE)]
-    posibles = set(src_cols + ["posicion", "valor_pos"])
+    posibles = set(src_cols + ["posicion", *UNPIVOT_VALUE_COLS])
     comunes = [c for c in dst_cols if c in posibles]
     if not comunes:
         return "omitida (sin columnas compatibles)"
@@ -279,8 +491,8 @@ def rebuild_todos_cuando_son(conn: sqlite3.Connection, table: str, dry: bool) ->
         for c in comunes:
             if c == "posicion":
                 current.append(f"'{label}' AS posicion")
-            elif c == "valor_pos":
-                current.append(f"{pos_col} AS valor_pos")
+            elif c in UNPIVOT_VALUE_COLS:
+                current.append(f'{pos_col} AS "{c}"')
             else:
                 current.append(f'"{c}"')
         return "SELECT " + ", ".join(current) + f' FROM "{MATRIX_TABLE}"'
@@ -317,6 +529,174 @@ def rebuild_todos_resumen_table(conn: sqlite3.Connection, table: str, dry: bool)
     # Para 'todos_resumen_matriz_aslu'
     return rebuild_resumen_table(conn, table, dry)
 
+# ---------------- Router de una pasada (reconstrucción completa de derivadas) ----------------
+POS_BIT = {p: 1 << i for i, p in enumerate(MATRIX_POS)}
+ROUTER_CHUNK = 50_000
+
+def is_derived(name: str) -> bool:
+    return (name == "todos_cuando_son" or bool(is_todo_cuando(name)) or bool(RE_CUANDO.match(name))
+            or bool(RE_RESUMEN.match(name)) or bool(RE_TODOS_RESUMEN.match(name)))
+
+def router_target(conn: sqlite3.Connection, table: str, src_cols: List[str]) -> dict:
+    """Destino del router: columnas a insertar, cómo proyectar la fila de la matriz y regla de despacho.
+    regla: ("copia",) todas las filas | ("unpivot",) 4 filas por fila | ("digito", d, máscara) | ("nunca",)."""
+    dst_cols = [c[1] for c in get_cols(conn, table)]
+    if table == "todos_cuando_son":
+        comunes = [c for c in dst_cols if c in src_cols or c == "posicion" or c in UNPIVOT_VALUE_COLS]
+        return {"tabla": table, "cols": comunes, "regla": ("unpivot",), "etiqueta": "UNPIVOT um/c/d/u"}
+    comunes = [c for c in dst_cols if c in src_cols]
+    if RE_RESUMEN.match(table) or RE_TODOS_RESUMEN.match(table):
+        return {"tabla": table, "cols": comunes, "regla": ("copia",), "etiqueta": "copia segura desde matriz"}
+    if is_todo_cuando(table):
+        d_raw = RE_TODO_CUANDO.match(table).group("d").lower()
+        if d_raw not in DIGIT_MAP:
+            return {"tabla": table, "cols": [], "regla": None, "etiqueta": "dígito no reconocido"}
+        digit = DIGIT_MAP[d_raw]
+        # máscara 0: basta con que el dígito aparezca en alguna posición
+        return {"tabla": table, "cols": comunes, "regla": ("digito", digit, 0),
+                "etiqueta": f"todo_cuando: {build_where_for_todo_cuando(digit)}"}
+    parsed = parse_cuando(table)
+    if not parsed:
+        return {"tabla": table, "cols": [], "regla": None, "etiqueta": "nombre no reconocido"}
+    digit, groups = parsed
+    mask = 0
+    for g in groups:
+        for p in g:
+            mask |= POS_BIT[p]
+    regla = ("digito", digit, mask) if mask else ("nunca",)
+    return {"tabla": table, "cols": comunes, "regla": regla,
+            "etiqueta": f"cuándo: {build_where_for_cuando(digit, groups)}"}
+
+def tuple_getter(idx: List[int]) -> Callable[[tuple], tuple]:
+    # itemgetter que siempre devuelve tupla (con un solo índice itemgetter devuelve el valor suelto)
+    if len(idx) == 1:
+        k = idx[0]
+        return lambda r: (r[k],)
+    return itemgetter(*idx)
+
+def rebuild_derived_single_pass(conn: sqlite3.Connection, tables: List[str],
+                                chunk: int = ROUTER_CHUNK) -> dict:
+    """Reconstruye todas las 'tables' leyendo la matriz una sola vez. Devuelve {tabla: (estado, detalle)}.
+    Los índices de las tablas destino se quitan durante la carga y se recrean al final (un solo ordenamiento
+    por índice en vez de mantenerlo fila a fila); todo dentro de la misma transacción."""
+    src_cols = [c[1] for c in get_cols(conn, MATRIX_TABLE)]
+    out, targets = {}, []
+    for t in tables:
+        tg = router_target(conn, t, src_cols)
+        if tg["regla"] is None:
+            out[t] = (f"omitida ({tg['etiqueta']})", "")
+        elif not tg["cols"]:
+            out[t] = ("omitida (sin columnas comunes con matriz)", "")
+        else:
+            targets.append(tg)
+    if not targets:
+        return out
+    # de la matriz solo se leen las columnas que usa algún destino, más um/c/d/u
+    usadas = set(MATRIX_POS).union(*(tg["cols"] for tg in targets))
+    src_cols = [c for c in src_cols if c in usadas]
+    col_idx = {c: i for i, c in enumerate(src_cols)}
+    pos_idx = [col_idx[p] for p in MATRIX_POS]
+
+    # tabla de despacho: dígito -> [(máscara requerida, destino)]; destinos 'copia' reciben todo
+    dispatch: dict = {}
+    siempre, unpivot = [], []
+    for i, tg in enumerate(targets):
+        regla = tg["regla"]
+        if regla[0] == "digito":
+            dispatch.setdefault(regla[1], []).append((regla[2], i))
+        elif regla[0] == "copia":
+            siempre.append(i)
+        elif regla[0] == "unpivot":
+            unpivot.append(i)
+
+    def hits_for(combo: tuple) -> Tuple[int, ...]:
+        # destinos de una combinación (um, c, d, u); hay a lo sumo 10^4 combinaciones, se memoizan
+        seen: dict = {}
+        for b, v in enumerate(combo):
+            seen[v] = seen.get(v, 0) | (1 << b)
+        hits = list(siempre)
+        for v, m in seen.items():
+            for req, i in dispatch.get(v, ()):
+                if m & req == req:
+                    hits.append(i)
+        return tuple(sorted(hits))
+
+    # proyecciones compartidas: una por lista de columnas distinta (las cuando_* suelen tener la misma);
+    # la fila se extiende con las etiquetas de posición para que el UNPIVOT también sea un itemgetter
+    n = len(src_cols)
+    ext_idx = col_idx
+    getters, proj_of, unpiv_getters = {}, [], {}
+    for i, tg in enumerate(targets):
+        if tg["regla"][0] == "unpivot":
+            unpiv_getters[i] = [
+                tuple_getter([n + k if c == "posicion" else pos_idx[k] if c in UNPIVOT_VALUE_COLS else ext_idx[c]
+                              for c in tg["cols"]])
+                for k in range(4)]
+            proj_of.append(None)
+            continue
+        key = tuple(tg["cols"])
+        if key not in getters:
+            getters[key] = (len(getters), tuple_getter([col_idx[c] for c in key]))
+        proj_of.append(getters[key][0])
+    proj_getters = [g for _, g in sorted(getters.values(), key=lambda x: x[0])]
+    pad = tuple(MATRIX_POS)
+
+    inserts = []
+    for tg in targets:
+        colsql = ", ".join(f'"{c}"' for c in tg["cols"])
+        inserts.append(f'INSERT INTO "{tg["tabla"]}" ({colsql}) VALUES ({", ".join("?" * len(tg["cols"]))})')
+    bufs = [[] for _ in targets]
+    counts = [0] * len(targets)
+    sel = ", ".join(f'"{c}"' for c in src_cols)
+    memo: dict = {}
+    npos = [pos_idx[0], pos_idx[1], pos_idx[2], pos_idx[3]]
+
+    ensure_derived_sync(conn)
+    with tx(conn):
+        indices = []
+        for tg in targets:
+            conn.execute(f'DELETE FROM "{tg["tabla"]}"')
+            indices += conn.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? "
+                                    "AND sql IS NOT NULL", (tg["tabla"],)).fetchall()
+        for name, _ in indices:
+            conn.execute(f'DROP INDEX "{name}"')
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(f'SELECT {sel} FROM "{MATRIX_TABLE}" ORDER BY rowid')
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                break
+            for row in rows:
+                combo = (row[npos[0]], row[npos[1]], row[npos[2]], row[npos[3]])
+                hits = memo.get(combo)
+                if hits is None:
+                    hits = memo[combo] = hits_for(combo)
+                ext = row + pad
+                last_j, vals = -1, None
+                for i in hits:
+                    j = proj_of[i]
+                    if j != last_j:
+                        vals, last_j = proj_getters[j](ext), j
+                    bufs[i].append(vals)
+                for i in unpivot:
+                    bufs[i].extend(g(ext) for g in unpiv_getters[i])
+            for i, b in enumerate(bufs):
+                if b:
+                    conn.executemany(inserts[i], b)
+                    counts[i] += len(b)
+                    bufs[i] = []
+        for _, sql in indices:
+            conn.execute(sql)
+        mark = matrix_mark(conn)
+        for tg in targets:
+            if tg["regla"][0] in ("digito", "nunca"):
+                save_derived_sync(conn, tg["tabla"], mark)
+    for tg, cnt in zip(targets, counts):
+        where = tg["etiqueta"].split(": ", 1)[1] if ": " in tg["etiqueta"] else ""
+        out[tg["tabla"]] = (f"reconstruida en una pasada ({tg['etiqueta']}; {cnt} filas)", where)
+    return out
+
 # ---------------- Verificaciones y vista 'todo' ----------------
 def verify_object(conn: sqlite3.Connection, name: str) -> Tuple[str, str]:
     typ = object_type(conn, name)
@@ -360,13 +740,16 @@ def main():
 
     ap = argparse.ArgumentParser(description="Orquestador Astroluna v6")
     ap.add_argument("--db", required=True, help="Ruta a la BD SQLite. Ej: C:\\RadarPremios\\radar_premios.db")
-    ap.add_argument("--reconstruir-matriz", action="store_true", help="Reconstruir matriz extendida desde astro_luna/astroluna")
+    ap.add_argument("--reconstruir-matriz", action="store_true", help="Actualizar matriz extendida desde astro_luna/astroluna (incremental)")
+    ap.add_argument("--full", action="store_true", help="Reconstrucción completa de la matriz (con --reconstruir-matriz) y de cuando_*/todo_cuando_*")
     ap.add_argument("--recrear-vista-todo", action="store_true", help="(Re)crear vista 'todo' como SELECT * FROM matriz_astro_luna")
     ap.add_argument("--dry-run", action="store_true", help="Simular sin escribir cambios")
     ap.add_argument("--targets", nargs="*", help="Limitar a ciertas tablas")
     ap.add_argument("--exclude", nargs="*", help="Exclusiones adicionales")
     ap.add_argument("--reporte", help="Guardar reporte CSV")
     ap.add_argument("--vacuum", action="store_true", help="VACUUM al final (si no es dry-run)")
+    ap.add_argument("--una-pasada", action="store_true",
+                    help="Reconstrucciones completas de derivadas con el router de una pasada (por defecto: INSERT ... SELECT por tabla)")
     args = ap.parse_args()
 
     db_path = args.db
@@ -395,17 +778,27 @@ def main():
             if not src:
                 raise SystemExit("[ERROR] No se encontró tabla fuente 'astro_luna' ni 'astroluna'.")
             matrix_exists = table_exists(conn, MATRIX_TABLE)
-            sql_script = create_full_matrix_sql(src, matrix_exists)
+            motivo = "--full" if args.full else matrix_needs_full(conn, src)
             if args.dry_run:
                 max_src = max_fecha(conn, src)
-                print("[INFO] DRY-RUN: reconstruir matriz extendida desde '{}' (MAX(fecha)={})".format(src, max_src))
-            else:
-                print("[INFO] Reconstruyendo matriz extendida desde '{}' ...".format(src))
+                if motivo:
+                    print("[INFO] DRY-RUN: reconstruir matriz extendida desde '{}' ({}; MAX(fecha)={})".format(src, motivo, max_src))
+                else:
+                    print("[INFO] DRY-RUN: incremental, {} filas nuevas desde '{}' (MAX(fecha)={})".format(
+                        pending_matrix_rows(conn, src), src, max_src))
+            elif motivo:
+                print("[INFO] Reconstruyendo matriz extendida desde '{}' ({}) ...".format(src, motivo))
+                sql_script = create_full_matrix_sql(src, matrix_exists, matrix_index_sql(conn))
                 with tx(conn):
                     conn.executescript(sql_script)
                 max_src = max_fecha(conn, src)
                 max_mat = max_fecha(conn, MATRIX_TABLE)
                 print("[OK] Matriz lista. MAX(fecha) src={} | matriz={}".format(max_src, max_mat))
+            else:
+                added = append_matrix_rows(conn, src)
+                max_src = max_fecha(conn, src)
+                max_mat = max_fecha(conn, MATRIX_TABLE)
+                print("[OK] Matriz incremental: +{} filas. MAX(fecha) src={} | matriz={}".format(added, max_src, max_mat))
         else:
             print("[INFO] Reconstrucción de matriz omitida.")
 
@@ -415,6 +808,9 @@ def main():
         if args.exclude:
             exclude_set.update(args.exclude)
 
+        incrementales: List[dict] = []  # cuando_*/todo_cuando_* al día hasta una marca: se reparten al final
+        checked: dict = {}
+        completas: List[Tuple[int, str, str]] = []  # (posición en acciones, tabla, tipo) para el router
         for name, otype in objs:
             # Verificación prioritaria para ALWAYS_VERIFY
             if name in ALWAYS_VERIFY:
@@ -443,6 +839,20 @@ def main():
             if args.targets and name not in args.targets:
                 continue
 
+            # Regla: cuando_* / todo_cuando_* con marca válida -> incremental (una sola pasada al final)
+            plan = plan_cuando_table(conn, name, args.full, checked)
+            if plan is not None:
+                plan["accion"] = len(acciones)
+                acciones.append((name, otype, "", plan["where"]))
+                incrementales.append(plan)
+                continue
+
+            # --una-pasada: las reconstrucciones completas de derivadas se juntan y se hacen en una pasada al final
+            if args.una_pasada and is_derived(name) and not args.dry_run:
+                completas.append((len(acciones), name, otype))
+                acciones.append((name, otype, "", ""))
+                continue
+
             # Regla: todos_cuando_son
             if name == "todos_cuando_son":
                 estado = rebuild_todos_cuando_son(conn, name, args.dry_run)
@@ -476,6 +886,28 @@ def main():
             # Por defecto: no tocar
             acciones.append((name, otype, "omitida (sin regla específica)", ""))
 
+        if completas:
+            res = rebuild_derived_single_pass(conn, [name for _, name, _ in completas])
+            for idx, name, otype in completas:
+                acciones[idx] = (name, otype, res[name][0], res[name][1])
+            print("[OK] Derivadas reconstruidas en una pasada: {} tablas".format(len(completas)))
+
+        if incrementales:
+            if args.dry_run:
+                mark = matrix_mark(conn)[0]
+                for p in incrementales:
+                    n = conn.execute(f'SELECT COUNT(*) FROM "{MATRIX_TABLE}" WHERE rowid > ? AND {p["where"]}',
+                                     (p["rowid"],)).fetchone()[0]
+                    estado = f"simulada (incremental {p['label']}: +{n} filas, rowid {p['rowid']}->{mark})"
+                    acciones[p["accion"]] = (p["tabla"], "table", estado, p["where"])
+            else:
+                added = route_new_rows(conn, incrementales)
+                for p in incrementales:
+                    estado = f"incremental ({p['label']}: +{added[p['tabla']]} filas)"
+                    acciones[p["accion"]] = (p["tabla"], "table", estado, p["where"])
+                print("[OK] cuando_*/todo_cuando_* incremental: {} tablas, +{} filas en total".format(
+                    len(incrementales), sum(added.values())))
+
         # 3) Reporte
         hdr = ["tabla", "tipo", "accion", "detalle"]
         print("\nREPORTE:")
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+orquestador_dag.py — Orquestador único del pipeline como grafo de dependencias, en lugar de las secuencias fijas
+de master.bat, actualizar_todo.py, orquestador_astroluna_v4/v5/v6.py, reconstruir_y_refrescar_astroluna.py, ...:
+  scrape -> limpieza + carga (ingest.py, una por rama) -> matriz -> derivadas -> vistas -> scoring -> reportes
+- Cada nodo ejecuta un script del repo como subproceso, con su log en logs/dag_<fecha>/<nodo>.log.
+- Huella de frescura por nodo: archivos de entrada (tamaño, mtime), tablas de entrada (MAX(fecha), COUNT(*),
+  hash del esquema), el script y sus argumentos. Se guarda en dag_estado tras cada corrida correcta (con las
+  entradas ya como el nodo las dejó); si en la siguiente corrida la huella es la misma, el nodo se salta.
+  Es una huella barata: un UPDATE que no cambia COUNT ni MAX(fecha) no la mueve (--force para esos casos; los
+  dependientes de un nodo forzado también corren).
+- Las ramas independientes (Baloto/Revancha, AstroLuna, loterías regionales) corren en paralelo (--jobs), cada
+  una con su propia carga (ingest.py --tables): un scraper lento o caído de otra rama no frena a AstroLuna.
+  Los nodos que escriben la BD comparten un único candado de escritor (SQLite admite un solo escritor).
+- La carga ya escribe las fechas en ISO; normalizar_fechas_en_todas.py (migración única para datos viejos) queda
+  fuera del camino de AstroLuna, después de las tres cargas.
+- Los scrapers corren siempre (su entrada es la web) salvo con --offline. Si un nodo falla, solo se bloquean
+  sus dependientes; el resto del grafo sigue.
+Uso:
+  python orquestador_dag.py --db "C:\\RadarPremios\\radar_premios.db" --dry-run
+  python orquestador_dag.py --db "C:\\RadarPremios\\radar_premios.db" --jobs 4 --report logs\\dag.json
+  python orquestador_dag.py --db "C:\\RadarPremios\\radar_premios.db" --offline --force derivadas,scoring
+  python orquestador_dag.py --db "C:\\RadarPremios\\radar_premios.db" --offline --solo scoring
+"""
+import argparse, datetime, glob, hashlib, json, os, sqlite3, subprocess, sys, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DDL = """
+CREATE TABLE IF NOT EXISTS dag_estado(
+  nodo       TEXT PRIMARY KEY,
+  huella     TEXT NOT NULL,
+  terminado  TEXT NOT NULL,
+  segundos   REAL
+)
+"""
+
+# tablas que carga ingest.py desde data/crudo, por rama (entradas de normalizar)
+ASTROLUNA = ["astro_luna"]
+BALOTO = ["baloto_resultados", "baloto_premios", "revancha_resultados", "revancha_premios"]
+REGIONALES = ["tolima", "huila", "manizales", "quindio", "medellin", "boyaca"]
+SOURCE_TABLES = ASTROLUNA + BALOTO + REGIONALES
+
+# estados con los que un dependiente puede seguir
+LISTOS = ("ok", "fresco", "omitido", "correría")
+
+def log(msg):
+    print(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+
+def nodo(nombre, rama, script, args=(), deps=(), archivos=(), tablas=(), salidas=(), escribe=False,
+         siempre=False):
+    """archivos: rutas o patrones glob de entrada; tablas: tablas de entrada; salidas: tablas que deben existir."""
+    return {"nombre": nombre, "rama": rama, "script": script, "args": list(args), "deps": list(deps),
+            "archivos": list(archivos), "tablas": list(tablas), "salidas": list(salidas), "escribe": escribe,
+            "siempre": siempre}
+
+def build_dag(db, root):
+    crudo = os.path.join(root, "data", "crudo")
+    limpio = os.path.join(root, "data", "limpio")
+    reports = os.path.join(root, "reports")
+    vistas_sql = os.path.join(SCRIPT_DIR, "v_digit_hotcold.sql")
+    csv = lambda name: os.path.join(crudo, name)
+
+    def cargar(nombre, rama, tablas, deps):
+        # limpieza + carga en una pasada, solo los CSV de la rama (copias limpias en data/limpio para auditoría)
+        return nodo(nombre, rama, "ingest.py",
+                    ["--db", db, "--src", crudo, "--audit-dir", limpio, "--tables", ",".join(tablas)],
+                    deps=deps, archivos=[csv(f"{t}.csv") for t in tablas], escribe=True)
+
+    return [
+        # --- Baloto / Revancha ---
+        nodo("scrape_baloto_resultados", "baloto", "scraper_baloto_resultados.py", siempre=True),
+        nodo("scrape_baloto_premios", "baloto", "scraper_baloto_premios.py", siempre=True),
+        nodo("scrape_revancha_resultados", "baloto", "scraper_revancha_resultados.py", siempre=True),
+        nodo("scrape_revancha_premios", "baloto", "scraper_revancha_premios.py", siempre=True),
+        nodo("fechas_revancha", "baloto", "normalizar_fechas_baloto.py", deps=["scrape_revancha_premios"],
+             archivos=[csv("revancha_premios.csv")]),
+        cargar("cargar_baloto", "baloto", BALOTO,
+               deps=["scrape_baloto_resultados", "scrape_baloto_premios", "scrape_revancha_resultados",
+                     "fechas_revancha"]),
+        # --- loterías regionales ---
+        nodo("scrape_loterias", "regionales", "scraper_loterias.py", siempre=True),
+        cargar("cargar_regionales", "regionales", REGIONALES, deps=["scrape_loterias"]),
+        # --- migración única de fechas viejas a ISO (no-op una vez registrada; no bloquea a AstroLuna) ---
+        nodo("normalizar", "comun", "normalizar_fechas_en_todas.py", ["--db", db],
+             deps=["cargar_astro", "cargar_baloto", "cargar_regionales"], tablas=SOURCE_TABLES, escribe=True),
+        # --- AstroLuna: carga -> matriz -> derivadas -> vistas -> scoring -> reportes ---
+        nodo("scrape_astroluna", "astroluna", "scraper_astroluna.py", siempre=True),
+        cargar("cargar_astro", "astroluna", ASTROLUNA, deps=["scrape_astroluna"]),
+        nodo("matriz", "astroluna", "orquestador_astroluna_v6.py",
+             ["--db", db, "--reconstruir-matriz", "--targets", "matriz_astro_luna"], deps=["cargar_astro"],
+             tablas=["astro_luna"], salidas=["matriz_astro_luna"], escribe=True),
+        nodo("derivadas", "astroluna", "orquestador_astroluna_v6.py", ["--db", db], deps=["matriz"],
+             tablas=["matriz_astro_luna"], escribe=True),
+        nodo("last_seen", "astroluna", "last_seen.py", ["--db", db], deps=["cargar_astro"],
+             tablas=["astro_luna"], salidas=["last_seen_numero", "last_seen_digitpos"], escribe=True),
+        # la vista que lee score_candidates.py (hot/cold por dígito sobre todos_cuando_son)
+        nodo("vistas", "astroluna", "apply_sql_safe.py", ["--db", db, "--file", vistas_sql], deps=["derivadas"],
+             archivos=[vistas_sql], tablas=["todos_cuando_son"], salidas=["v_digit_hotcold"], escribe=True),
+        nodo("scoring", "astroluna", "score_candidates.py",
+             ["--db", db, "--export", os.path.join(reports, "candidatos_scored.csv"),
+              "--report", os.path.join(reports, "candidatos_scored.html")],
+             deps=["vistas", "last_seen"],
+             tablas=["astro_luna", "last_seen_numero", "last_seen_digitpos", "todos_cuando_son", "matriz_astro_luna"],
+             escribe=True),
+        nodo("reportes", "astroluna", "eval_last_run.py", ["--db", db], deps=["scoring"],
+             tablas=["runs", "astro_luna"]),
+    ]
+
+# -------------- huellas --------------
+def file_sig(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return f"{path}:-"
+    return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+
+def table_sig(conn, table):
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name=? AND type IN ('table','view')",
+                       (table,)).fetchone()
+    if row is None:
+        return f"{table}:-"
+    cols = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+    n = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    mf = conn.execute(f'SELECT MAX(fecha) FROM "{table}"').fetchone()[0] if "fecha" in cols else ""
+    schema = hashlib.sha1((row[0] or "").encode("utf-8")).hexdigest()[:12]
+    return f"{table}:{n}:{mf}:{schema}"
+
+def fingerprint(conn, n):
+    parts = [file_sig(os.path.join(SCRIPT_DIR, n["script"])), " ".join(n["args"])]
+    for pat in n["archivos"]:
+        paths = sorted(glob.glob(pat)) if glob.has_magic(pat) else [pat]
+        parts += [file_sig(p) for p in paths] or [f"{pat}:-"]
+    parts += [table_sig(conn, t) for t in n["tablas"]]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+def missing_outputs(conn, n):
+    return [t for t in n["salidas"]
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name=?", (t,)).fetchone() is None]
+
+def connect(db, dry=False):
+    conn = sqlite3.connect(db, timeout=60)
+    if not dry:
+        conn.execute(DDL)
+    return conn
+
+def stored(conn, nombre):
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name='dag_estado'").fetchone() is None:
+        return None
+    row = conn.execute("SELECT huella FROM dag_estado WHERE nodo=?", (nombre,)).fetchone()
+    return row[0] if row else None
+
+def save_state(conn, nombre, huella, segundos):
+    conn.execute("""
+        INSERT INTO dag_estado(nodo, huella, terminado, segundos) VALUES(?,?,datetime('now'),?)
+        ON CONFLICT(nodo) DO UPDATE SET huella=excluded.huella, terminado=excluded.terminado,
+          segundos=excluded.segundos
+    """, (nombre, huella, round(segundos, 3)))
+    conn.commit()
+
+# -------------- ejecución --------------
+def select_nodes(nodes, solo):
+    """Los nodos pedidos en --solo y todas sus dependencias (en el orden del grafo)."""
+    if not solo:
+        return nodes
+    by_name = {n["nombre"]: n for n in nodes}
+    faltan = [s for s in solo if s not in by_name]
+    if faltan:
+        raise SystemExit(f"[ERROR] Nodos desconocidos: {', '.join(faltan)} (válidos: {', '.join(by_name)})")
+    keep, stack = set(), list(solo)
+    while stack:
+        name = stack.pop()
+        if name not in keep:
+            keep.add(name)
+            stack += by_name[name]["deps"]
+    return [n for n in nodes if n["nombre"] in keep]
+
+class Runner:
+    def __init__(self, args, log_dir):
+        self.args = args
+        self.log_dir = log_dir
+        self.writer = threading.Lock()  # un solo escritor SQLite a la vez (subprocesos y dag_estado)
+        self.force = set(args.force.split(",")) if args.force else set()
+        self.forzados = set()  # nodos que corrieron por --force (o por arrastre): sus dependientes también corren
+
+    def run(self, n, deps_state):
+        """Devuelve (estado, detalle, segundos) del nodo."""
+        a = self.args
+        if n["siempre"] and a.offline:
+            return "omitido", "--offline", 0.0
+        propio = a.force_all or n["nombre"] in self.force
+        arrastre = any(d in self.forzados for d in n["deps"])
+        forced = propio or arrastre
+        if a.dry_run and any(s == "correría" for s in deps_state):
+            return "correría", "cambia una dependencia", 0.0
+        conn = connect(a.db, a.dry_run)
+        try:
+            faltan = missing_outputs(conn, n)
+            if not (n["siempre"] or forced or faltan):
+                if stored(conn, n["nombre"]) == fingerprint(conn, n):
+                    return "fresco", "entradas sin cambios", 0.0
+            motivo = ("siempre" if n["siempre"] else "--force" if propio
+                      else "--force en una dependencia" if arrastre
+                      else f"falta {', '.join(faltan)}" if faltan else "entradas cambiaron")
+            if a.dry_run:
+                return "correría", motivo, 0.0
+            if forced:
+                # una corrida forzada puede reescribir tablas sin mover COUNT ni MAX(fecha) (p.ej. una
+                # reconstrucción correctiva): la huella de los dependientes no lo vería
+                self.forzados.add(n["nombre"])
+            log_path = os.path.join(self.log_dir, f"{n['nombre']}.log")
+            cmd = [sys.executable, "-X", "utf8", os.path.join(SCRIPT_DIR, n["script"])] + n["args"]
+            t0 = time.perf_counter()
+            if n["escribe"]:
+                with self.writer:
+                    rc = self._spawn(n, cmd, log_path)
+            else:
+                rc = self._spawn(n, cmd, log_path)
+            dt = time.perf_counter() - t0
+            if rc != 0:
+                return "error", f"rc={rc} (log: {log_path})", dt
+            # huella con las entradas como las dejó el nodo (p.ej. normalizar reescribe sus propias tablas)
+            with self.writer:
+                save_state(conn, n["nombre"], fingerprint(conn, n), dt)
+            return "ok", motivo, dt
+        finally:
+            conn.close()
+
+    def _spawn(self, n, cmd, log_path):
+        log(f"[RUN] {n['nombre']} ({n['rama']}): {n['script']}")
+        with open(log_path, "w", encoding="utf-8") as fh:
+            fh.write("[CMD] " + subprocess.list2cmdline(cmd) + "\n")
+            fh.flush()
+            return subprocess.run(cmd, cwd=SCRIPT_DIR, stdin=subprocess.DEVNULL, stdout=fh,
+                                  stderr=subprocess.STDOUT).returncode
+
+def run_dag(nodes, runner, jobs):
+    """Lanza cada nodo en cuanto sus dependencias terminan; ramas independientes en paralelo."""
+    pending = {n["nombre"]: n for n in nodes}
+    known = set(pending)
+    result = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+        running = {}
+        while pending or running:
+            for name, n in list(pending.items()):
+                deps = [d for d in n["deps"] if d in known]
+                states = [result[d][0] for d in deps if d in result]
+                if any(s not in LISTOS for s in states):
+                    del pending[name]
+                    result[name] = ("bloqueado", "falló una dependencia", 0.0)
+                    log(f"[SKIP] {name}: bloqueado por una dependencia con error")
+                elif len(states) == len(deps):
+                    del pending[name]
+                    running[ex.submit(runner.run, n, states)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    result[name] = fut.result()
+                except Exception as e:
+                    result[name] = ("error", repr(e), 0.0)
+                estado, det, dt = result[name]
+                tag = {"ok": "[OK]", "fresco": "[SKIP]", "omitido": "[SKIP]", "correría": "[INFO]"}.get(estado, "[ERROR]")
+                log(f"{tag} {name}: {estado} ({det}){f' {dt:.1f}s' if dt else ''}")
+    return result
+
+def main():
+    ap = argparse.ArgumentParser(description="Orquestador del pipeline como DAG con nodos que se saltan si están frescos")
+    ap.add_argument("--db", required=True, help="Ruta a radar_premios.db")
+    ap.add_argument("--root", default=os.path.dirname(SCRIPT_DIR),
+                    help="Raíz de RadarPremios (data/crudo, data/limpio, reports, logs); por defecto la carpeta "
+                         "padre de los scripts, como master.bat")
+    ap.add_argument("--jobs", type=int, default=4, help="Nodos en paralelo (ramas independientes)")
+    ap.add_argument("--offline", action="store_true", help="No correr los scrapers (usa los CSV que ya están)")
+    ap.add_argument("--force", help="Nodos a correr aunque estén frescos (coma)")
+    ap.add_argument("--force-all", action="store_true", help="Correr todos los nodos")
+    ap.add_argument("--solo", help="Solo estos nodos y sus dependencias (coma)")
+    ap.add_argument("--dry-run", action="store_true", help="Muestra qué correría y qué se saltaría, sin ejecutar")
+    ap.add_argument("--report", help="Reporte JSON con estado y tiempo por nodo")
+    args = ap.parse_args()
+
+    nodes = select_nodes(build_dag(args.db, args.root),
+                         [s.strip() for s in args.solo.split(",") if s.strip()] if args.solo else None)
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_dir = os.path.join(args.root, "logs", f"dag_{stamp}")
+    if not args.dry_run:
+        os.makedirs(log_dir, exist_ok=True)
+        for sub in ("data/crudo", "data/limpio", "reports"):
+            os.makedirs(os.path.join(args.root, sub), exist_ok=True)
+    log(f"[INFO] {len(nodes)} nodos | jobs={args.jobs} | db={args.db}" + (" | DRY-RUN" if args.dry_run else ""))
+
+    t0 = time.perf_counter()
+    result = run_dag(nodes, Runner(args, log_dir), args.jobs)
+    total = time.perf_counter() - t0
+
+    print("\nREPORTE:")
+    print(f"{'nodo':<28}{'rama':<12}{'estado':<11}{'s':>8}  detalle")
+    for n in nodes:
+        estado, det, dt = result[n["nombre"]]
+        print(f"{n['nombre']:<28}{n['rama']:<12}{estado:<11}{dt:>8.1f}  {det}")
+    errores = [name for name, (estado, _, _) in result.items() if estado in ("error", "bloqueado")]
+    print(f"[INFO] total {total:.1f}s | corridos={sum(1 for r in result.values() if r[0] == 'ok')} "
+          f"| frescos={sum(1 for r in result.values() if r[0] == 'fresco')} | con error/bloqueados={len(errores)}")
+    if args.report:
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"db": args.db, "inicio": stamp, "total_s": round(total, 3), "nodos": [
+                {"nodo": n["nombre"], "rama": n["rama"], "deps": n["deps"], "estado": result[n["nombre"]][0],
+                 "detalle": result[n["nombre"]][1], "segundos": round(result[n["nombre"]][2], 3)}
+                for n in nodes]}, f, ensure_ascii=False, indent=2)
+        log(f"[OK] Reporte → {args.report}")
+    sys.exit(1 if errores else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+row_dedup.py — Estrategias de deduplicación de filas para cargar_db.py (una por tabla, guardada en ingest_dedup).
+- sha1  : _rowhash TEXT = SHA-1 hex (40 chars) del texto crudo de la fila (comportamiento histórico).
+- hash64: _rowhash INTEGER = blake2b de 8 bytes (con signo) de los valores ya tipados; las columnas fecha se
+          llevan a ISO antes de hashear, así el hash de una fila del CSV coincide con el de la fila guardada
+          aunque la tabla se haya normalizado después (normalizar_fechas_en_todas.py). Índice ~5x más chico.
+- key   : sin _rowhash; índice único sobre la clave natural de la tabla (KEYS de create_unique_indexes.py).
+          Las fechas se guardan en ISO (column_types.coercers_for) para que la clave compare igual.
+La tabla ingest_dedup fija la estrategia de cada tabla en su primera carga; para cambiarla se migra:
+  python row_dedup.py --db "C:\\RadarPremios\\radar_premios.db" --tables astro_luna,boyaca --to hash64
+  python row_dedup.py --db "C:\\RadarPremios\\radar_premios.db" --tables baloto_resultados --to key
+"""
+import argparse, hashlib, sqlite3
+
+from column_types import declared_types, register_iso_fecha, to_date
+from create_unique_indexes import KEYS, first_key_if_exists, guess_premios_key
+
+MODES = ("sha1", "hash64", "key")
+
+DDL = """
+CREATE TABLE IF NOT EXISTS ingest_dedup(
+  tabla    TEXT PRIMARY KEY,
+  modo     TEXT NOT NULL,
+  key_cols TEXT
+)
+"""
+
+def ensure_dedup_table(conn):
+    conn.execute(DDL)
+
+def table_cols(conn, table):
+    return [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+
+def resolve_key(table, cols):
+    """Clave natural para 'table' con esas columnas (misma regla que create_unique_indexes.py) o None."""
+    key = first_key_if_exists(cols, KEYS.get(table, []))
+    if not key and table.endswith("_premios"):
+        key = guess_premios_key(cols)
+    return key
+
+def get_mode(conn, table):
+    """(modo, key_cols) de la tabla. Tablas previas a ingest_dedup: se deduce del tipo declarado de _rowhash."""
+    row = conn.execute("SELECT modo, key_cols FROM ingest_dedup WHERE tabla=?", (table,)).fetchone()
+    if row:
+        return row[0], (row[1].split(",") if row[1] else None)
+    types = declared_types(conn, table)
+    if "_rowhash" in types:
+        return ("hash64" if types["_rowhash"] == "INTEGER" else "sha1"), None
+    return None
+
+def set_mode(conn, table, mode, key_cols=None):
+    conn.execute("""
+        INSERT INTO ingest_dedup(tabla, modo, key_cols) VALUES(?,?,?)
+        ON CONFLICT(tabla) DO UPDATE SET modo=excluded.modo, key_cols=excluded.key_cols
+    """, (table, mode, ",".join(key_cols) if key_cols else None))
+
+def choose_mode(table, headers, wanted):
+    # modo para una tabla nueva; 'key' sin clave natural resoluble cae a hash64
+    if wanted == "key":
+        key = resolve_key(table, headers)
+        if key:
+            return "key", key
+        return "hash64", None
+    return wanted, None
+
+# -------------- fingerprints --------------
+SEP = "\u241F"
+
+def row_hash(values):
+    # sha1: junta con separador que no aparece en números por lo general
+    joined = SEP.join([str(v) if v is not None else "" for v in values])
+    return hashlib.sha1(joined.encode('utf-8', errors='ignore')).hexdigest()
+
+def sha1_fp(raw, coerced):
+    # fingerprint por defecto de cargar_db (modo sha1): sobre el texto crudo
+    return row_hash(raw)
+
+def hash64(values):
+    joined = SEP.join(["" if v is None else str(v) for v in values])
+    return int.from_bytes(hashlib.blake2b(joined.encode("utf-8", errors="ignore"), digest_size=8).digest(),
+                          "little", signed=True)
+
+def date_positions(headers, types):
+    # columnas que se llevan a ISO antes del hash64 (DATE declaradas o llamadas 'fecha')
+    return [i for i, h in enumerate(headers) if types.get(h) == "DATE" or h.lower() == "fecha"]
+
+def fingerprint_fn(mode, headers, types):
+    """f(raw, coerced) -> valor de _rowhash; None en modo key (no hay columna)."""
+    if mode == "sha1":
+        return sha1_fp
+    if mode == "hash64":
+        dpos = date_positions(headers, types)
+        if not dpos:
+            return lambda raw, coerced: hash64(coerced)
+        def f(raw, coerced):
+            vals = list(coerced)
+            for i in dpos:
+                if isinstance(vals[i], str):
+                    vals[i] = to_date(vals[i])
+            return hash64(vals)
+        return f
+    return None
+
+def rowhash_type(mode):
+    return "INTEGER" if mode == "hash64" else "TEXT"
+
+def ensure_dedup_index(conn, table, mode, key_cols=None):
+    if mode == "key":
+        cols = ", ".join(f'"{c}"' for c in key_cols)
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "uq_{table}_{"_".join(key_cols)}" ON "{table}"({cols})')
+    else:
+        conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{table}__rowhash" ON "{table}"(_rowhash)')
+
+# -------------- migración --------------
+def delete_dups(conn, table, cols, dates=()):
+    # conserva la primera fila (MIN rowid) de cada clave, como INSERT OR IGNORE; las columnas en 'dates' se
+    # comparan ya en ISO. Claves con NULL no se tocan (el índice único las admite repetidas)
+    keylist = ", ".join(f'iso_fecha("{c}")' if c in dates else f'"{c}"' for c in cols)
+    notnull = " AND ".join(f'"{c}" IS NOT NULL' for c in cols)
+    return conn.execute(f"""
+        DELETE FROM "{table}"
+        WHERE {notnull}
+          AND rowid NOT IN (SELECT MIN(rowid) FROM "{table}" WHERE {notnull} GROUP BY {keylist})
+    """).rowcount
+
+def _normalize_dates(conn, table, cols):
+    for c in cols:
+        conn.execute(f'UPDATE "{table}" SET "{c}" = iso_fecha("{c}") WHERE "{c}" IS NOT iso_fecha("{c}")')
+
+def migrate(conn, table, to_mode):
+    """Convierte la tabla a 'to_mode' en el lugar. Devuelve (modo, key_cols, filas_duplicadas_borradas).
+    Debe llamarse fuera de una transacción abierta (usa BEGIN/COMMIT propios)."""
+    cols = table_cols(conn, table)
+    data_cols = [c for c in cols if c != "_rowhash"]
+    key = None
+    if to_mode == "key":
+        key = resolve_key(table, data_cols)
+        if not key:
+            raise ValueError(f"{table}: sin clave natural en KEYS para {data_cols}")
+    register_iso_fecha(conn)
+    conn.execute("BEGIN")
+    try:
+        conn.execute(f'DROP INDEX IF EXISTS "ux_{table}__rowhash"')
+        removed = 0
+        if to_mode == "key":
+            types = declared_types(conn, table)
+            dates = [key[i] for i in date_positions(key, types)]
+            removed = delete_dups(conn, table, key, dates)
+            _normalize_dates(conn, table, dates)
+            if "_rowhash" in cols:
+                conn.execute(f'ALTER TABLE "{table}" DROP COLUMN "_rowhash"')
+        else:
+            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "_rowhash_new" {rowhash_type(to_mode)}')
+            types = declared_types(conn, table)
+            fp = fingerprint_fn(to_mode, data_cols, types)
+            sel = ", ".join(f'"{c}"' for c in data_cols)
+            rows = conn.execute(f'SELECT rowid, {sel} FROM "{table}"').fetchall()
+            # sha1 desde lo guardado: texto tal cual (las filas crudas originales ya no existen)
+            conn.executemany(f'UPDATE "{table}" SET "_rowhash_new"=? WHERE rowid=?',
+                             ((fp([("" if v is None else str(v)) for v in r[1:]], r[1:]), r[0]) for r in rows))
+            if "_rowhash" in cols:
+                conn.execute(f'ALTER TABLE "{table}" DROP COLUMN "_rowhash"')
+            conn.execute(f'ALTER TABLE "{table}" RENAME COLUMN "_rowhash_new" TO "_rowhash"')
+            removed = delete_dups(conn, table, ["_rowhash"])
+        ensure_dedup_table(conn)
+        set_mode(conn, table, to_mode, key)
+        ensure_dedup_index(conn, table, to_mode, key)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return to_mode, key, removed
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--tables", required=True, help="Tablas a convertir (coma)")
+    ap.add_argument("--to", choices=MODES, required=True, help="Estrategia destino")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    try:
+        ensure_dedup_table(conn)
+        for table in [t.strip() for t in args.tables.split(",") if t.strip()]:
+            if not table_cols(conn, table):
+                print(f"[SKIP] {table}: no existe.")
+                continue
+            try:
+                mode, key, removed = migrate(conn, table, args.to)
+            except (ValueError, sqlite3.Error) as ex:
+                print(f"[ERROR] {table}: {ex}")
+                continue
+            extra = f" clave=({','.join(key)})" if key else ""
+            print(f"[OK] {table}: dedup={mode}{extra} | duplicados borrados={removed}")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+run_store.py — Almacenamiento compacto de runs de score_candidates.py (una fila por run en run_blobs).
+- scores: float32[10000] indexado por número (NaN = no puntuado en ese run)
+- ranks : uint16[10000]  indexado por número (0 = no está en el run)
+- orden : uint16[n]      números en orden de rank (top-k = primeros 2*k bytes)
+Un universo completo ocupa ~80 KB en vez de 10000 filas de run_candidates.
+Las consultas puntuales usan substr() sobre el BLOB: no se decodifica el run completo.
+"""
+import math, struct
+from array import array
+
+UNIVERSE = 10000
+
+def ensure_run_blobs(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS run_blobs(
+      run_id INTEGER PRIMARY KEY,
+      n      INTEGER NOT NULL,
+      scores BLOB NOT NULL,
+      ranks  BLOB NOT NULL,
+      orden  BLOB NOT NULL
+    )""")
+
+def has_run_blobs(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='run_blobs'").fetchone() is not None
+
+def _le_bytes(arr):
+    # formato en disco: little-endian, independiente de la plataforma
+    if arr.itemsize > 1 and struct.pack("=H", 1) != struct.pack("<H", 1):
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+def pack_run(rows):
+    """rows: dicts con 'rank', 'numero', 'score' (formato de score_all / universe_rows)."""
+    scores = array("f", [math.nan]) * UNIVERSE
+    ranks = array("H", [0]) * UNIVERSE
+    orden = array("H")
+    for r in sorted(rows, key=lambda r: r["rank"]):
+        n = int(r["numero"])
+        if ranks[n]:
+            # un número repetido (gen_candidates con allow_repeat) pisaría el rank anterior en ranks[n]
+            raise ValueError(f"numero repetido en el run: {n:04d} (ranks {ranks[n]} y {r['rank']})")
+        scores[n] = r["score"]
+        ranks[n] = r["rank"]
+        orden.append(n)
+    return _le_bytes(scores), _le_bytes(ranks), _le_bytes(orden)
+
+def save_run_packed(conn, run_id, rows):
+    ensure_run_blobs(conn)
+    scores, ranks, orden = pack_run(rows)
+    conn.execute("INSERT OR REPLACE INTO run_blobs(run_id,n,scores,ranks,orden) VALUES(?,?,?,?,?)",
+                 (run_id, len(rows), scores, ranks, orden))
+
+def _numero_int(numero):
+    try:
+        n = int(str(numero).strip())
+    except (TypeError, ValueError):
+        return None
+    return n if 0 <= n < UNIVERSE else None
+
+def packed_rank(conn, run_id, numero):
+    """Rank de un número en un run empaquetado; None si no está. Lee 2 bytes del BLOB."""
+    n = _numero_int(numero)
+    if n is None:
+        return None
+    row = conn.execute("SELECT substr(ranks, ?, 2) FROM run_blobs WHERE run_id=?", (2*n + 1, run_id)).fetchone()
+    if not row or not row[0]:
+        return None
+    rank = struct.unpack("<H", row[0])[0]
+    return rank or None
+
+def packed_score(conn, run_id, numero):
+    n = _numero_int(numero)
+    if n is None:
+        return None
+    row = conn.execute("SELECT substr(scores, ?, 4) FROM run_blobs WHERE run_id=?", (4*n + 1, run_id)).fetchone()
+    if not row or not row[0]:
+        return None
+    s = struct.unpack("<f", row[0])[0]
+    return None if math.isnan(s) else s
+
+def packed_top(conn, run_id, k):
+    """[(numero 'NNNN', rank), ...] de los k primeros del run, o None si el run no está empaquetado."""
+    row = conn.execute("SELECT substr(orden, 1, ?) FROM run_blobs WHERE run_id=?", (2*k, run_id)).fetchone()
+    if row is None:
+        return None
+    nums = struct.unpack(f"<{len(row[0]) // 2}H", row[0])
+    return [(f"{n:04d}", i) for i, n in enumerate(nums, 1)]
+
+def is_packed(conn, run_id):
+    return has_run_blobs(conn) and conn.execute(
+        "SELECT 1 FROM run_blobs WHERE run_id=?", (run_id,)).fetchone() is not None
+
+def run_rank(conn, run_id, numero):
+    """Rank del número en el run, sea cual sea el formato (run_blobs o run_candidates)."""
+    if is_packed(conn, run_id):
+        return packed_rank(conn, run_id, numero)
+    n = _numero_int(numero)
+    if n is None:
+        return None
+    # run_candidates guarda 'NNNN'; astro_luna puede traer 941, '941' o '0941' (según tipado/carga)
+    return conn.execute("""
+        SELECT MIN(rank) FROM run_candidates
+        WHERE run_id=? AND numero=?
+    """, (run_id, f"{n:04d}")).fetchone()[0]
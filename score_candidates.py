@@ -5,10 +5,27 @@ Ejemplo:
   python score_candidates.py --db "C:\RadarPremios\radar_premios.db" --gen 100 --seed 12345 --top 15 --shortlist 5 ^
          --export "C:\RadarPremios\candidatos_scored.csv" --export-all "C:\RadarPremios\candidatos_all.csv" ^
          --report "C:\RadarPremios\candidatos_scored.html" --auto-eval
+Universo completo (10000 números, vectorizado con numpy):
+  python score_candidates.py --db "C:\RadarPremios\radar_premios.db" --universe --top 15 --shortlist 5
+Tiempos por etapa (ms, pasos de VM SQLite, pico de memoria; se guardan en runs.profile):
+  python score_candidates.py --db "C:\RadarPremios\radar_premios.db" --gen 100 --profile --no-feature-store
 """
 import argparse, csv, html, random, sqlite3, datetime, os, math
+from functools import lru_cache
 from pathlib import Path
 
+from last_seen import last_seen_ready
+from run_store import run_rank, save_run_packed
+from stage_profiler import StageProfiler, stage
+
+try:
+    import numpy as np
+except ImportError:  # numpy solo es necesario para --universe
+    np = None
+
+POSITIONS = ("um", "c", "d", "u")
+UNIVERSE = 10000
+
 # -------------- util db --------------
 def get_max_fecha(conn):
     return conn.execute("SELECT MAX(fecha) FROM astro_luna").fetchone()[0]
@@ -72,6 +89,17 @@ def last_seen_digitpos_norm(conn, cap_days=60):
     # mapa por posición -> {digito: score 0..1}
     maxf = get_max_fecha(conn)
     out = {}
+    if last_seen_ready(conn, maxf):
+        # lectura directa de la tabla mantenida (40 filas)
+        for p in POSITIONS:
+            out[p] = {d: 1.0 for d in range(10)}
+        for p, dig, norm in conn.execute("""
+            SELECT posicion, digito, MIN(1.0, (julianday(?) - julianday(fecha)) / ? )
+            FROM last_seen_digitpos
+        """, (maxf, cap_days)):
+            if p in out:
+                out[p][int(dig)] = float(norm) if norm is not None else 0.0
+        return out
     for p in ("um","c","d","u"):
         q = f"""
         WITH last AS (
@@ -92,7 +120,7 @@ def last_seen_digitpos_norm(conn, cap_days=60):
         out[p] = m
     return out
 
-def last_seen_exact_norm(conn, candidates, cap_days=180):
+def last_seen_exact_norm(conn, candidates, cap_days=180, prof=None):
     # devuelve mapa numero->norm (0..1)
     maxf = get_max_fecha(conn)
     # tabla temporal con candidatos
@@ -100,21 +128,34 @@ def last_seen_exact_norm(conn, candidates, cap_days=180):
     conn.execute("CREATE TEMP TABLE sel(numero TEXT PRIMARY KEY)")
     conn.executemany("INSERT INTO sel(numero) VALUES (?)", [(c,) for c in candidates])
 
-    q = """
-    WITH last AS (
-      SELECT a.numero, MAX(a.fecha) AS last_f
-      FROM astro_luna a
-      JOIN sel s ON s.numero = a.numero
-      GROUP BY a.numero
-    )
-    SELECT s.numero,
-           CASE
-             WHEN l.last_f IS NULL THEN 1.0
-             ELSE MIN(1.0, (julianday(?) - julianday(l.last_f)) / ? )
-           END AS norm
-    FROM sel s
-    LEFT JOIN last l ON l.numero = s.numero
-    """
+    if last_seen_ready(conn, maxf):
+        q = """
+        SELECT s.numero,
+               CASE
+                 WHEN l.fecha IS NULL THEN 1.0
+                 ELSE MIN(1.0, (julianday(?) - julianday(l.fecha)) / ? )
+               END AS norm
+        FROM sel s
+        LEFT JOIN last_seen_numero l ON l.numero = CAST(s.numero AS INTEGER)
+        """
+    else:
+        q = """
+        WITH last AS (
+          SELECT a.numero, MAX(a.fecha) AS last_f
+          FROM astro_luna a
+          JOIN sel s ON s.numero = a.numero
+          GROUP BY a.numero
+        )
+        SELECT s.numero,
+               CASE
+                 WHEN l.last_f IS NULL THEN 1.0
+                 ELSE MIN(1.0, (julianday(?) - julianday(l.last_f)) / ? )
+               END AS norm
+        FROM sel s
+        LEFT JOIN last l ON l.numero = s.numero
+        """
+    if prof is not None:
+        prof.explain(conn, q, (maxf, cap_days))
     m = {}
     for num, norm in conn.execute(q, (maxf, cap_days)):
         m[num] = float(norm)
@@ -127,25 +168,58 @@ def load_hotcold(conn):
     return {int(r["digito"]): float(r["hotcold_norm"])
             for r in conn.execute("SELECT digito, hotcold_norm FROM v_digit_hotcold")}
 
-def cal_effect(conn, numstr: str, horizon=30):
-    # efecto calendario básico: compara el dígito líder con el día de la semana del próximo sorteo
-    # Heurística placeholder: usa hotcold de cada dígito y promedia con ligero sesgo si el dígito coincide con día%10
-    # Si quieres algo más profundo, aquí se engancha.
-    today = conn.execute("SELECT MAX(fecha) FROM astro_luna").fetchone()[0]
-    dow = datetime.datetime.strptime(today, "%Y-%m-%d").weekday()  # 0..6
-    digits = list(map(int, numstr))
-    base = 0.0
-    for d in digits:
-        base += (1.0 if d == (dow % 10) else 0.6)
-    return base / 4.0  # 0.6..1.0 aprox
+# -------------- efecto calendario --------------
+def next_draw_weekday(maxf: str) -> int:
+    # día de la semana (0=lunes) del próximo sorteo (AstroLuna es diario: MAX(fecha) + 1)
+    return (datetime.datetime.strptime(maxf, "%Y-%m-%d").weekday() + 1) % 7
+
+def minmax_rows(counts):
+    # normaliza cada posición a 0..1 entre sus 10 dígitos (0.5 si no hay contraste/datos)
+    out = []
+    for row in counts:
+        mn, mx = min(row), max(row)
+        out.append([0.5 if mx == mn else (v - mn) / (mx - mn) for v in row])
+    return out
+
+def cal_weekday_counts(conn, maxf=None, horizon=30):
+    """Tabla día_semana(7) x posición(4) x dígito(10) con las apariciones de las últimas 'horizon' semanas.
+    Una sola pasada GROUP BY sobre astro_luna."""
+    maxf = maxf or get_max_fecha(conn)
+    counts = [[[0] * 10 for _ in range(4)] for _ in range(7)]
+    q = """
+    SELECT CAST(strftime('%w', fecha) AS INTEGER) AS w, CAST(numero AS INTEGER) AS n, COUNT(*) AS k
+    FROM astro_luna
+    WHERE fecha > date(?, ?) AND fecha <= ?
+    GROUP BY w, n
+    """
+    for w, n, k in conn.execute(q, (maxf, f"-{7 * int(horizon)} day", maxf)):
+        if w is None or n is None or not 0 <= n < UNIVERSE:
+            continue
+        wd = (w + 6) % 7  # strftime %w: 0=domingo -> weekday(): 0=lunes
+        for p, d in enumerate((n // 1000, (n // 100) % 10, (n // 10) % 10, n % 10)):
+            counts[wd][p][d] += k
+    return counts
+
+def cal_table(conn, maxf=None, horizon=30):
+    # 4x10 (listas) para el día de la semana del próximo sorteo
+    maxf = maxf or get_max_fecha(conn)
+    return minmax_rows(cal_weekday_counts(conn, maxf, horizon)[next_draw_weekday(maxf)])
+
+def cal_effect(conn, numstr: str, horizon=30, today=None, cal_map=None):
+    # efecto calendario: frecuencia relativa de cada dígito en su posición en los sorteos del mismo día de la
+    # semana que el próximo sorteo, dentro de las últimas 'horizon' semanas. Promedio de las 4 posiciones.
+    if cal_map is None:
+        cal_map = cal_table(conn, today, horizon)
+    um, c, d, u = map(int, numstr)
+    return (cal_map[0][um] + cal_map[1][c] + cal_map[2][d] + cal_map[3][u]) / 4.0
 
 def score_one(conn, numstr: str, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35,
-              dp_map=None, hc_map=None, exact_map=None):
+              dp_map=None, hc_map=None, exact_map=None, today=None, cal_map=None, cal_horizon=30):
     um, c, d, u = map(int, numstr)
     # hot/cold por dígito (promedio)
     hot = sum(hc_map.get(x, 0.5) for x in (um,c,d,u)) / 4.0
     # calendario
-    cal = cal_effect(conn, numstr)
+    cal = cal_effect(conn, numstr, horizon=cal_horizon, today=today, cal_map=cal_map)
     # recencia por dígito/posición
     dp = (dp_map["um"][um] + dp_map["c"][c] + dp_map["d"][d] + dp_map["u"][u]) / 4.0
     # recencia exacta del número
@@ -164,22 +238,52 @@ def score_one(conn, numstr: str, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35,
         "patt": patt
     }
 
-def gen_candidates(n=100, allow_repeat=False, seed=None, allow_patterns=None, deny_patterns=None):
-    rnd = random.Random(seed)
-    out = set()
-    while len(out) < n:
-        num = f"{rnd.randint(0,9999):04d}"
-        if not allow_repeat and num in out:
+PATTERN_CLASSES = ("distintos", "par", "doble_par", "trio", "cuadruple")
+
+def pattern_class(numstr: str) -> str:
+    # misma partición que pattern_bonus: todos distintos / un par / dos pares / triple / cuádruple
+    counts = sorted((numstr.count(d) for d in set(numstr)), reverse=True)
+    if counts[0] == 4:
+        return "cuadruple"
+    if counts[0] == 3:
+        return "trio"
+    if counts[0] == 2:
+        return "doble_par" if len(counts) == 2 else "par"
+    return "distintos"
+
+@lru_cache(maxsize=1)
+def universe_classes():
+    # clase de patrón de cada número 0000..9999 (índice = número), calculada una sola vez
+    return tuple(pattern_class(f"{n:04d}") for n in range(UNIVERSE))
+
+def valid_universe(allow_patterns=None, deny_patterns=None, allow_classes=None, deny_classes=None):
+    """Subconjunto del universo que cumple los filtros, en orden numérico (una pasada por los 10000)."""
+    classes = universe_classes()
+    allow_c = set(allow_classes) if allow_classes else None
+    deny_c = set(deny_classes or ())
+    out = []
+    for n in range(UNIVERSE):
+        cls = classes[n]
+        if (allow_c is not None and cls not in allow_c) or cls in deny_c:
             continue
-        ok = True
-        if allow_patterns:
-            ok = any(p(num) for p in allow_patterns)
-        if ok and deny_patterns:
-            if any(p(num) for p in deny_patterns):
-                ok = False
-        if ok:
-            out.add(num)
-    return list(out)
+        num = f"{n:04d}"
+        if allow_patterns and not any(p(num) for p in allow_patterns):
+            continue
+        if deny_patterns and any(p(num) for p in deny_patterns):
+            continue
+        out.append(num)
+    return out
+
+def gen_candidates(n=100, allow_repeat=False, seed=None, allow_patterns=None, deny_patterns=None,
+                   allow_classes=None, deny_classes=None):
+    # enumera el subconjunto válido y muestrea sin rechazo: costo fijo aunque los filtros sean muy selectivos.
+    # Con la misma seed y filtros devuelve la misma lista (en el mismo orden). Sin repetidos salvo allow_repeat
+    # (n extracciones con reposición); sin repetidos, si piden más candidatos que los válidos, devuelve todos.
+    rnd = random.Random(seed)
+    pool = valid_universe(allow_patterns, deny_patterns, allow_classes, deny_classes)
+    if allow_repeat and pool:
+        return rnd.choices(pool, k=max(0, n))
+    return rnd.sample(pool, min(n, len(pool)))
 
 def export_csv(rows, path: Path):
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -222,7 +326,8 @@ td:nth-child(2), th:nth-child(2) {{ text-align:center; }}
     with path.open("w", encoding="utf-8") as f:
         f.write(doc)
 
-def save_run(conn, rows, weights, meta):
+def save_run(conn, rows, weights, meta, storage="rows"):
+    # storage: "rows" (run_candidates, una fila por candidato), "packed" (run_blobs) o "both"
     # tablas
     conn.executescript("""
     CREATE TABLE IF NOT EXISTS runs(
@@ -232,7 +337,8 @@ def save_run(conn, rows, weights, meta):
       w_hotcold  REAL,
       w_cal      REAL,
       w_dp       REAL,
-      w_exact    REAL
+      w_exact    REAL,
+      profile    TEXT
     );
     CREATE TABLE IF NOT EXISTS run_candidates(
       run_id   INTEGER,
@@ -246,21 +352,31 @@ def save_run(conn, rows, weights, meta):
       patt     REAL
     );
     """)
+    if "profile" not in [r[1] for r in conn.execute("PRAGMA table_info(runs)")]:
+        conn.execute("ALTER TABLE runs ADD COLUMN profile TEXT")  # runs creados antes de --profile
     cur = conn.execute(
         "INSERT INTO runs(seed,w_hotcold,w_cal,w_dp,w_exact) VALUES(?,?,?,?,?)",
         (meta["seed"], weights["w_hot"], weights["w_cal"], weights["w_dp"], weights["w_exact"])
     )
     run_id = cur.lastrowid
-    conn.executemany("""
-      INSERT INTO run_candidates(run_id,rank,numero,score,hotcold,cal,dp,exact,patt)
-      VALUES(?,?,?,?,?,?,?,?,?)
-    """, [
-        (run_id, r["rank"], r["numero"], r["score"], r["hotcold"], r["cal"], r["dp"], r["exact"], r["patt"])
-        for r in rows
-    ])
+    if storage in ("rows", "both"):
+        conn.executemany("""
+          INSERT INTO run_candidates(run_id,rank,numero,score,hotcold,cal,dp,exact,patt)
+          VALUES(?,?,?,?,?,?,?,?,?)
+        """, [
+            (run_id, r["rank"], r["numero"], r["score"], r["hotcold"], r["cal"], r["dp"], r["exact"], r["patt"])
+            for r in rows
+        ])
+    if storage in ("packed", "both"):
+        save_run_packed(conn, run_id, rows)
     conn.commit()
     return run_id
 
+def save_run_profile(conn, run_id, profile_json):
+    # JSON con [{stage, ms, vm_steps, peak_kb, plan}, ...] de StageProfiler
+    conn.execute("UPDATE runs SET profile=? WHERE run_id=?", (profile_json, run_id))
+    conn.commit()
+
 def evaluate_now(conn, run_id):
     # compara con MAX(fecha)
     win = conn.execute("""
@@ -272,10 +388,8 @@ def evaluate_now(conn, run_id):
     if not win:
         return None
     maxf, win_num = win
-    rank = conn.execute("""
-        SELECT MIN(rank) FROM run_candidates
-        WHERE run_id=? AND numero=?
-    """, (run_id, win_num)).fetchone()[0]
+    win_num = f"{int(win_num):04d}"  # numero puede estar tipado INTEGER (column_types)
+    rank = run_rank(conn, run_id, win_num)
     if rank is None:
         verdict = "MISS ❌"
     elif rank <= 5:
@@ -286,19 +400,324 @@ def evaluate_now(conn, run_id):
         verdict = "MISS ❌"
     return {"fecha": maxf, "win_num": win_num, "rank": rank, "veredicto": verdict}
 
-def score_all(conn, candidates, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35,
-              cap_digitpos=60, cap_exact=180, cal_horizon=30):
+# -------------- modo universo (vectorizado) --------------
+def _require_numpy():
+    if np is None:
+        raise SystemExit("[ERROR] --universe requiere numpy (pip install numpy)")
+
+@lru_cache(maxsize=1)
+def universe_digits():
+    # matriz (10000, 4) con los dígitos um/c/d/u de cada número 0000..9999
+    _require_numpy()
+    n = np.arange(UNIVERSE)
+    return np.stack([n // 1000, (n // 100) % 10, (n // 10) % 10, n % 10], axis=1)
+
+@lru_cache(maxsize=1)
+def universe_pattern_bonus():
+    _require_numpy()
+    return np.array([pattern_bonus(f"{n:04d}") for n in range(UNIVERSE)], dtype=float)
+
+def hotcold_array(conn):
+    hc = np.full(10, 0.5)
+    for dig, norm in load_hotcold(conn).items():
+        hc[dig] = norm
+    return hc
+
+def cal_matrix(counts):
+    # counts: (4, 10) apariciones por posición/dígito del día de la semana objetivo -> 0..1 por posición
+    return np.array(minmax_rows(np.asarray(counts).tolist()), dtype=float)
+
+def cal_array(conn, maxf=None, horizon=30):
+    return np.array(cal_table(conn, maxf, horizon), dtype=float)
+
+def digitpos_array(conn, cap_days=60):
+    dp_map = last_seen_digitpos_norm(conn, cap_days=cap_days)
+    return np.array([[dp_map[p][d] for d in range(10)] for p in POSITIONS])
+
+def exact_array(conn, maxf=None, cap_days=180):
+    # recencia exacta de los 10000 números: tabla mantenida o, si no está al día, una pasada GROUP BY
+    maxf = maxf or get_max_fecha(conn)
+    out = np.ones(UNIVERSE)
+    if last_seen_ready(conn, maxf):
+        q = """
+        SELECT numero AS n, MIN(1.0, (julianday(?) - julianday(fecha)) / ? ) AS norm
+        FROM last_seen_numero
+        """
+    else:
+        q = """
+        SELECT CAST(numero AS INTEGER) AS n,
+               MIN(1.0, (julianday(?) - julianday(MAX(fecha))) / ? ) AS norm
+        FROM astro_luna
+        GROUP BY CAST(numero AS INTEGER)
+        """
+    for n, norm in conn.execute(q, (maxf, cap_days)):
+        if n is not None and 0 <= n < UNIVERSE and norm is not None:
+            out[n] = norm
+    return out
+
+def compute_features(conn, cap_digitpos=60, cap_exact=180, cal_horizon=30):
+    # calcula desde las tablas crudas: hotcold (10), cal (4x10), dp (4x10), exact (10000)
+    _require_numpy()
     ensure_views(conn)
-    hc_map = load_hotcold(conn)
-    dp_map = last_seen_digitpos_norm(conn, cap_days=cap_digitpos)
-    exact_map = last_seen_exact_norm(conn, candidates, cap_days=cap_exact)
+    maxf = get_max_fecha(conn)
+    return {
+        "max_fecha": maxf,
+        "hotcold": hotcold_array(conn),
+        "cal": cal_array(conn, maxf, horizon=cal_horizon),
+        "dp": digitpos_array(conn, cap_days=cap_digitpos),
+        "exact": exact_array(conn, maxf, cap_days=cap_exact),
+    }
+
+# -------------- feature store --------------
+FEATURE_SHAPES = {"hotcold": (10,), "cal": (4, 10), "dp": (4, 10), "exact": (UNIVERSE,)}
+
+FEATURE_VERSION = 2  # subir cuando cambie el cálculo de alguna feature (invalida el store completo)
+
+def ensure_feature_store(conn):
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(score_features)")]
+    if cols and not {"derivadas", "version"} <= set(cols):
+        conn.execute("DROP TABLE score_features")  # store de una versión previa: es solo caché
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS score_features(
+      max_fecha    TEXT    NOT NULL,
+      n_rows       INTEGER NOT NULL,
+      derivadas    TEXT    NOT NULL,
+      cap_digitpos INTEGER NOT NULL,
+      cap_exact    INTEGER NOT NULL,
+      cal_horizon  INTEGER NOT NULL,
+      version      INTEGER NOT NULL,
+      built_at     TEXT DEFAULT (datetime('now')),
+      hotcold      BLOB,
+      cal          BLOB,
+      dp           BLOB,
+      exact        BLOB,
+      PRIMARY KEY (max_fecha, n_rows, derivadas, cap_digitpos, cap_exact, cal_horizon, version)
+    )""")
+
+# tablas derivadas que también leen las features: v_digit_hotcold (todos_cuando_son) y el respaldo de
+# digit/posición (matriz_astro_luna); se refrescan después de cargar astro_luna
+DERIVED_SOURCES = ("todos_cuando_son", "matriz_astro_luna")
+
+def derived_fingerprint(conn):
+    # MAX(rowid) sale del último nodo del b-tree (sin recorrer la tabla): sube cada vez que se les agregan filas
+    parts = []
+    for t in DERIVED_SOURCES:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (t,)).fetchone() is None:
+            parts.append(f"{t}:-")
+            continue
+        mx = conn.execute(f'SELECT MAX(rowid) FROM "{t}"').fetchone()[0]
+        parts.append(f"{t}:{mx}")
+    return "|".join(parts)
+
+def source_fingerprint(conn):
+    # clave de invalidación: cambia en cuanto entra (o se corrige) un sorteo y cuando se refrescan las
+    # derivadas (si el scoring corrió entre la carga y el refresco, esas features no se vuelven a servir)
+    maxf, n_rows = conn.execute("SELECT MAX(fecha), COUNT(*) FROM astro_luna").fetchone()
+    return maxf, n_rows, derived_fingerprint(conn)
+
+def load_features(conn, cap_digitpos=60, cap_exact=180, cal_horizon=30, refresh=False):
+    """Lee las features del store en una sola consulta; si no están (o refresh), las calcula y guarda."""
+    _require_numpy()
+    ensure_feature_store(conn)
+    maxf, n_rows, derivadas = source_fingerprint(conn)
+    key = (maxf, n_rows, derivadas, cap_digitpos, cap_exact, cal_horizon, FEATURE_VERSION)
+    if not refresh:
+        row = conn.execute("""
+            SELECT hotcold, cal, dp, exact FROM score_features
+            WHERE max_fecha=? AND n_rows=? AND derivadas=? AND cap_digitpos=? AND cap_exact=? AND cal_horizon=? AND version=?
+        """, key).fetchone()
+        if row is not None:
+            feats = {"max_fecha": maxf}
+            for name, blob in zip(("hotcold", "cal", "dp", "exact"), row):
+                feats[name] = np.frombuffer(blob, dtype="<f8").reshape(FEATURE_SHAPES[name])
+            return feats
+
+    feats = compute_features(conn, cap_digitpos, cap_exact, cal_horizon)
+    # solo se conserva la versión vigente de la fuente; las claves viejas quedan obsoletas
+    conn.execute("DELETE FROM score_features WHERE max_fecha<>? OR n_rows<>? OR derivadas<>? OR version<>?",
+                 (maxf, n_rows, derivadas, FEATURE_VERSION))
+    conn.execute("""
+        INSERT OR REPLACE INTO score_features(max_fecha,n_rows,derivadas,cap_digitpos,cap_exact,cal_horizon,version,hotcold,cal,dp,exact)
+        VALUES(?,?,?,?,?,?,?,?,?,?,?)
+    """, key + tuple(np.asarray(feats[k], dtype="<f8").tobytes() for k in ("hotcold", "cal", "dp", "exact")))
+    conn.commit()
+    return feats
+
+def score_components(feats, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35):
+    """Scores del universo en orden natural (índice = número). Devuelve (score, componentes)."""
+    um, c, d, u = universe_digits().T
+    hc, cal, dp = feats["hotcold"], feats["cal"], feats["dp"]
+    # suma explícita posición a posición: mismo orden de operaciones que score_one
+    comp = {
+        "hotcold": (hc[um] + hc[c] + hc[d] + hc[u]) / 4.0,
+        "cal": (cal[0, um] + cal[1, c] + cal[2, d] + cal[3, u]) / 4.0,
+        "dp": (dp[0, um] + dp[1, c] + dp[2, d] + dp[3, u]) / 4.0,
+        "exact": np.asarray(feats["exact"], dtype=float),
+        "patt": universe_pattern_bonus(),
+    }
+    return combine_components(comp, w_hot, w_cal, w_dp, w_exact), comp
+
+def combine_components(comp, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35):
+    # separado para re-pesar componentes ya calculados sin volver a indexar (tuning)
+    return (w_hot*comp["hotcold"] + w_cal*comp["cal"] + w_dp*comp["dp"] + w_exact*comp["exact"]) + comp["patt"]
+
+def rank_of(score, numero):
+    # rank 1-based de 'numero' con el mismo desempate que rank_features (score desc, numero asc)
+    s = score[numero]
+    return int(np.count_nonzero(score > s) + np.count_nonzero(score[:numero] == s) + 1)
+
+def rank_features(feats, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35):
+    """Combina features precalculadas en scores del universo. Devuelve dict de arrays ordenados por rank."""
+    score, comp = score_components(feats, w_hot, w_cal, w_dp, w_exact)
+    nums = np.arange(UNIVERSE)
+    order = np.lexsort((nums, -score))  # score desc, numero asc (igual que score_all)
+    out = {"numero": nums[order], "score": score[order]}
+    for k in ("hotcold", "cal", "dp", "exact", "patt"):
+        out[k] = comp[k][order]
+    return out
 
+def score_universe(conn, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35,
+                   cap_digitpos=60, cap_exact=180, cal_horizon=30, use_store=True, refresh=False, prof=None):
+    """Puntúa los 10000 números de una vez. Devuelve dict de arrays ya ordenados por rank."""
+    with stage(prof, "features"):
+        if use_store:
+            feats = load_features(conn, cap_digitpos, cap_exact, cal_horizon, refresh=refresh)
+        else:
+            feats = compute_features(conn, cap_digitpos, cap_exact, cal_horizon)
+    with stage(prof, "rank"):
+        return rank_features(feats, w_hot, w_cal, w_dp, w_exact)
+
+def universe_rows(ranked, limit=None):
+    # convierte (un slice de) los arrays rankeados al formato de filas de score_all
+    n = len(ranked["numero"]) if limit is None else min(limit, len(ranked["numero"]))
     rows = []
-    for num in candidates:
-        rows.append(score_one(conn, num, w_hot, w_cal, w_dp, w_exact, dp_map, hc_map, exact_map))
-    rows.sort(key=lambda r: (-r["score"], r["numero"]))
-    for i, r in enumerate(rows, 1):
-        r["rank"] = i
+    for i in range(n):
+        rows.append({
+            "rank": i + 1,
+            "numero": f"{int(ranked['numero'][i]):04d}",
+            "score": float(ranked["score"][i]),
+            "hotcold": float(ranked["hotcold"][i]),
+            "cal": float(ranked["cal"][i]),
+            "dp": float(ranked["dp"][i]),
+            "exact": float(ranked["exact"][i]),
+            "patt": float(ranked["patt"][i]),
+        })
+    return rows
+
+# -------------- API de librería --------------
+class Scorer:
+    """Carga las features una vez y responde puntuaciones sobre el universo completo.
+
+    Uso:
+        sc = Scorer("C:\\RadarPremios\\radar_premios.db")
+        sc.score(["0123", "4567"]); sc.rank_all(); sc.explain("0123")
+    """
+
+    def __init__(self, db, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35,
+                 cap_digitpos=60, cap_exact=180, cal_horizon=30, use_store=True):
+        _require_numpy()
+        self.db = db
+        self.weights = {"w_hot": w_hot, "w_cal": w_cal, "w_dp": w_dp, "w_exact": w_exact}
+        self.caps = {"cap_digitpos": cap_digitpos, "cap_exact": cap_exact, "cal_horizon": cal_horizon}
+        self.use_store = use_store
+        self.conn = sqlite3.connect(db, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.fingerprint = None
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        """Recarga features si cambió astro_luna (o si force). Devuelve True si recargó."""
+        fp = source_fingerprint(self.conn)
+        if not force and fp == self.fingerprint:
+            return False
+        c = self.caps
+        if self.use_store:
+            self.feats = load_features(self.conn, c["cap_digitpos"], c["cap_exact"], c["cal_horizon"])
+        else:
+            self.feats = compute_features(self.conn, c["cap_digitpos"], c["cap_exact"], c["cal_horizon"])
+        w = self.weights
+        self.scores, self.comp = score_components(self.feats, w["w_hot"], w["w_cal"], w["w_dp"], w["w_exact"])
+        nums = np.arange(UNIVERSE)
+        self.order = np.lexsort((nums, -self.scores))
+        self.ranks = np.empty(UNIVERSE, dtype=np.int64)
+        self.ranks[self.order] = np.arange(1, UNIVERSE + 1)
+        self.fingerprint = fp
+        return True
+
+    def _row(self, n):
+        row = {"rank": int(self.ranks[n]), "numero": f"{n:04d}", "score": float(self.scores[n])}
+        for k in ("hotcold", "cal", "dp", "exact", "patt"):
+            row[k] = float(self.comp[k][n])
+        return row
+
+    def score(self, numbers):
+        """Filas (mismo formato que score_all) para los números pedidos, con su rank en el universo."""
+        return [self._row(int(x)) for x in numbers]
+
+    def rank_all(self, limit=None):
+        """Universo completo ordenado por rank (o los primeros 'limit')."""
+        idx = self.order if limit is None else self.order[:limit]
+        return [self._row(int(n)) for n in idx]
+
+    def explain(self, number):
+        """Desglose del score: aporte ponderado de cada componente y detalle por posición."""
+        n = int(number)
+        row = self._row(n)
+        w = self.weights
+        row["max_fecha"] = self.feats["max_fecha"]
+        row["weights"] = dict(w)
+        row["aportes"] = {
+            "hotcold": w["w_hot"] * row["hotcold"],
+            "cal": w["w_cal"] * row["cal"],
+            "dp": w["w_dp"] * row["dp"],
+            "exact": w["w_exact"] * row["exact"],
+            "patt": row["patt"],
+        }
+        row["posiciones"] = [
+            {"posicion": p, "digito": int(d),
+             "hotcold": float(self.feats["hotcold"][d]),
+             "cal": float(self.feats["cal"][i, d]),
+             "dp": float(self.feats["dp"][i, d])}
+            for i, (p, d) in enumerate(zip(POSITIONS, universe_digits()[n]))
+        ]
+        return row
+
+    def close(self):
+        self.conn.close()
+
+def score_all(conn, candidates, w_hot=0.25, w_cal=0.2, w_dp=0.2, w_exact=0.35,
+              cap_digitpos=60, cap_exact=180, cal_horizon=30, use_store=True, refresh=False, prof=None):
+    # prof: StageProfiler opcional (--profile); cada bloque queda como una etapa
+    if use_store and np is not None:
+        with stage(prof, "features"):
+            feats = load_features(conn, cap_digitpos, cap_exact, cal_horizon, refresh=refresh)
+            hc_map = {d: float(v) for d, v in enumerate(feats["hotcold"])}
+            dp_map = {p: {d: float(v) for d, v in enumerate(feats["dp"][i])} for i, p in enumerate(POSITIONS)}
+            exact_map = {c: float(feats["exact"][int(c)]) for c in candidates}
+            cal_map = feats["cal"].tolist()
+    else:
+        with stage(prof, "ensure_views"):
+            ensure_views(conn)
+        with stage(prof, "hotcold"):
+            if prof is not None:
+                prof.explain(conn, "SELECT digito, hotcold_norm FROM v_digit_hotcold")
+            hc_map = load_hotcold(conn)
+        with stage(prof, "digitpos"):
+            dp_map = last_seen_digitpos_norm(conn, cap_days=cap_digitpos)
+        with stage(prof, "exact_join"):
+            exact_map = last_seen_exact_norm(conn, candidates, cap_days=cap_exact, prof=prof)
+        with stage(prof, "cal"):
+            cal_map = cal_table(conn, horizon=cal_horizon)
+    today = get_max_fecha(conn)
+
+    with stage(prof, "score_loop"):
+        rows = []
+        for num in candidates:
+            rows.append(score_one(conn, num, w_hot, w_cal, w_dp, w_exact, dp_map, hc_map, exact_map,
+                                  today=today, cal_map=cal_map, cal_horizon=cal_horizon))
+        rows.sort(key=lambda r: (-r["score"], r["numero"]))
+        for i, r in enumerate(rows, 1):
+            r["rank"] = i
     return rows
 
 def main():
@@ -318,28 +737,61 @@ def main():
     ap.add_argument("--w-exact", type=float, default=0.35)
     ap.add_argument("--cap-digitpos", type=int, default=60)
     ap.add_argument("--cap-exact", type=int, default=180)
-    ap.add_argument("--cal-horizon", type=int, default=30)
+    ap.add_argument("--cal-horizon", type=int, default=30,
+                    help="Semanas hacia atrás para el efecto calendario (día de la semana x posición x dígito)")
     ap.add_argument("--auto-eval", action="store_true", help="Imprime VEREDICTO contra MAX(fecha) tras guardar el run")
+    ap.add_argument("--patrones", type=str, default=None,
+                    help=f"Solo generar estas clases (coma): {','.join(PATTERN_CLASSES)}")
+    ap.add_argument("--excluir-patrones", type=str, default=None, help="Clases de patrón a excluir (coma)")
+    ap.add_argument("--universe", action="store_true", help="Puntúa los 10000 números (vectorizado, requiere numpy); ignora --gen/--candidatos")
+    ap.add_argument("--no-feature-store", action="store_true", help="No usar la tabla score_features (recalcula todo desde las tablas)")
+    ap.add_argument("--storage", choices=["rows", "packed", "both"], default="rows",
+                    help="Formato del run en DB: run_candidates (rows), run_blobs compacto (packed) o ambos")
+    ap.add_argument("--refresh-features", action="store_true", help="Fuerza recalcular y regrabar score_features")
+    ap.add_argument("--profile", action="store_true",
+                    help="Mide cada etapa (ms, pasos de VM SQLite, pico de memoria); se imprime en el FOLIO y se guarda en runs.profile")
     args = ap.parse_args()
 
     conn = sqlite3.connect(args.db)
     conn.row_factory = sqlite3.Row
+    prof = StageProfiler(conn, enabled=args.profile)
     try:
         # candidatos
-        if args.candidatos:
-            nums = []
-            with open(args.candidatos, "r", encoding="utf-8") as f:
-                rdr = csv.DictReader(f)
-                for row in rdr:
-                    nums.append(str(row["numero"]).zfill(4))
-        else:
-            nums = gen_candidates(args.gen, seed=args.seed)
+        with prof.stage("candidatos"):
+            if args.universe:
+                nums = None
+            elif args.candidatos:
+                nums = []
+                with open(args.candidatos, "r", encoding="utf-8") as f:
+                    rdr = csv.DictReader(f)
+                    for row in rdr:
+                        nums.append(str(row["numero"]).zfill(4))
+            else:
+                allow_c = [x.strip() for x in args.patrones.split(",")] if args.patrones else None
+                deny_c = [x.strip() for x in args.excluir_patrones.split(",")] if args.excluir_patrones else None
+                for c in (allow_c or []) + (deny_c or []):
+                    if c not in PATTERN_CLASSES:
+                        raise SystemExit(f"[ERROR] Clase de patrón desconocida: {c} (válidas: {', '.join(PATTERN_CLASSES)})")
+                nums = gen_candidates(args.gen, seed=args.seed, allow_classes=allow_c, deny_classes=deny_c)
+                if len(nums) < args.gen:
+                    print(f"[INFO] Solo {len(nums)} números cumplen los filtros de patrón (pedidos: {args.gen}).")
 
-        rows = score_all(
-            conn, nums,
-            w_hot=args.w_hotcold, w_cal=args.w_cal, w_dp=args.w_dp, w_exact=args.w_exact,
-            cap_digitpos=args.cap_digitpos, cap_exact=args.cap_exact, cal_horizon=args.cal_horizon
-        )
+        if args.universe:
+            ranked = score_universe(
+                conn,
+                w_hot=args.w_hotcold, w_cal=args.w_cal, w_dp=args.w_dp, w_exact=args.w_exact,
+                cap_digitpos=args.cap_digitpos, cap_exact=args.cap_exact, cal_horizon=args.cal_horizon,
+                use_store=not args.no_feature_store, refresh=args.refresh_features, prof=prof
+            )
+            with prof.stage("rows"):
+                rows = universe_rows(ranked)
+        else:
+            rows = score_all(
+                conn, nums,
+                w_hot=args.w_hotcold, w_cal=args.w_cal, w_dp=args.w_dp, w_exact=args.w_exact,
+                cap_digitpos=args.cap_digitpos, cap_exact=args.cap_exact, cal_horizon=args.cal_horizon,
+                use_store=not args.no_feature_store, refresh=args.refresh_features, prof=prof
+            )
 
         # TOP N
         top_rows = rows[:args.top]
@@ -348,15 +800,16 @@ def main():
             print(f"{r['numero']}  score={r['score']:.6f}  hotcold={r['hotcold']:.3f}  cal={r['cal']:.3f}  dp={r['dp']:.3f}  exact={r['exact']:.3f}  patt={r['patt']:+.3f}")
 
         # exports
-        if args.export:
-            export_csv(top_rows, Path(args.export))
-            print(f"[OK] CSV → {args.export}")
-        if args.export_all:
-            export_csv(rows, Path(args.export_all))
-            print(f"[OK] CSV (todos) → {args.export_all}")
-        if args.report:
-            export_html(top_rows, Path(args.report))
-            print(f"[OK] HTML → {args.report}")
+        with prof.stage("exports"):
+            if args.export:
+                export_csv(top_rows, Path(args.export))
+                print(f"[OK] CSV → {args.export}")
+            if args.export_all:
+                export_csv(rows, Path(args.export_all))
+                print(f"[OK] CSV (todos) → {args.export_all}")
+            if args.report:
+                export_html(top_rows, Path(args.report))
+                print(f"[OK] HTML → {args.report}")
 
         # Shortlist + Folio
         shortlist_n = max(1, min(args.shortlist, args.top))
@@ -373,7 +826,8 @@ def main():
         ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"timestamp: {ts}")
         print(f"db: {args.db}")
-        print(f"gen: {args.gen}")
+        print(f"gen: {UNIVERSE if args.universe else args.gen}")
+        print(f"universe: {args.universe}")
         print(f"seed: {args.seed}")
         print(f"top: {args.top}")
         print(f"shortlist: {shortlist_n}")
@@ -383,16 +837,27 @@ def main():
         print(f"w_exact: {args.w_exact}")
         print(f"cap_digitpos: {args.cap_digitpos}")
         print(f"cap_exact: {args.cap_exact}")
+        print(f"cal_horizon: {args.cal_horizon}")
+        print(f"storage: {args.storage}")
         print(f"export_top: {args.export or ''}")
         print(f"export_all: {args.export_all or ''}")
         print(f"report_html: {args.report or ''}")
+        if args.profile:
+            print("profile:")
+            for line in prof.lines():
+                print(line)
         print("================================================================")
 
         # Guardar en DB
-        run_id = save_run(conn, rows, {
-            "w_hot": args.w_hotcold, "w_cal": args.w_cal, "w_dp": args.w_dp, "w_exact": args.w_exact
-        }, meta={"seed": args.seed})
+        with prof.stage("save_run"):
+            run_id = save_run(conn, rows, {
+                "w_hot": args.w_hotcold, "w_cal": args.w_cal, "w_dp": args.w_dp, "w_exact": args.w_exact
+            }, meta={"seed": args.seed}, storage=args.storage)
         print(f"\n[OK] Run guardado en DB con run_id={run_id}")
+        if args.profile:
+            s = prof.stages[-1]
+            print(f"[INFO] profile save_run: {s['ms']:.1f} ms  vm_steps≈{s['vm_steps']}  peak={s['peak_kb']:.1f} KB")
+            save_run_profile(conn, run_id, prof.to_json())
 
         # VEREDICTO inmediato si se pide
         if args.auto-eval if False else args.auto_eval:  # protección por nombres con guion
@@ -408,6 +873,7 @@ def main():
                 print("==============================================================\n")
 
     finally:
+        prof.close()
         conn.close()
 
 if __name__ == "__main__":
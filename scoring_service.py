@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+scoring_service.py — Servidor HTTP/JSON local sobre score_candidates.Scorer (features cargadas una sola vez).
+Endpoints:
+  GET  /health                     -> estado, MAX(fecha) y pesos
+  GET  /top?k=15                   -> primeros k del universo
+  GET  /score?numeros=0123,4567    -> filas con score/rank de esos números
+  POST /score   {"numeros": [...]} -> ídem por JSON
+  GET  /explain?numero=0123        -> desglose del score
+  POST /refresh                    -> recarga features si entraron sorteos nuevos
+Antes de cada consulta se revisa (como máximo cada --check-every segundos) si astro_luna cambió.
+Uso:
+  python scoring_service.py --db "C:\\RadarPremios\\radar_premios.db" --port 8765
+"""
+import argparse, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from score_candidates import Scorer
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    scorer = None
+    lock = threading.Lock()
+    check_every = 60.0
+    last_check = 0.0
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_refresh(self, force=False):
+        cls = type(self)
+        now = time.monotonic()
+        if force or now - cls.last_check >= cls.check_every:
+            cls.last_check = now
+            return cls.scorer.refresh()
+        return False
+
+    def _numeros(self, raw):
+        out = []
+        for x in raw:
+            x = str(x).strip()
+            if not x.isdigit() or int(x) >= 10000:
+                raise ValueError(f"número inválido: {x!r}")
+            out.append(x.zfill(4))
+        return out
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        qs = parse_qs(url.query)
+        sc = self.scorer
+        with self.lock:
+            if method == "POST" and url.path == "/refresh":
+                return 200, {"recargado": self._maybe_refresh(force=True), "max_fecha": sc.feats["max_fecha"]}
+            self._maybe_refresh()
+            if url.path == "/health":
+                return 200, {"ok": True, "db": sc.db, "max_fecha": sc.feats["max_fecha"], **sc.weights, **sc.caps}
+            if url.path == "/top":
+                k = int(qs.get("k", ["15"])[0])
+                return 200, {"max_fecha": sc.feats["max_fecha"], "rows": sc.rank_all(limit=k)}
+            if url.path == "/score":
+                if method == "POST":
+                    length = int(self.headers.get("Content-Length") or 0)
+                    data = json.loads(self.rfile.read(length) or b"{}")
+                    raw = data.get("numeros", [])
+                else:
+                    raw = ",".join(qs.get("numeros", [])).split(",")
+                nums = self._numeros([x for x in raw if str(x).strip()])
+                return 200, {"max_fecha": sc.feats["max_fecha"], "rows": sc.score(nums)}
+            if url.path == "/explain":
+                nums = self._numeros(qs.get("numero", []))
+                if len(nums) != 1:
+                    raise ValueError("usa ?numero=NNNN")
+                return 200, sc.explain(nums[0])
+        return 404, {"error": f"ruta no encontrada: {url.path}"}
+
+    def _handle(self, method):
+        try:
+            status, payload = self._dispatch(method)
+        except (ValueError, json.JSONDecodeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        self._send(status, payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, fmt, *args):
+        print(f"[HTTP] {self.address_string()} {fmt % args}", flush=True)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--w-hotcold", type=float, default=0.25)
+    ap.add_argument("--w-cal", type=float, default=0.20)
+    ap.add_argument("--w-dp", type=float, default=0.20)
+    ap.add_argument("--w-exact", type=float, default=0.35)
+    ap.add_argument("--cap-digitpos", type=int, default=60)
+    ap.add_argument("--cap-exact", type=int, default=180)
+    ap.add_argument("--cal-horizon", type=int, default=30)
+    ap.add_argument("--check-every", type=float, default=60.0, help="Segundos entre chequeos de sorteos nuevos")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    ScoringHandler.scorer = Scorer(
+        args.db, w_hot=args.w_hotcold, w_cal=args.w_cal, w_dp=args.w_dp, w_exact=args.w_exact,
+        cap_digitpos=args.cap_digitpos, cap_exact=args.cap_exact, cal_horizon=args.cal_horizon
+    )
+    ScoringHandler.check_every = args.check_every
+    ScoringHandler.last_check = time.monotonic()
+    print(f"[OK] Features cargadas en {time.perf_counter() - t0:.3f}s "
+          f"(MAX(fecha)={ScoringHandler.scorer.feats['max_fecha']})")
+
+    httpd = ThreadingHTTPServer((args.host, args.port), ScoringHandler)
+    print(f"[OK] Sirviendo en http://{args.host}:{args.port}  (Ctrl+C para salir)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        ScoringHandler.scorer.close()
+
+if __name__ == "__main__":
+    main()
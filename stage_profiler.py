@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+stage_profiler.py — Medición por etapa para scripts que trabajan sobre SQLite (score_candidates.py --profile).
+Por cada etapa registra:
+  - ms       : tiempo de pared
+  - vm_steps : instrucciones de la VM de SQLite ejecutadas (progress handler cada VM_GRANULARITY pasos);
+               es el proxy disponible desde Python del trabajo de escaneo (filas recorridas x columnas)
+  - peak_kb  : pico de memoria Python asignada durante la etapa (tracemalloc)
+  - plan     : SCAN/SEARCH de EXPLAIN QUERY PLAN de las consultas registradas con explain() en esa etapa
+Deshabilitado (enabled=False) no instala handlers y stage() no mide nada.
+"""
+import json, time, tracemalloc
+from contextlib import contextmanager, nullcontext
+
+VM_GRANULARITY = 1000
+
+class StageProfiler:
+    def __init__(self, conn=None, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+        self._steps = 0
+        self._plans = []
+        self._conn = None
+        if enabled:
+            tracemalloc.start()
+            if conn is not None:
+                self.attach(conn)
+
+    def attach(self, conn):
+        # un progress handler por conexión: se reemplaza el que hubiera
+        if self.enabled:
+            self._conn = conn
+            conn.set_progress_handler(self._tick, VM_GRANULARITY)
+
+    def _tick(self):
+        self._steps += VM_GRANULARITY
+        return 0  # 0 = no interrumpir la consulta
+
+    def explain(self, conn, sql, params=()):
+        """Guarda las líneas SCAN/SEARCH del plan de 'sql' en la etapa en curso (solo si está habilitado)."""
+        if not self.enabled:
+            return
+        handler_conn = self._conn
+        if handler_conn is conn:
+            conn.set_progress_handler(None, 0)  # el EXPLAIN no cuenta como trabajo de la etapa
+        try:
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+                detail = str(row[-1])
+                if detail.startswith(("SCAN", "SEARCH")):
+                    self._plans.append(detail)
+        finally:
+            if handler_conn is conn:
+                conn.set_progress_handler(self._tick, VM_GRANULARITY)
+
+    @contextmanager
+    def _measure(self, name):
+        steps0 = self._steps
+        self._plans = []
+        tracemalloc.reset_peak()
+        mem0 = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            peak = tracemalloc.get_traced_memory()[1]
+            self.stages.append({
+                "stage": name,
+                "ms": round(ms, 3),
+                "vm_steps": self._steps - steps0,
+                "peak_kb": round(max(0, peak - mem0) / 1024.0, 1),
+                "plan": sorted(set(self._plans)),
+            })
+
+    def stage(self, name):
+        return self._measure(name) if self.enabled else nullcontext()
+
+    def total_ms(self):
+        return sum(s["ms"] for s in self.stages)
+
+    def lines(self):
+        out = []
+        for s in self.stages:
+            plan = f"  plan: {'; '.join(s['plan'])}" if s["plan"] else ""
+            out.append(f"  {s['stage']:<14} {s['ms']:>10.1f} ms  vm_steps≈{s['vm_steps']:>10}  "
+                       f"peak={s['peak_kb']:>9.1f} KB{plan}")
+        out.append(f"  {'total':<14} {self.total_ms():>10.1f} ms")
+        return out
+
+    def to_json(self):
+        return json.dumps(self.stages, ensure_ascii=False)
+
+    def close(self):
+        if self.enabled:
+            if self._conn is not None:
+                self._conn.set_progress_handler(None, 0)
+            tracemalloc.stop()
+
+def stage(prof, name):
+    # atajo para funciones que reciben prof=None
+    return prof.stage(name) if prof is not None else nullcontext()
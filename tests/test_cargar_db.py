@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Errores de escritura en cargar_db.py:
+- carga en paralelo (process_dir_parallel): el archivo no debe quedar en ingest_manifest como cargado; la
+  siguiente carga incremental tiene que releerlo completo;
+- --bootstrap (bootstrap_dir): la tabla a medio cargar se descarta y la base queda libre para otra conexión.
+  python -m pytest -q tests
+"""
+import os, shutil, sqlite3, sys, tempfile, unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cargar_db
+
+ROWS = 30
+
+def write_csv(path, prefix):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("fecha,numero\n")
+        for i in range(ROWS):
+            f.write(f"2025-01-{i % 28 + 1:02d},{prefix}{i:03d}\n")
+
+def count(db, table):
+    conn = sqlite3.connect(db)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    finally:
+        conn.close()
+
+class FailingConn(sqlite3.Connection):
+    # executemany que falla en la tabla 'b' (simula un error de escritura a mitad del archivo)
+    def executemany(self, sql, rows):
+        if 'INTO "b"' in sql:
+            raise sqlite3.OperationalError("disk I/O error (simulado)")
+        return super().executemany(sql, rows)
+
+class LoadCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="test_cargar_db_")
+        self.src = os.path.join(self.tmp, "crudo")
+        os.makedirs(self.src)
+        write_csv(os.path.join(self.src, "a.csv"), "1")
+        write_csv(os.path.join(self.src, "b.csv"), "2")
+        self.db = os.path.join(self.tmp, "t.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+class ParallelWriteErrorTest(LoadCase):
+    def load(self):
+        return {s["table"]: s for s in cargar_db.process_dir_parallel(self.db, self.src, chunk_size=7, workers=2)}
+
+    def assert_reread(self, first):
+        self.assertIsNone(first["a"]["error"])
+        self.assertIsNotNone(first["b"]["error"])
+        second = self.load()
+        self.assertEqual(second["a"]["mode"], "skip")
+        self.assertNotEqual(second["b"]["mode"], "skip")
+        self.assertIsNone(second["b"]["error"])
+        self.assertEqual(count(self.db, "b"), ROWS)
+        self.assertEqual(self.load()["b"]["mode"], "skip")
+
+    def test_prepare_table_error_is_reread(self):
+        real = cargar_db.prepare_table
+        def failing(conn, table, *a, **kw):
+            if table == "b":
+                raise sqlite3.OperationalError("database is locked (simulado)")
+            return real(conn, table, *a, **kw)
+        with mock.patch.object(cargar_db, "prepare_table", failing):
+            first = self.load()
+        self.assert_reread(first)
+
+    def test_executemany_error_is_reread(self):
+        real = cargar_db.connect_db
+        def connect(db_path):
+            conn = real(db_path)
+            conn.close()
+            conn = sqlite3.connect(db_path, factory=FailingConn)
+            return conn
+        with mock.patch.object(cargar_db, "connect_db", connect):
+            first = self.load()
+        self.assert_reread(first)
+
+class BootstrapWriteErrorTest(LoadCase):
+    def load(self):
+        return {s["table"]: s for s in cargar_db.bootstrap_dir(self.db, self.src, chunk_size=7)}
+
+    def test_failed_table_is_dropped(self):
+        real = cargar_db.upsert_rows
+        def failing(conn, table, *a, **kw):
+            if table == "b":
+                real(conn, table, *a, **kw)  # filas ya escritas (sin journal no hay rollback)
+                raise sqlite3.OperationalError("disk I/O error (simulado)")
+            return real(conn, table, *a, **kw)
+        with mock.patch.object(cargar_db, "upsert_rows", failing):
+            first = self.load()
+        self.assertIsNone(first["a"]["error"])
+        self.assertIsNotNone(first["b"]["error"])
+        conn = sqlite3.connect(self.db, timeout=0)  # la conexión EXCLUSIVE ya se cerró
+        try:
+            conn.execute("CREATE TABLE otra(x)")
+            self.assertIsNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name='b'").fetchone())
+            self.assertIsNone(conn.execute("SELECT 1 FROM ingest_dedup WHERE tabla='b'").fetchone())
+        finally:
+            conn.close()
+        second = {s["table"]: s for s in cargar_db.process_dir(self.db, self.src, chunk_size=7)}
+        self.assertEqual(second["a"]["mode"], "skip")
+        self.assertIsNone(second["b"]["error"])
+        self.assertEqual(count(self.db, "b"), ROWS)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+column_types.py y la coerción de cargar_db.py:
+- fechas XX/XX/YYYY ambiguas (se leen día/mes) y las que solo valen como mes/día (no son fecha);
+- columnas con tipos mezclados y columnas vacías (quedan TEXT);
+- carga real de un CSV: tipos declarados de la tabla nueva y valores guardados.
+  python -m pytest -q tests
+"""
+import os, shutil, sqlite3, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cargar_db
+from column_types import coerce_row, coercers_for, infer_types, to_date, value_kind
+
+class ToDateTest(unittest.TestCase):
+    def test_dia_mes_ambiguo(self):
+        # 03/04 podría ser 3 de abril o 4 de marzo: los CSV vienen DD/MM
+        self.assertEqual(to_date("03/04/2025"), "2025-04-03")
+        self.assertEqual(to_date("3/4/2025"), "2025-04-03")
+        self.assertEqual(value_kind("03/04/2025"), "DATE")
+
+    def test_solo_valido_como_mes_dia(self):
+        self.assertEqual(to_date("12/31/2025"), "12/31/2025")
+        self.assertEqual(value_kind("12/31/2025"), "TEXT")
+
+    def test_fechas_imposibles(self):
+        self.assertEqual(to_date("31/02/2025"), "31/02/2025")
+        self.assertEqual(to_date("30 febrero 2025"), "30 febrero 2025")
+        self.assertEqual(to_date("29/02/2024"), "2024-02-29")
+
+    def test_iso_y_largas(self):
+        self.assertEqual(to_date("2025-08-02"), "2025-08-02")
+        self.assertEqual(to_date("lunes 28 julio 2025"), "2025-07-28")
+        self.assertEqual(to_date("Sábado, 02 de Agosto de 2025"), "2025-08-02")
+        self.assertIsNone(to_date(""))
+
+class InferTypesTest(unittest.TestCase):
+    HEADERS = ["fecha", "ambigua", "mesdia", "entero", "real", "mezcla", "vacia", "monto", "miles"]
+
+    def infer(self, rows):
+        return infer_types(self.HEADERS, rows)
+
+    def test_tipos(self):
+        rows = [
+            ["01/08/2025", "03/04/2025", "12/31/2025", "7", "1.5", "12", "", "$2.400.000", "2.157"],
+            ["02/08/2025", "05/06/2025", "01/02/2025", "-3", "2", "abc", "", "$1.000", "1.000"],
+            ["", "", "", "", "", "", "", "", ""],
+        ]
+        self.assertEqual(self.infer(rows), {
+            "fecha": "DATE", "ambigua": "DATE",
+            "mesdia": "TEXT",    # una sola fecha mes/día basta para no tipar la columna
+            "entero": "INTEGER", "real": "REAL",
+            "mezcla": "TEXT",    # número + texto
+            "vacia": "TEXT",     # sin valores no vacíos
+            "monto": "INTEGER",
+            "miles": "TEXT",     # '2.157' ambiguo (¿miles o decimales?)
+        })
+
+    def test_sin_filas(self):
+        self.assertEqual(set(self.infer([]).values()), {"TEXT"})
+
+    def test_fila_corta(self):
+        self.assertEqual(infer_types(["a", "b"], [["1"], ["2", "x"]]), {"a": "INTEGER", "b": "TEXT"})
+
+    def test_coercion(self):
+        types = {"ambigua": "DATE", "entero": "INTEGER", "real": "REAL", "mezcla": "TEXT", "monto": "INTEGER"}
+        headers = ["fecha", "ambigua", "entero", "real", "mezcla", "monto", "vacia"]
+        coercers = coercers_for(types, headers)
+        self.assertEqual(coerce_row(["01/08/2025", "03/04/2025", "7", "2", "12", "$2.400.000", ""], coercers),
+                         ["2025-08-01", "2025-04-03", 7, 2.0, "12", 2400000, ""])
+        # vacíos de columnas tipadas -> NULL; lo no convertible se guarda tal cual
+        self.assertEqual(coerce_row(["", "", "", "", "", "", ""], coercers), [None, None, None, None, "", None, ""])
+        self.assertEqual(coerce_row(["12/31/2025", "x", "n/a", "-", "", "", ""], coercers),
+                         ["12/31/2025", "x", "n/a", "-", "", None, ""])
+
+class CargarDbTiposTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="test_column_types_")
+        self.src = os.path.join(self.tmp, "crudo")
+        os.makedirs(self.src)
+        self.db = os.path.join(self.tmp, "t.db")
+        with open(os.path.join(self.src, "sorteos.csv"), "w", encoding="utf-8", newline="") as f:
+            f.write("fecha,numero,premio,nota,vacia\n")
+            f.write("03/04/2025,0123,$1.500,ok,\n")
+            f.write("12/31/2025,4567,$2.000,15,\n")
+            f.write("05/04/2025,0089,,,\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_carga_tipada(self):
+        stats = cargar_db.process_dir(self.db, self.src)
+        self.assertIsNone(stats[0]["error"])
+        conn = sqlite3.connect(self.db)
+        try:
+            declared = {r[1]: r[2] for r in conn.execute('PRAGMA table_info("sorteos")')}
+            self.assertEqual(declared["numero"], "INTEGER")
+            self.assertEqual(declared["premio"], "INTEGER")
+            self.assertEqual(declared["nota"], "TEXT")
+            self.assertEqual(declared["vacia"], "TEXT")
+            self.assertEqual(declared["fecha"], "TEXT")  # una fecha mes/día en la muestra
+            rows = conn.execute("SELECT fecha, numero, premio, nota, vacia FROM sorteos ORDER BY rowid").fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(rows, [
+            ("2025-04-03", 123, 1500, "ok", ""),
+            ("12/31/2025", 4567, 2000, "15", ""),  # no se inventa '2025-31-12'
+            ("2025-04-05", 89, None, "", ""),
+        ])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+orquestador_astroluna_v6.py: tras agregar sorteos a astro_luna, la pasada incremental (matriz por marca de
+sincronización + reparto de las filas nuevas a cuando_* / todo_cuando_*) debe dejar las mismas filas que una
+reconstrucción completa (--full, tabla por tabla o con --una-pasada).
+  python -m pytest -q tests
+"""
+import io, os, random, shutil, sqlite3, sys, tempfile, unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orquestador_astroluna_v6 as orq
+
+DERIVADAS = ["cuando_1_es_umil", "cuando_3_es_c_y_d", "cuando_0_es_decena", "cuando_7_es_u",
+             "todo_cuando_5_es", "todo_cuando_cero_es"]
+
+def sorteos(rnd, desde, n):
+    return [(f"2025-{1 + (desde + i) // 28:02d}-{1 + (desde + i) % 28:02d}", f"{rnd.randrange(10000):04d}", "Leo")
+            for i in range(n)]
+
+class IncrementalIgualCompletoTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="test_derivadas_")
+        self.db = os.path.join(self.tmp, "base.db")
+        self.rnd = random.Random(22)
+        conn = sqlite3.connect(self.db)
+        with conn:
+            conn.execute('CREATE TABLE astro_luna ("fecha" TEXT, "numero" TEXT, "signo" TEXT)')
+            conn.executemany("INSERT INTO astro_luna VALUES (?, ?, ?)", sorteos(self.rnd, 0, 150))
+        conn.close()
+        self.orquestar(self.db)  # crea la matriz
+        conn = sqlite3.connect(self.db)
+        with conn:
+            for t in DERIVADAS:
+                conn.execute(f'CREATE TABLE "{t}" AS SELECT * FROM "{orq.MATRIX_TABLE}" WHERE 0')
+            conn.execute("CREATE TABLE todos_cuando_son (fecha TEXT, numero TEXT, posicion TEXT, digito INTEGER)")
+        conn.close()
+        self.orquestar(self.db)  # primera carga completa de las derivadas: deja las marcas
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def orquestar(self, db, *extra):
+        out = io.StringIO()
+        argv = ["orquestador_astroluna_v6.py", "--db", db, "--reconstruir-matriz", *extra]
+        with mock.patch.object(sys, "argv", argv), redirect_stdout(out):
+            orq.main()
+        return out.getvalue()
+
+    def contenido(self, db):
+        conn = sqlite3.connect(db)
+        try:
+            out = {}
+            for t in DERIVADAS + ["todos_cuando_son", orq.MATRIX_TABLE]:
+                cols = ", ".join(f'"{c[1]}"' for c in orq.get_cols(conn, t))
+                out[t] = conn.execute(f'SELECT {cols} FROM "{t}" ORDER BY {cols}').fetchall()
+            return out
+        finally:
+            conn.close()
+
+    def copia(self, nombre):
+        path = os.path.join(self.tmp, nombre)
+        shutil.copyfile(self.db, path)
+        return path
+
+    def test_incremental_igual_a_completo(self):
+        for tanda in range(2):
+            conn = sqlite3.connect(self.db)
+            with conn:
+                conn.executemany("INSERT INTO astro_luna VALUES (?, ?, ?)", sorteos(self.rnd, 150 + 40 * tanda, 40))
+            conn.close()
+            completo, una_pasada = self.copia(f"full{tanda}.db"), self.copia(f"una{tanda}.db")
+
+            salida = self.orquestar(self.db)
+            self.assertIn(f"cuando_*/todo_cuando_* incremental: {len(DERIVADAS)} tablas", salida)
+            self.orquestar(completo, "--full")
+            self.orquestar(una_pasada, "--full", "--una-pasada")
+
+            inc = self.contenido(self.db)
+            self.assertEqual(len(inc[orq.MATRIX_TABLE]), 150 + 40 * (tanda + 1))
+            self.assertTrue(all(inc[t] for t in DERIVADAS))
+            self.assertEqual(inc, self.contenido(completo))
+            self.assertEqual(inc, self.contenido(una_pasada))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Fechas a ISO (YYYY-MM-DD): column_types.iso_fecha, la carga de cargar_db.py y la migración única
+normalizar_fechas_en_todas.py. Lo ya ISO y lo que no es fecha reconocible queda igual; años de 2 dígitos -> 20YY.
+  python -m pytest -q tests
+"""
+import io, os, shutil, sqlite3, sys, tempfile, unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cargar_db, normalizar_fechas_en_todas
+from column_types import iso_fecha
+
+# (guardado/crudo, esperado)
+CASOS = [
+    ("2025-08-02", "2025-08-02"),
+    ("02/08/2025", "2025-08-02"),
+    ("2/8/2025", "2025-08-02"),
+    ("02/08/25", "2025-08-02"),
+    ("31/12/99", "2099-12-31"),
+    ("lunes 28 julio 2025", "2025-07-28"),
+    ("sin fecha", "sin fecha"),
+    ("31/02/2025", "31/02/2025"),
+    ("12/31/2025", "12/31/2025"),
+    ("02/08/025", "02/08/025"),
+    ("2025/08/02", "2025/08/02"),
+]
+
+class IsoFechaTest(unittest.TestCase):
+    def test_casos(self):
+        for crudo, esperado in CASOS:
+            with self.subTest(crudo=crudo):
+                self.assertEqual(iso_fecha(crudo), esperado)
+
+    def test_no_texto(self):
+        self.assertIsNone(iso_fecha(None))
+        self.assertEqual(iso_fecha(""), "")
+        self.assertEqual(iso_fecha(20250802), 20250802)
+
+class FechasEnDbTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="test_fechas_iso_")
+        self.db = os.path.join(self.tmp, "t.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def fechas(self, table):
+        conn = sqlite3.connect(self.db)
+        try:
+            return [r[0] for r in conn.execute(f'SELECT fecha FROM "{table}" ORDER BY rowid')]
+        finally:
+            conn.close()
+
+    def test_carga_escribe_iso(self):
+        src = os.path.join(self.tmp, "crudo")
+        os.makedirs(src)
+        with open(os.path.join(src, "sorteos.csv"), "w", encoding="utf-8", newline="") as f:
+            f.write("fecha,numero\n")
+            for i, (crudo, _) in enumerate(CASOS):
+                f.write(f"{crudo},{i:04d}\n")
+        (st,) = cargar_db.process_dir(self.db, src)
+        self.assertIsNone(st["error"])
+        self.assertEqual(self.fechas("sorteos"), [e for _, e in CASOS])
+
+    def normalizar(self, *extra):
+        out = io.StringIO()
+        with mock.patch.object(sys, "argv", ["normalizar_fechas_en_todas.py", "--db", self.db, *extra]), \
+                redirect_stdout(out):
+            normalizar_fechas_en_todas.main()
+        return out.getvalue()
+
+    def test_migracion_unica(self):
+        conn = sqlite3.connect(self.db)
+        with conn:
+            conn.execute('CREATE TABLE "astro_luna" ("fecha" TEXT, "numero" TEXT)')
+            conn.executemany('INSERT INTO "astro_luna" VALUES (?, ?)',
+                             [(crudo, f"{i:04d}") for i, (crudo, _) in enumerate(CASOS)] + [(None, "9999")])
+        conn.close()
+
+        salida = self.normalizar()
+        self.assertEqual(self.fechas("astro_luna"), [e for _, e in CASOS] + [None])
+        self.assertIn("quedan valores que no son fecha reconocible", salida)
+        self.assertIn("registrada", salida)
+
+        # segunda corrida: registrada en db_migraciones, no barre
+        conn = sqlite3.connect(self.db)
+        with conn:
+            conn.execute("INSERT INTO astro_luna VALUES ('03/08/2025', '0001')")
+        conn.close()
+        self.assertIn("Nada que hacer", self.normalizar())
+        self.assertEqual(self.fechas("astro_luna")[-1], "03/08/2025")
+        self.normalizar("--force")
+        self.assertEqual(self.fechas("astro_luna")[-1], "2025-08-03")
+
+if __name__ == "__main__":
+    unittest.main()
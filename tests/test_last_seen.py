@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+last_seen.py: las tablas de recencia no deben servirse viejas tras un DELETE o UPDATE en astro_luna.
+El trigger de INSERT solo puede subir fechas; los de DELETE/UPDATE marcan last_seen_sucio, last_seen_ready
+deja de aceptarlas y ensure_last_seen las reconstruye.
+  python -m pytest -q tests
+"""
+import os, sqlite3, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import last_seen
+
+ROWS = [("2025-01-01", "1234"), ("2025-01-02", "0007"), ("2025-01-03", "1234"), ("2025-01-04", "5678")]
+
+class LastSeenTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute('CREATE TABLE astro_luna ("fecha" TEXT, "numero" TEXT, "signo" TEXT)')
+        self.conn.executemany("INSERT INTO astro_luna(fecha, numero) VALUES (?, ?)", ROWS[:-1])
+        self.assertTrue(last_seen.ensure_last_seen(self.conn))
+        self.conn.execute("INSERT INTO astro_luna(fecha, numero) VALUES (?, ?)", ROWS[-1])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def maxf(self):
+        return self.conn.execute("SELECT MAX(fecha) FROM astro_luna").fetchone()[0]
+
+    def numero(self, n):
+        row = self.conn.execute("SELECT fecha FROM last_seen_numero WHERE numero=?", (n,)).fetchone()
+        return row and row[0]
+
+    def digitpos(self, pos, d):
+        row = self.conn.execute("SELECT fecha FROM last_seen_digitpos WHERE posicion=? AND digito=?", (pos, d)).fetchone()
+        return row and row[0]
+
+    def test_insert_incremental(self):
+        self.assertTrue(last_seen.last_seen_ready(self.conn, self.maxf()))
+        self.assertEqual(self.numero(5678), "2025-01-04")
+        self.assertEqual(self.digitpos("um", 5), "2025-01-04")
+
+    def test_delete_reconstruye(self):
+        self.conn.execute("DELETE FROM astro_luna WHERE fecha='2025-01-03'")
+        # MAX(fecha) no cambió, pero 1234 ya no salió el 2025-01-03
+        self.assertFalse(last_seen.last_seen_ready(self.conn, self.maxf()))
+        last_seen.ensure_last_seen(self.conn)
+        self.assertTrue(last_seen.last_seen_ready(self.conn, self.maxf()))
+        self.assertEqual(self.numero(1234), "2025-01-01")
+        self.assertEqual(self.digitpos("um", 1), "2025-01-01")
+
+    def test_update_reconstruye(self):
+        self.conn.execute("UPDATE astro_luna SET numero='0999' WHERE numero='5678'")
+        self.assertFalse(last_seen.last_seen_ready(self.conn, self.maxf()))
+        last_seen.ensure_last_seen(self.conn)
+        self.assertTrue(last_seen.last_seen_ready(self.conn, self.maxf()))
+        self.assertIsNone(self.numero(5678))
+        self.assertEqual(self.numero(999), "2025-01-04")
+        self.assertIsNone(self.digitpos("um", 5))
+
+    def test_tabla_recreada_sin_triggers(self):
+        # como un to_sql(if_exists="replace"): la tabla vuelve con menos filas y sin triggers
+        self.conn.execute("DROP TABLE astro_luna")
+        self.conn.execute('CREATE TABLE astro_luna ("fecha" TEXT, "numero" TEXT, "signo" TEXT)')
+        self.conn.execute("INSERT INTO astro_luna(fecha, numero) VALUES ('2025-01-04', '0007')")
+        self.assertFalse(last_seen.last_seen_ready(self.conn, self.maxf()))
+        last_seen.ensure_last_seen(self.conn)
+        self.assertTrue(last_seen.last_seen_ready(self.conn, self.maxf()))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM last_seen_numero").fetchone()[0], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+row_dedup.py: una tabla cargada con sha1 y migrada a hash64 no debe duplicar filas al recargar el mismo CSV
+(el hash64 calculado desde lo guardado tiene que coincidir con el de la fila del CSV).
+  python -m pytest -q tests
+"""
+import os, shutil, sqlite3, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cargar_db, row_dedup
+
+CSV = (
+    "fecha,numero,signo,premio,nota\n"
+    "02/08/2025,0123,Virgo,$1.500,\n"
+    "03/08/2025,4567,Leo,$2.000,ok\n"
+    "2025-08-04,0089,,,\n"
+    "lunes 4 agosto 2025,9999,Aries,15,x\n"
+)
+
+class MigrateHash64Test(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="test_row_dedup_")
+        self.src = os.path.join(self.tmp, "crudo")
+        os.makedirs(self.src)
+        with open(os.path.join(self.src, "astro_luna.csv"), "w", encoding="utf-8", newline="") as f:
+            f.write(CSV)
+        self.db = os.path.join(self.tmp, "t.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def load(self):
+        # full: relee el CSV completo aunque el manifest diga que no cambió
+        (st,) = cargar_db.process_dir(self.db, self.src, full=True)
+        self.assertIsNone(st["error"])
+        return st
+
+    def migrate(self):
+        conn = sqlite3.connect(self.db, isolation_level=None)
+        try:
+            row_dedup.ensure_dedup_table(conn)  # como row_dedup.main()
+            self.assertEqual(row_dedup.get_mode(conn, "astro_luna"), ("sha1", None))
+            mode, _, removed = row_dedup.migrate(conn, "astro_luna", "hash64")
+            self.assertEqual((mode, removed), ("hash64", 0))
+            return conn.execute('SELECT COUNT(*), typeof(MIN(_rowhash)) FROM "astro_luna"').fetchone()
+        finally:
+            conn.close()
+
+    def test_recarga_tras_migrar_inserta_cero(self):
+        self.assertEqual(self.load()["inserted"], 4)
+        self.assertEqual(self.migrate(), (4, "integer"))
+        st = self.load()
+        self.assertEqual((st["inserted"], st["ignored"]), (0, 4))
+
+    def test_tabla_previa_sin_tipos(self):
+        # tabla de antes de column_types/ISO: todo TEXT y fechas tal cual venían en el CSV
+        conn = sqlite3.connect(self.db)
+        with conn:
+            conn.execute('CREATE TABLE "astro_luna" ("fecha" TEXT, "numero" TEXT, "signo" TEXT, "premio" TEXT, '
+                         '"nota" TEXT, "_rowhash" TEXT)')
+            rows = [line.split(",") for line in CSV.splitlines()[1:]]
+            conn.executemany('INSERT INTO "astro_luna" VALUES (?,?,?,?,?,?)',
+                             [r + [row_dedup.row_hash(r)] for r in rows])
+        conn.close()
+        self.assertEqual(self.migrate(), (4, "integer"))
+        self.assertEqual(self.load()["inserted"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
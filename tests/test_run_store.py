@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+run_store.py: un run empaquetado con pack_run/save_run_packed se lee de vuelta igual por número (packed_rank,
+packed_score, run_rank) y en orden (packed_top), sin decodificar el BLOB completo.
+  python -m pytest -q tests
+"""
+import os, random, sqlite3, struct, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import run_store
+
+def sample_rows(k, seed=1):
+    rnd = random.Random(seed)
+    nums = rnd.sample(range(run_store.UNIVERSE), k)
+    # scores exactos en float32 para comparar sin tolerancia
+    scores = sorted((struct.unpack("<f", struct.pack("<f", rnd.random()))[0] for _ in nums), reverse=True)
+    return [{"rank": i, "numero": f"{n:04d}", "score": s} for i, (n, s) in enumerate(zip(nums, scores), 1)]
+
+class PackedRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+
+    def tearDown(self):
+        self.conn.close()
+
+    def check_run(self, run_id, rows):
+        run_store.save_run_packed(self.conn, run_id, rows)
+        for r in rows:
+            self.assertEqual(run_store.packed_rank(self.conn, run_id, r["numero"]), r["rank"])
+            self.assertEqual(run_store.run_rank(self.conn, run_id, r["numero"]), r["rank"])
+            self.assertEqual(run_store.packed_score(self.conn, run_id, r["numero"]), r["score"])
+        self.assertEqual(run_store.packed_top(self.conn, run_id, len(rows)),
+                         [(r["numero"], r["rank"]) for r in rows])
+
+    def test_run_parcial(self):
+        rows = sample_rows(500)
+        self.check_run(1, rows)
+        fuera = next(f"{n:04d}" for n in range(run_store.UNIVERSE) if f"{n:04d}" not in {r["numero"] for r in rows})
+        self.assertIsNone(run_store.packed_rank(self.conn, 1, fuera))
+        self.assertIsNone(run_store.packed_score(self.conn, 1, fuera))
+        self.assertEqual(run_store.packed_top(self.conn, 1, 3), [(r["numero"], r["rank"]) for r in rows[:3]])
+
+    def test_universo_completo(self):
+        self.check_run(2, sample_rows(run_store.UNIVERSE, seed=2))
+
+    def test_numero_sin_ceros_y_fuera_de_rango(self):
+        rows = sample_rows(50)
+        run_store.save_run_packed(self.conn, 3, rows)
+        n = rows[0]["numero"]
+        self.assertEqual(run_store.packed_rank(self.conn, 3, int(n)), 1)
+        self.assertIsNone(run_store.packed_rank(self.conn, 3, 10000))
+        self.assertIsNone(run_store.packed_rank(self.conn, 3, "abc"))
+        self.assertIsNone(run_store.packed_rank(self.conn, 99, n))
+
+if __name__ == "__main__":
+    unittest.main()
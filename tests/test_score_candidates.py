@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Muestreo de candidatos (score_candidates.gen_candidates) y empaquetado de runs (run_store.pack_run):
+- sin allow_repeat no hay números repetidos y la misma seed da la misma lista;
+- con allow_repeat puede haber repetidos y pack_run los rechaza en vez de pisar el rank anterior.
+  python -m pytest -q tests
+"""
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import score_candidates
+from run_store import pack_run
+
+def as_rows(cands):
+    return [{"rank": i, "numero": c, "score": 1.0 / i} for i, c in enumerate(cands, 1)]
+
+class GenCandidatesTest(unittest.TestCase):
+    def test_sin_repetidos_por_defecto(self):
+        cands = score_candidates.gen_candidates(n=500, seed=7)
+        self.assertEqual(len(cands), 500)
+        self.assertEqual(len(set(cands)), 500)
+
+    def test_misma_seed_misma_lista(self):
+        a = score_candidates.gen_candidates(n=50, seed=11)
+        b = score_candidates.gen_candidates(n=50, seed=11)
+        self.assertEqual(a, b)
+
+    def test_pedir_mas_que_el_universo(self):
+        cands = score_candidates.gen_candidates(n=20000, seed=1)
+        self.assertEqual(len(cands), 10000)
+        self.assertEqual(len(set(cands)), 10000)
+
+    def test_allow_repeat_con_reposicion(self):
+        # 200 extracciones sobre un pool de 10 números: por fuerza hay repetidos
+        solo_d = [lambda s: s.startswith("000")]
+        cands = score_candidates.gen_candidates(n=200, seed=3, allow_repeat=True, allow_patterns=solo_d)
+        self.assertEqual(len(cands), 200)
+        self.assertLess(len(set(cands)), len(cands))
+
+class PackRunTest(unittest.TestCase):
+    def test_rechaza_repetidos(self):
+        with self.assertRaises(ValueError):
+            pack_run(as_rows(["0001", "0002", "0001"]))
+
+    def test_run_sin_repetidos(self):
+        cands = score_candidates.gen_candidates(n=100, seed=5)
+        _, _, orden = pack_run(as_rows(cands))
+        self.assertEqual(len(orden), 2 * len(cands))
+
+if __name__ == "__main__":
+    unittest.main()
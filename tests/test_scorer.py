@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+score_candidates.Scorer (API de librería / scoring_service.py) contra score_universe sobre una BD chica armada
+en el test: mismas filas en score/rank_all/explain, y refresh() recarga cuando entra un sorteo nuevo.
+  python -m pytest -q tests
+"""
+import datetime, os, random, shutil, sqlite3, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import score_candidates as sc
+from last_seen import ensure_last_seen
+
+DIAS = 120
+
+def crear_bd(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+    CREATE TABLE astro_luna ("fecha" TEXT, "numero" TEXT, "signo" TEXT);
+    CREATE TABLE matriz_astro_luna (fecha TEXT, numero TEXT, um INTEGER, c INTEGER, d INTEGER, u INTEGER);
+    CREATE TABLE todos_cuando_son (fecha TEXT, numero TEXT, posicion TEXT, digito INTEGER);
+    """)
+    rnd = random.Random(42)
+    inicio = datetime.date(2025, 1, 1)
+    for i in range(DIAS):
+        agregar_sorteo(conn, (inicio + datetime.timedelta(days=i)).isoformat(), f"{rnd.randrange(10000):04d}")
+    ensure_last_seen(conn)
+    conn.commit()
+    return conn
+
+def agregar_sorteo(conn, fecha, numero):
+    digs = [int(x) for x in numero]
+    conn.execute("INSERT INTO astro_luna(fecha, numero) VALUES (?, ?)", (fecha, numero))
+    conn.execute("INSERT INTO matriz_astro_luna VALUES (?, ?, ?, ?, ?, ?)", (fecha, numero, *digs))
+    conn.executemany("INSERT INTO todos_cuando_son VALUES (?, ?, ?, ?)",
+                     [(fecha, numero, p, d) for p, d in zip(sc.POSITIONS, digs)])
+
+class ScorerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="test_scorer_")
+        self.db = os.path.join(self.tmp, "fixture.db")
+        self.conn = crear_bd(self.db)
+        self.conn.row_factory = sqlite3.Row
+        self.scorer = sc.Scorer(self.db)
+
+    def tearDown(self):
+        self.scorer.close()
+        self.conn.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def universo(self):
+        return sc.universe_rows(sc.score_universe(self.conn, use_store=False))
+
+    def test_rank_all_igual_a_score_universe(self):
+        self.assertEqual(self.scorer.rank_all(), self.universo())
+        self.assertEqual(self.scorer.rank_all(limit=25), self.universo()[:25])
+
+    def test_score_y_explain(self):
+        por_numero = {r["numero"]: r for r in self.universo()}
+        pedidos = ["0000", "0123", "4567", "9999", "7777"]
+        self.assertEqual(self.scorer.score(pedidos), [por_numero[n] for n in pedidos])
+        ex = self.scorer.explain("0123")
+        for k, v in por_numero["0123"].items():
+            self.assertEqual(ex[k], v)
+        self.assertAlmostEqual(sum(ex["aportes"].values()), ex["score"])
+        self.assertEqual([p["digito"] for p in ex["posiciones"]], [0, 1, 2, 3])
+
+    def test_refresh_con_sorteo_nuevo(self):
+        self.assertFalse(self.scorer.refresh())
+        antes = self.scorer.rank_all()
+        ultimo = self.conn.execute("SELECT MAX(fecha) FROM astro_luna").fetchone()[0]
+        nueva = (datetime.date.fromisoformat(ultimo) + datetime.timedelta(days=1)).isoformat()
+        agregar_sorteo(self.conn, nueva, antes[0]["numero"])  # sale el primero del ranking
+        self.conn.commit()
+
+        self.assertTrue(self.scorer.refresh())
+        self.assertEqual(self.scorer.explain("0000")["max_fecha"], nueva)
+        despues = self.scorer.rank_all()
+        self.assertNotEqual(despues, antes)
+        self.assertEqual(despues, self.universo())
+        self.assertFalse(self.scorer.refresh())
+
+if __name__ == "__main__":
+    unittest.main()
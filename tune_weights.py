@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+tune_weights.py — Búsqueda (grid o aleatoria) de pesos w_hotcold/w_cal/w_dp/w_exact y caps contra sorteos históricos.
+- Recorre la historia UNA vez (walk-forward de backtest_scoring.py) y materializa un tensor de features
+  independiente de los caps (días desde la última aparición por número y por dígito/posición, hot/cold y
+  efecto calendario) en archivos .npy.
+- Los workers abren ese tensor con mmap (mismas páginas compartidas, sin copiarlo por proceso) y evalúan
+  cada combinación de pesos/caps; los componentes se calculan una vez por día y cap, y se re-pesan por vector.
+- El leaderboard queda en las tablas tune_runs / tune_results.
+Uso:
+  python tune_weights.py --db "C:\\RadarPremios\\radar_premios.db" --desde 2023-01-01 ^
+         --w-hotcold 0,0.25,0.5 --w-cal 0,0.2 --w-dp 0,0.2,0.4 --w-exact 0.2,0.35,0.5 ^
+         --cap-digitpos 30,60,90 --cap-exact 90,180,365 --workers 4
+  Búsqueda aleatoria (pesos Dirichlet, caps de las listas):
+  python tune_weights.py --db "C:\\RadarPremios\\radar_premios.db" --random 200 --seed 7 --workers 4
+"""
+import argparse, itertools, os, random, shutil, sqlite3, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from score_candidates import combine_components, score_components, rank_of
+from backtest_scoring import (CAL_HORIZON, WalkState, features_from_ages, load_draws, parse_date, summarize)
+
+METRICS = {"mean_rank": False, "median_rank": False, "mrr": True, "top100": True, "top1000": True}  # True = mayor es mejor
+
+def float_list(s):
+    return [float(x) for x in s.split(",") if x.strip()]
+
+def int_list(s):
+    return [int(x) for x in s.split(",") if x.strip()]
+
+# -------------- tensor de features (memmap) --------------
+def build_tensor(draws, outdir, desde=None, hasta=None, cal_horizon=CAL_HORIZON):
+    """Walk-forward único; escribe en outdir los .npy que luego abren los workers en modo mmap."""
+    days = [(o, nums) for o, nums in draws[1:]
+            if (desde is None or o >= desde) and (hasta is None or o <= hasta)]
+    n_days = len(days)
+    if not n_days:
+        raise SystemExit("[ERROR] No hay fechas en el rango solicitado.")
+    open_mm = np.lib.format.open_memmap
+    max_fecha = np.zeros(n_days, dtype=np.int64)
+    hotcold = np.zeros((n_days, 10))
+    cal = np.zeros((n_days, 4, 10))
+    dp_age = np.zeros((n_days, 4, 10))
+    exact_age = open_mm(os.path.join(outdir, "exact_age.npy"), mode="w+", dtype=np.float32, shape=(n_days, 10000))
+    win_day, win_num = [], []
+
+    state = WalkState(cal_horizon=cal_horizon)
+    i = 0
+    for ordinal, numeros in draws:
+        if i < n_days and ordinal == days[i][0]:
+            max_fecha[i] = state.max_fecha
+            hotcold[i] = state.hotcold()
+            cal[i] = state.cal()
+            dp_age[i], exact_age[i] = state.ages()  # enteros (o inf): exactos en float32
+            for n in numeros:
+                win_day.append(i); win_num.append(n)
+            i += 1
+        if i >= n_days:
+            break
+        state.add(ordinal, numeros)
+    exact_age.flush()
+    del exact_age
+
+    for name, arr in (("max_fecha", max_fecha), ("hotcold", hotcold), ("cal", cal), ("dp_age", dp_age),
+                      ("win_day", np.asarray(win_day, dtype=np.int64)),
+                      ("win_num", np.asarray(win_num, dtype=np.int64))):
+        np.save(os.path.join(outdir, f"{name}.npy"), arr)
+    return n_days, len(win_num)
+
+def open_tensor(tdir):
+    return {name: np.load(os.path.join(tdir, f"{name}.npy"), mmap_mode="r")
+            for name in ("max_fecha", "hotcold", "cal", "dp_age", "exact_age", "win_day", "win_num")}
+
+# -------------- evaluación --------------
+def _eval_task(args):
+    # un cap (digitpos, exact) y varios pesos: componentes una vez por día, re-peso por combinación
+    tdir, cap_digitpos, cap_exact, weights = args
+    t = open_tensor(tdir)
+    win_day, win_num = np.asarray(t["win_day"]), np.asarray(t["win_num"])
+    starts = np.searchsorted(win_day, np.arange(len(t["max_fecha"]) + 1))
+    ranks = [[] for _ in weights]
+    for day in range(len(t["max_fecha"])):
+        feats = features_from_ages(t["max_fecha"][day], t["hotcold"][day], t["cal"][day], t["dp_age"][day],
+                                   t["exact_age"][day], cap_digitpos, cap_exact)
+        _, comp = score_components(feats)
+        winners = win_num[starts[day]:starts[day + 1]]
+        for j, w in enumerate(weights):
+            score = combine_components(comp, *w)
+            for n in winners:
+                ranks[j].append(rank_of(score, int(n)))
+    return [((*w, cap_digitpos, cap_exact), summarize(r)) for w, r in zip(weights, ranks)]
+
+def make_configs(args):
+    caps = list(itertools.product(args.cap_digitpos, args.cap_exact))
+    if args.random:
+        rnd = np.random.default_rng(args.seed)
+        pyrnd = random.Random(args.seed)
+        out = []
+        for _ in range(args.random):
+            w = tuple(round(float(x), 4) for x in rnd.dirichlet(np.ones(4)))
+            out.append((w, pyrnd.choice(caps)))
+        return out
+    grid = itertools.product(args.w_hotcold, args.w_cal, args.w_dp, args.w_exact)
+    weights = [w for w in grid if any(w)]
+    return [(w, c) for c in caps for w in weights]
+
+def plan_tasks(tdir, configs, workers):
+    by_cap = {}
+    for w, cap in configs:
+        by_cap.setdefault(cap, []).append(w)
+    tasks = []
+    per_cap = max(1, workers // max(1, len(by_cap)))
+    for (cdp, cex), ws in by_cap.items():
+        for k in range(per_cap):
+            chunk = ws[k::per_cap]
+            if chunk:
+                tasks.append((tdir, cdp, cex, chunk))
+    return tasks
+
+# -------------- leaderboard --------------
+def save_leaderboard(conn, meta, results):
+    conn.executescript("""
+    CREATE TABLE IF NOT EXISTS tune_runs(
+      tune_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+      created_at TEXT DEFAULT (datetime('now')),
+      desde      TEXT,
+      hasta      TEXT,
+      modo       TEXT,
+      seed       INTEGER,
+      n_configs  INTEGER,
+      n_eval     INTEGER,
+      metric     TEXT,
+      elapsed_s  REAL
+    );
+    CREATE TABLE IF NOT EXISTS tune_results(
+      tune_id      INTEGER,
+      rank         INTEGER,
+      w_hotcold    REAL,
+      w_cal        REAL,
+      w_dp         REAL,
+      w_exact      REAL,
+      cap_digitpos INTEGER,
+      cap_exact    INTEGER,
+      n            INTEGER,
+      mean_rank    REAL,
+      median_rank  REAL,
+      mrr          REAL,
+      top5         INTEGER,
+      top15        INTEGER,
+      top100       INTEGER,
+      top1000      INTEGER
+    );
+    """)
+    cur = conn.execute(
+        "INSERT INTO tune_runs(desde,hasta,modo,seed,n_configs,n_eval,metric,elapsed_s) VALUES(?,?,?,?,?,?,?,?)",
+        (meta["desde"], meta["hasta"], meta["modo"], meta["seed"], len(results), meta["n_eval"],
+         meta["metric"], meta["elapsed_s"])
+    )
+    tune_id = cur.lastrowid
+    conn.executemany("""
+      INSERT INTO tune_results(tune_id,rank,w_hotcold,w_cal,w_dp,w_exact,cap_digitpos,cap_exact,
+                               n,mean_rank,median_rank,mrr,top5,top15,top100,top1000)
+      VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """, [
+        (tune_id, i, *cfg, s["n"], s["mean_rank"], s["median_rank"], s["mrr"],
+         s["top5"], s["top15"], s["top100"], s["top1000"])
+        for i, (cfg, s) in enumerate(results, 1)
+    ])
+    conn.commit()
+    return tune_id
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--w-hotcold", type=float_list, default=[0.0, 0.25, 0.5])
+    ap.add_argument("--w-cal", type=float_list, default=[0.0, 0.2])
+    ap.add_argument("--w-dp", type=float_list, default=[0.0, 0.2, 0.4])
+    ap.add_argument("--w-exact", type=float_list, default=[0.2, 0.35, 0.5])
+    ap.add_argument("--cap-digitpos", type=int_list, default=[60])
+    ap.add_argument("--cap-exact", type=int_list, default=[180])
+    ap.add_argument("--cal-horizon", type=int, default=CAL_HORIZON, help="Semanas del efecto calendario")
+    ap.add_argument("--random", type=int, default=0, help="N configuraciones aleatorias en vez de grid")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--desde", help="Primera fecha a evaluar (YYYY-MM-DD)")
+    ap.add_argument("--hasta", help="Última fecha a evaluar (YYYY-MM-DD)")
+    ap.add_argument("--metric", choices=sorted(METRICS), default="mean_rank")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--tensor-dir", help="Carpeta para el tensor .npy (default: temporal, se borra al final)")
+    args = ap.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        draws = load_draws(conn)
+        if len(draws) < 2:
+            raise SystemExit("[ERROR] astro_luna necesita al menos 2 fechas ISO.")
+        configs = make_configs(args)
+        if not configs:
+            raise SystemExit("[ERROR] Grid vacío.")
+
+        tdir = args.tensor_dir or tempfile.mkdtemp(prefix="tune_weights_")
+        os.makedirs(tdir, exist_ok=True)
+        t0 = time.perf_counter()
+        try:
+            n_days, n_eval = build_tensor(draws, tdir, parse_date(args.desde), parse_date(args.hasta),
+                                         args.cal_horizon)
+            t_tensor = time.perf_counter() - t0
+            tasks = plan_tasks(tdir, configs, args.workers)
+            if args.workers <= 1 or len(tasks) == 1:
+                parts = [_eval_task(t) for t in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=args.workers) as ex:
+                    parts = list(ex.map(_eval_task, tasks))
+        finally:
+            if not args.tensor_dir:
+                shutil.rmtree(tdir, ignore_errors=True)
+        elapsed = time.perf_counter() - t0
+
+        results = [r for part in parts for r in part]
+        better_high = METRICS[args.metric]
+        results.sort(key=lambda r: (-r[1][args.metric] if better_high else r[1][args.metric], r[0]))
+
+        tune_id = save_leaderboard(conn, {
+            "desde": args.desde, "hasta": args.hasta, "modo": "random" if args.random else "grid",
+            "seed": args.seed, "n_eval": n_eval, "metric": args.metric, "elapsed_s": elapsed,
+        }, results)
+    finally:
+        conn.close()
+
+    print("==================== TUNE WEIGHTS ====================")
+    print(f"configs: {len(results)}  fechas: {n_days}  ganadores: {n_eval}  métrica: {args.metric}")
+    print(f"tensor: {t_tensor:.2f}s  total: {elapsed:.2f}s  workers: {args.workers}")
+    print("------------------------------------------------------")
+    for i, (cfg, s) in enumerate(results[:args.top], 1):
+        w_hot, w_cal, w_dp, w_ex, cdp, cex = cfg
+        print(f" {i:>3}. w=({w_hot:g},{w_cal:g},{w_dp:g},{w_ex:g}) caps=({cdp},{cex})  "
+              f"rank_medio={s['mean_rank']:.1f}  mediana={s['median_rank']:.0f}  mrr={s['mrr']:.5f}  "
+              f"top100={s['top100']}  top1000={s['top1000']}")
+    print("======================================================")
+    print(f"[OK] Leaderboard guardado en tune_results con tune_id={tune_id}")
+
+if __name__ == "__main__":
+    main()